@@ -1,6 +1,51 @@
-from django.contrib import admin
+import io
+from django import forms
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import Student, StudentCourse
+from django.core.files.base import ContentFile
+from django.shortcuts import render
+from django.urls import path
+from collections import Counter
+from core.models import School, Department, Course
+from .models import Student, StudentCourse, StudentImportJob
+from .provisioning import read_rows, import_students, ImportFileError, COLUMNS
+from .enrollment import cohort_students, enroll_cohort
+
+class StudentImportForm(forms.Form):
+    sheet = forms.FileField(
+        label="Student Sheet",
+        help_text="CSV or XLSX with the columns " + ", ".join(COLUMNS) + ". Courses are comma separated course codes."
+    )
+    dry_run = forms.BooleanField(
+        required=False,
+        label="Only validate the sheet, do not queue the import"
+    )
+
+class CohortEnrollmentForm(forms.Form):
+    action = forms.ChoiceField(
+        choices=[('enroll', 'Enroll the cohort'), ('unenroll', 'Unenroll the cohort')],
+        widget=forms.RadioSelect()
+    )
+    school = forms.ModelChoiceField(queryset=School.objects.all(), required=False)
+    department = forms.ModelChoiceField(queryset=Department.objects.select_related('school'), required=False)
+    roll_from = forms.CharField(required=False, label="Roll numbers from")
+    roll_to = forms.CharField(required=False, label="Roll numbers to")
+    courses = forms.ModelMultipleChoiceField(
+        queryset=Course.objects.select_related('department').order_by('code', '-year', '-semester'),
+        help_text="Hold Ctrl (Cmd on a Mac) to select several courses",
+        widget=forms.SelectMultiple(attrs={'size': 12})
+    )
+    dry_run = forms.BooleanField(
+        required=False,
+        initial=True,
+        label="Only show the changes, do not save anything"
+    )
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        if not any(cleaned_data.get(name) for name in ('school', 'department', 'roll_from', 'roll_to')):
+            raise forms.ValidationError('Select the cohort by school, department or roll number range.')
+        return cleaned_data
 
 class StudentCourseInline(admin.TabularInline):
     model = StudentCourse
@@ -26,6 +71,109 @@ class StudentAdmin(BaseUserAdmin):
     filter_horizontal = ()
     autocomplete_fields = ['school', 'department']
     inlines = [StudentCourseInline]
+    change_list_template = 'admin/accounts/student/change_list.html'
+    
+    def get_urls(self):
+        urls = super().get_urls()
+        custom_urls = [
+            path('import/', self.admin_site.admin_view(self.import_students_view), name='accounts_student_import'),
+        ]
+        return custom_urls + urls
+    
+    def import_students_view(self, request):
+        """
+        Validate an uploaded sheet and queue its import for the background
+        worker; hashing thousands of passwords does not fit in a web request
+        """
+        result = None
+        if request.method == 'POST':
+            form = StudentImportForm(request.POST, request.FILES)
+            if form.is_valid():
+                sheet = form.cleaned_data['sheet']
+                content = sheet.read()
+                try:
+                    # A dry run only validates, so nothing is hashed or written here
+                    result = import_students(read_rows(io.BytesIO(content), sheet.name), dry_run=True)
+                except ImportFileError as exc:
+                    form.add_error('sheet', str(exc))
+                else:
+                    valid = len(result.created) + len(result.updated)
+                    summary = f'{len(result.created)} new, {len(result.updated)} existing and {len(result.rejected)} rejected row(s)'
+                    if form.cleaned_data['dry_run']:
+                        self.message_user(request, f'Dry run: {summary}.', level=messages.SUCCESS)
+                    elif not valid:
+                        self.message_user(request, f'Nothing to import: {summary}.', level=messages.WARNING)
+                    else:
+                        job = StudentImportJob(requested_by=request.user, filename=sheet.name, total_rows=valid)
+                        job.sheet.save(sheet.name, ContentFile(content))
+                        self.message_user(
+                            request,
+                            f'Import job {job.pk} queued with {summary}. The background worker runs it; '
+                            f'its result appears in the list below.',
+                            level=messages.WARNING if result.rejected else messages.SUCCESS
+                        )
+        else:
+            form = StudentImportForm()
+        
+        context = {
+            **self.admin_site.each_context(request),
+            'form': form,
+            'result': result,
+            'jobs': StudentImportJob.objects.select_related('requested_by')[:10],
+            'title': 'Import Students',
+            'opts': self.model._meta,
+        }
+        return render(request, 'admin/student_import.html', context)
 
 admin.site.register(Student, StudentAdmin)
-admin.site.register(StudentCourse)
+
+@admin.register(StudentCourse)
+class StudentCourseAdmin(admin.ModelAdmin):
+    list_display = ('student', 'course', 'enrolled_date')
+    list_select_related = ('student', 'course')
+    search_fields = ('student__roll_number', 'student__name', 'course__code')
+    change_list_template = 'admin/accounts/studentcourse/change_list.html'
+    
+    def get_urls(self):
+        urls = super().get_urls()
+        custom_urls = [
+            path('cohort/', self.admin_site.admin_view(self.cohort_enrollment_view), name='accounts_cohort_enrollment'),
+        ]
+        return custom_urls + urls
+    
+    def cohort_enrollment_view(self, request):
+        """Enroll or unenroll a whole cohort of students in a set of courses"""
+        changes = None
+        if request.method == 'POST':
+            form = CohortEnrollmentForm(request.POST)
+            if form.is_valid():
+                data = form.cleaned_data
+                students = cohort_students(data['school'], data['department'], data['roll_from'], data['roll_to'])
+                enroll = data['action'] == 'enroll'
+                changed = enroll_cohort(students, [course.id for course in data['courses']], enroll=enroll, dry_run=data['dry_run'])
+                
+                per_course = Counter(course_id for _, course_id in changed)
+                changes = {
+                    'sign': '+' if enroll else '-',
+                    'students': students.count(),
+                    'total': len(changed),
+                    'dry_run': data['dry_run'],
+                    'courses': [(course, per_course[course.id]) for course in data['courses']],
+                }
+                self.message_user(
+                    request,
+                    f'{"Dry run: " if data["dry_run"] else ""}{len(changed)} enrollment(s) '
+                    f'{"added" if enroll else "removed"} for a cohort of {changes["students"]} student(s).',
+                    level=messages.SUCCESS
+                )
+        else:
+            form = CohortEnrollmentForm()
+        
+        context = {
+            **self.admin_site.each_context(request),
+            'form': form,
+            'changes': changes,
+            'title': 'Cohort Enrollment',
+            'opts': self.model._meta,
+        }
+        return render(request, 'admin/cohort_enrollment.html', context)
@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+LOCMEM_BACKEND = 'django.core.cache.backends.locmem.LocMemCache'
+CACHED_SESSION_ENGINES = (
+    'django.contrib.sessions.backends.cache',
+    'django.contrib.sessions.backends.cached_db',
+)
+
+
+def _is_locmem(alias):
+    return settings.CACHES.get(alias, {}).get('BACKEND') == LOCMEM_BACKEND
+
+
+@register(Tags.security, Tags.caches)
+def check_cache_is_shared(app_configs, **kwargs):
+    """
+    Cached sessions, users, reference data and dashboards must live in a cache
+    every process sees, or a logout or invalidation only reaches one of them
+    """
+    errors = []
+    if settings.SESSION_ENGINE in CACHED_SESSION_ENGINES and _is_locmem(settings.SESSION_CACHE_ALIAS):
+        errors.append(Error(
+            'Cached sessions are stored in a per-process locmem cache.',
+            hint='Set SESSION_BACKEND=db, or CACHE_BACKEND=redis, file or database.',
+            id='accounts.E001',
+        ))
+    if getattr(settings, 'USER_CACHE_ENABLED', False) and _is_locmem('default'):
+        errors.append(Error(
+            'The user cache is stored in a per-process locmem cache.',
+            hint='Set USER_CACHE_ENABLED=False, or CACHE_BACKEND=redis, file or database.',
+            id='accounts.E002',
+        ))
+    if _is_locmem('default') and not settings.DEBUG:
+        # core.reference_data versions and the forms_app dashboards are invalidated
+        # by whichever process changes the data, including commands and the job worker
+        errors.append(Error(
+            'Cached reference data and dashboards are stored in a per-process locmem cache.',
+            hint='Set CACHE_BACKEND=redis, file or database; locmem is only accepted with DEBUG=True.',
+            id='accounts.E003',
+        ))
+    return errors
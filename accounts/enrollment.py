@@ -0,0 +1,158 @@
+import threading
+from contextlib import contextmanager
+from django.db import connections, router, transaction
+from django.utils import timezone
+from forms_app.dashboard_cache import invalidate_students
+from analytics import progress
+from .models import Student, StudentCourse
+
+BATCH_SIZE = 1000
+
+_bulk = threading.local()
+
+
+@contextmanager
+def bulk_enrollment_changes():
+    """
+    Within this block the StudentCourse save/delete receivers leave the
+    enrollment totals and dashboards alone, because the caller updates them
+    once for the whole batch.
+    """
+    _bulk.depth = getattr(_bulk, 'depth', 0) + 1
+    try:
+        yield
+    finally:
+        _bulk.depth -= 1
+
+
+def in_bulk_enrollment_change():
+    return getattr(_bulk, 'depth', 0) > 0
+
+
+def cohort_students(school=None, department=None, roll_from=None, roll_to=None):
+    """Non-staff students of a school and/or department, optionally within an inclusive roll number range"""
+    students = Student.objects.filter(is_staff=False)
+    if school is not None:
+        students = students.filter(school=school)
+    if department is not None:
+        students = students.filter(department=department)
+    if roll_from:
+        students = students.filter(roll_number__gte=roll_from)
+    if roll_to:
+        students = students.filter(roll_number__lte=roll_to)
+    return students
+
+
+def enrollment_diff(students, course_ids, enroll=True):
+    """
+    The (student_id, course_id) pairs that enrolling (or unenrolling) the
+    students in the courses would add (or remove), from two queries whatever
+    the size of the cohort. Used both for dry runs and to apply the change.
+    """
+    course_ids = list(dict.fromkeys(course_ids))
+    enrolled = set(StudentCourse.objects.filter(
+        student__in=students,
+        course_id__in=course_ids
+    ).values_list('student_id', 'course_id'))
+    if not enroll:
+        return sorted(enrolled)
+
+    student_ids = students.order_by('id').values_list('id', flat=True)
+    return [
+        (student_id, course_id)
+        for student_id in student_ids
+        for course_id in course_ids
+        if (student_id, course_id) not in enrolled
+    ]
+
+
+def _insert_enrollments(pairs):
+    """
+    Insert one batch of (student_id, course_id) pairs with INSERT ... ON
+    CONFLICT DO NOTHING RETURNING, and return the pairs actually inserted.
+    Unlike bulk_create(ignore_conflicts=True) this leaves out pairs another
+    request enrolled since they were read, so they are not counted twice.
+    """
+    connection = connections[router.db_for_write(StudentCourse)]
+    quote = connection.ops.quote_name
+    meta = StudentCourse._meta
+    student, course, enrolled_date = (meta.get_field(name).column for name in ('student', 'course', 'enrolled_date'))
+    now = meta.get_field('enrolled_date').get_db_prep_save(timezone.now(), connection)
+
+    sql = (
+        f'INSERT INTO {quote(meta.db_table)} ({quote(student)}, {quote(course)}, {quote(enrolled_date)}) '
+        f'VALUES {", ".join(["(%s, %s, %s)"] * len(pairs))} '
+        f'ON CONFLICT ({quote(student)}, {quote(course)}) DO NOTHING '
+        f'RETURNING {quote(student)}, {quote(course)}'
+    )
+    params = [value for student_id, course_id in pairs for value in (student_id, course_id, now)]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [tuple(row) for row in cursor.fetchall()]
+
+
+def add_enrollments(pairs):
+    """
+    Enroll (student_id, course_id) pairs that are not enrolled yet with batched
+    inserts, and return the pairs that were added.
+
+    The inserts send no signals, so the course enrollment totals and the
+    cached dashboards are updated here in the same transaction.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return []
+
+    with transaction.atomic():
+        existing = set(StudentCourse.objects.filter(
+            student_id__in={student_id for student_id, _ in pairs},
+            course_id__in={course_id for _, course_id in pairs}
+        ).values_list('student_id', 'course_id'))
+        missing = sorted(pairs - existing)
+        added = []
+        for start in range(0, len(missing), BATCH_SIZE):
+            added.extend(_insert_enrollments(missing[start:start + BATCH_SIZE]))
+        added.sort()
+
+        progress.record_enrollments([course_id for _, course_id in added])
+        invalidate_students({student_id for student_id, _ in added})
+    return added
+
+
+def remove_enrollments(pairs):
+    """
+    Unenroll (student_id, course_id) pairs in batches, and return the pairs
+    that were removed. Like add_enrollments, the enrollment totals and
+    dashboards are updated once here; the per-row receivers are told to skip.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return []
+
+    with transaction.atomic():
+        rows = StudentCourse.objects.filter(
+            student_id__in={student_id for student_id, _ in pairs},
+            course_id__in={course_id for _, course_id in pairs}
+        ).values_list('id', 'student_id', 'course_id')
+        removed = {(student_id, course_id): row_id for row_id, student_id, course_id in rows if (student_id, course_id) in pairs}
+        row_ids = list(removed.values())
+        with bulk_enrollment_changes():
+            for start in range(0, len(row_ids), BATCH_SIZE):
+                StudentCourse.objects.filter(id__in=row_ids[start:start + BATCH_SIZE]).delete()
+
+        progress.record_enrollments([course_id for _, course_id in removed], step=-1)
+        invalidate_students({student_id for student_id, _ in removed})
+    return sorted(removed)
+
+
+def enroll_cohort(students, course_ids, enroll=True, dry_run=False):
+    """
+    Enroll (or unenroll) every student of a cohort queryset in the courses.
+
+    Returns the (student_id, course_id) pairs added or removed; with dry_run
+    they are only computed, nothing is written.
+    """
+    diff = enrollment_diff(students, course_ids, enroll)
+    if dry_run:
+        return diff
+    return add_enrollments(diff) if enroll else remove_enrollments(diff)
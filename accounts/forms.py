@@ -1,7 +1,9 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
-from .models import Student, StudentCourse
+from .models import Student
+from .enrollment import add_enrollments
 from core.models import School, Department, Course
+from core import reference_data
 
 class StudentRegistrationForm(UserCreationForm):
     name = forms.CharField(
@@ -64,10 +66,19 @@ class StudentRegistrationForm(UserCreationForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         
+        # Dropdowns are rendered from the cached reference data; the querysets
+        # are still used to validate the submitted ids
+        self.fields['school'].choices = [('', 'Select School')] + [
+            (school['id'], school['name']) for school in reference_data.get_schools()
+        ]
+        
         if 'school' in self.data:
             try:
                 school_id = int(self.data.get('school'))
                 self.fields['department'].queryset = Department.objects.filter(school_id=school_id).order_by('name')
+                self.fields['department'].choices = [('', 'Select Department')] + [
+                    (dept['id'], dept['name']) for dept in reference_data.get_departments(school_id)
+                ]
             except (ValueError, TypeError):
                 pass
         
@@ -75,6 +86,9 @@ class StudentRegistrationForm(UserCreationForm):
             try:
                 department_id = int(self.data.get('department'))
                 self.fields['courses'].queryset = Course.objects.filter(department_id=department_id).order_by('name')
+                self.fields['courses'].choices = [
+                    (course['id'], f"{course['code']} - {course['name']}") for course in reference_data.get_courses(department_id)
+                ]
             except (ValueError, TypeError):
                 pass
     
@@ -90,10 +104,8 @@ class StudentRegistrationForm(UserCreationForm):
         user.department = self.cleaned_data['department']
         if commit:
             user.save()
-            # Enroll student in selected courses
-            courses = self.cleaned_data['courses']
-            for course in courses:
-                StudentCourse.objects.create(student=user, course=course)
+            # Enroll student in selected courses with one batched insert
+            add_enrollments((user.id, course.id) for course in self.cleaned_data['courses'])
         return user
 
 class StudentLoginForm(AuthenticationForm):
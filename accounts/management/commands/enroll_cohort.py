@@ -0,0 +1,53 @@
+from collections import Counter
+from django.core.management.base import BaseCommand, CommandError
+from core.models import School, Department, Course
+from accounts.enrollment import cohort_students, enroll_cohort
+
+
+class Command(BaseCommand):
+    help = 'Enroll or unenroll every student of a school, department or roll number range in a set of courses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['enroll', 'unenroll'])
+        parser.add_argument(
+            '--course', type=int, action='append', dest='course_ids', required=True,
+            help='Course id (may be repeated)'
+        )
+        parser.add_argument('--school', type=int, help='Only students of this school id')
+        parser.add_argument('--department', type=int, help='Only students of this department id')
+        parser.add_argument('--roll-from', help='First roll number of the range (inclusive)')
+        parser.add_argument('--roll-to', help='Last roll number of the range (inclusive)')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only show how many enrollments each course would gain or lose'
+        )
+
+    def handle(self, *args, **options):
+        if not any(options[name] for name in ('school', 'department', 'roll_from', 'roll_to')):
+            raise CommandError('Select the cohort with --school, --department, --roll-from or --roll-to.')
+
+        courses = {course.id: course for course in Course.objects.filter(id__in=options['course_ids'])}
+        unknown = sorted(set(options['course_ids']) - set(courses))
+        if unknown:
+            raise CommandError(f'Unknown course id(s): {", ".join(map(str, unknown))}')
+
+        try:
+            school = School.objects.get(id=options['school']) if options['school'] else None
+            department = Department.objects.get(id=options['department']) if options['department'] else None
+        except (School.DoesNotExist, Department.DoesNotExist) as exc:
+            raise CommandError(str(exc))
+
+        students = cohort_students(school, department, options['roll_from'], options['roll_to'])
+        enroll = options['action'] == 'enroll'
+        changed = enroll_cohort(students, courses, enroll=enroll, dry_run=options['dry_run'])
+
+        sign = '+' if enroll else '-'
+        per_course = Counter(course_id for _, course_id in changed)
+        for course_id, course in courses.items():
+            self.stdout.write(f'  {course.code} - {course.name} ({course.year}/{course.semester}): {sign}{per_course[course_id]}')
+
+        verb = 'added' if enroll else 'removed'
+        summary = f'{len(changed)} enrollment(s) {verb} for {students.count()} student(s) in the cohort'
+        if options['dry_run']:
+            summary += ' (dry run, nothing was written)'
+        self.stdout.write(self.style.SUCCESS(summary + '.'))
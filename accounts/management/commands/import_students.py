@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from accounts.provisioning import read_rows, import_students, ImportFileError
+
+
+class Command(BaseCommand):
+    help = 'Create or update students and their course enrollments from a CSV or XLSX sheet, keyed on roll number'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='Sheet with the columns roll_number, name, password, school, department and courses'
+        )
+        parser.add_argument(
+            '--workers', type=int,
+            help='Password hashing processes (default: one per CPU)'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only validate the sheet and report what would change'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as fh:
+                result = import_students(
+                    read_rows(fh, options['path']),
+                    workers=options['workers'],
+                    dry_run=options['dry_run']
+                )
+        except (OSError, ImportFileError) as exc:
+            raise CommandError(str(exc))
+
+        for line, roll_number, reason in result.rejected:
+            self.stdout.write(self.style.WARNING(f'Line {line} ({roll_number or "no roll number"}): {reason}'))
+
+        summary = (
+            f'{len(result.created)} student(s) created, {len(result.updated)} updated, '
+            f'{len(result.rejected)} rejected, {result.enrollments} enrollment(s) added'
+        )
+        if options['dry_run']:
+            summary += ' (dry run, nothing was written)'
+        self.stdout.write(self.style.SUCCESS(summary + '.'))
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.4 on 2026-10-17 03:26
+
+import accounts.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_student_import_jobs'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='studentimportjob',
+            name='sheet',
+            field=models.FileField(blank=True, storage=accounts.models.private_storage, upload_to='imports/'),
+        ),
+    ]
@@ -1,7 +1,26 @@
+import os
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
+from django.core.files.storage import FileSystemStorage
 from django.db import models
 from django.conf import settings
 
+
+class PrivateStorage(FileSystemStorage):
+    """FileSystemStorage under PRIVATE_MEDIA_ROOT, which unlike MEDIA_ROOT is never served"""
+
+    @property
+    def base_location(self):
+        return settings.PRIVATE_MEDIA_ROOT
+
+    @property
+    def location(self):
+        return os.path.abspath(self.base_location)
+
+
+def private_storage():
+    return PrivateStorage()
+
+
 class StudentManager(BaseUserManager):
     def create_user(self, roll_number, name, password=None):
         if not roll_number:
@@ -70,4 +89,38 @@ class StudentCourse(models.Model):
         ordering = ['enrolled_date']
     
     def __str__(self):
-        return f"{self.student.name} - {self.course.code}"
\ No newline at end of file
+        return f"{self.student.name} - {self.course.code}"
+
+class StudentImportJob(models.Model):
+    """Student sheet uploaded in the admin and imported by the background worker (run_export_jobs)"""
+    STATUSES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='import_jobs')
+    # The sheet holds plain-text passwords: it is kept out of MEDIA_ROOT and deleted once the job ends
+    sheet = models.FileField(upload_to='imports/', storage=private_storage, blank=True)
+    filename = models.CharField(max_length=255)
+    status = models.CharField(max_length=10, choices=STATUSES, default='pending')
+    total_rows = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    updated_count = models.PositiveIntegerField(default=0)
+    rejected_count = models.PositiveIntegerField(default=0)
+    enrollments = models.PositiveIntegerField(default=0)
+    report = models.TextField(blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'student_import_jobs'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Import of {self.filename} ({self.status})"
@@ -0,0 +1,256 @@
+import csv
+import io
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import django
+import openpyxl
+from django.contrib.auth.hashers import make_password
+from django.db import connections, transaction
+from core.models import School, Department, Course
+from .enrollment import add_enrollments
+from .models import Student
+from .user_cache import invalidate_users
+
+BATCH_SIZE = 1000
+# Below this many passwords a process pool costs more to start than it saves
+POOL_THRESHOLD = 8
+# Hashed passwords between two progress callbacks
+PROGRESS_EVERY = 100
+
+COLUMNS = ('roll_number', 'name', 'password', 'school', 'department', 'courses')
+REQUIRED_COLUMNS = ('roll_number', 'name', 'school', 'department')
+
+ImportResult = namedtuple('ImportResult', ['created', 'updated', 'rejected', 'enrollments'])
+RejectedRow = namedtuple('RejectedRow', ['line', 'roll_number', 'reason'])
+
+
+class ImportFileError(ValueError):
+    """The uploaded file cannot be read as a student sheet"""
+
+
+def _header(value):
+    return str(value or '').strip().lower().replace(' ', '_')
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    # Spreadsheets store numeric roll numbers as floats
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def read_rows(fileobj, filename):
+    """
+    Yield (line_number, {column: value}) for each data row of a CSV or XLSX
+    student sheet. The first row holds the column names of COLUMNS; courses
+    is a comma or semicolon separated list of course codes.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.csv':
+        text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+        rows = csv.reader(text)
+    elif extension in ('.xlsx', '.xlsm'):
+        try:
+            workbook = openpyxl.load_workbook(fileobj, read_only=True, data_only=True)
+        except Exception as exc:
+            raise ImportFileError(f'Cannot open {filename}: {exc}')
+        rows = workbook.active.iter_rows(values_only=True)
+    else:
+        raise ImportFileError('Upload a .csv or .xlsx file.')
+
+    try:
+        header = [_header(value) for value in next(rows, [])]
+        missing = [column for column in REQUIRED_COLUMNS if column not in header]
+        if missing:
+            raise ImportFileError(f'Missing column(s): {", ".join(missing)}')
+
+        for line, values in enumerate(rows, 2):
+            row = {column: _cell(value) for column, value in zip(header, values) if column in COLUMNS}
+            if any(row.values()):
+                yield line, row
+    except UnicodeDecodeError:
+        raise ImportFileError('CSV files must be UTF-8 encoded.')
+
+
+class ReferenceIndex:
+    """Schools, departments and courses loaded once and matched by code or name"""
+
+    def __init__(self):
+        self.schools = {}
+        for school in School.objects.all():
+            self.schools[school.code.lower()] = school.id
+            self.schools.setdefault(school.name.lower(), school.id)
+
+        self.departments = {}
+        for department in Department.objects.all():
+            self.departments[(department.school_id, department.code.lower())] = department.id
+            self.departments.setdefault((department.school_id, department.name.lower()), department.id)
+
+        # A code can exist in several terms; the most recent one is the intake's course
+        self.courses = {}
+        for course in Course.objects.order_by('year', 'semester', 'id'):
+            self.courses[(course.department_id, course.code.lower())] = course.id
+
+    def school(self, value):
+        return self.schools.get(value.lower())
+
+    def department(self, school_id, value):
+        return self.departments.get((school_id, value.lower()))
+
+    def course(self, department_id, code):
+        return self.courses.get((department_id, code.lower()))
+
+
+def _course_codes(value):
+    return [code.strip() for code in value.replace(';', ',').split(',') if code.strip()]
+
+
+def validate_rows(rows, existing):
+    """
+    Check rows against the reference data and the existing students
+    ({roll_number: is_staff}). Returns (valid, rejected) where each valid
+    entry is a dict of student fields plus 'password' and 'course_ids'.
+    """
+    index = ReferenceIndex()
+    valid = []
+    rejected = []
+    seen = set()
+
+    for line, row in rows:
+        roll_number = row.get('roll_number', '')
+
+        def reject(reason):
+            rejected.append(RejectedRow(line, roll_number, reason))
+
+        if not roll_number or not row.get('name'):
+            reject('roll_number and name are required')
+            continue
+        if roll_number in seen:
+            reject('duplicate roll_number in the file')
+            continue
+        seen.add(roll_number)
+        if existing.get(roll_number):
+            reject('belongs to a staff account')
+            continue
+        if roll_number not in existing and not row.get('password'):
+            reject('a password is required for new students')
+            continue
+
+        school_id = index.school(row['school'])
+        if school_id is None:
+            reject(f'unknown school "{row["school"]}"')
+            continue
+        department_id = index.department(school_id, row['department'])
+        if department_id is None:
+            reject(f'unknown department "{row["department"]}"')
+            continue
+
+        codes = _course_codes(row.get('courses', ''))
+        course_ids = [index.course(department_id, code) for code in codes]
+        unknown = [code for code, course_id in zip(codes, course_ids) if course_id is None]
+        if unknown:
+            reject(f'unknown course(s) {", ".join(unknown)}')
+            continue
+
+        valid.append({
+            'roll_number': roll_number,
+            'name': row['name'],
+            'school_id': school_id,
+            'department_id': department_id,
+            'password': row.get('password', ''),
+            'course_ids': list(dict.fromkeys(course_ids)),
+        })
+    return valid, rejected
+
+
+def hash_passwords(passwords, workers=None, progress=None):
+    """
+    make_password for every password, spread over a process pool so that
+    hashing uses every core whichever password hasher is configured.
+
+    This forks, so it belongs in management commands and the job worker, not
+    in web requests. progress is called with the number of passwords hashed
+    so far every PROGRESS_EVERY passwords.
+    """
+    passwords = list(passwords)
+    if workers == 1 or len(passwords) < POOL_THRESHOLD:
+        return _collect(map(make_password, passwords), progress)
+
+    # Forked workers must not inherit this process's open database connections
+    if not any(connection.in_atomic_block for connection in connections.all()):
+        connections.close_all()
+    workers = workers or os.cpu_count()
+    chunksize = max(1, len(passwords) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+        return _collect(pool.map(make_password, passwords, chunksize=chunksize), progress)
+
+
+def _collect(hashes, progress):
+    collected = []
+    for hashed in hashes:
+        collected.append(hashed)
+        if progress and len(collected) % PROGRESS_EVERY == 0:
+            progress(len(collected))
+    return collected
+
+
+def import_students(rows, workers=None, dry_run=False, progress=None):
+    """
+    Create or update students keyed on roll_number and add their course
+    enrollments, all with batched upserts in one transaction.
+
+    Existing students keep their password when the row leaves it blank and
+    keep enrollments that are not listed; rows are never deleted. Returns an
+    ImportResult with the created and updated roll numbers, the RejectedRows
+    and the number of enrollments added. A dry run only validates and hashes
+    nothing; progress is passed on to hash_passwords.
+    """
+    rows = list(rows)
+    roll_numbers = [row.get('roll_number', '') for _, row in rows]
+    existing = dict(Student.objects.filter(roll_number__in=roll_numbers).values_list('roll_number', 'is_staff'))
+    valid, rejected = validate_rows(rows, existing)
+
+    created = [entry['roll_number'] for entry in valid if entry['roll_number'] not in existing]
+    updated = [entry['roll_number'] for entry in valid if entry['roll_number'] in existing]
+    if dry_run or not valid:
+        return ImportResult(created, updated, rejected, 0)
+
+    with_password = [entry for entry in valid if entry['password']]
+    hashes = hash_passwords([entry['password'] for entry in with_password], workers, progress)
+    for entry, hashed in zip(with_password, hashes):
+        entry['password'] = hashed
+
+    profile_fields = ['name', 'school', 'department']
+    with transaction.atomic():
+        # Rows with a new password and rows that keep theirs update different columns
+        for entries, update_fields in (
+            (with_password, profile_fields + ['password']),
+            ([entry for entry in valid if not entry['password']], profile_fields),
+        ):
+            if entries:
+                Student.objects.bulk_create([
+                    Student(
+                        roll_number=entry['roll_number'],
+                        name=entry['name'],
+                        school_id=entry['school_id'],
+                        department_id=entry['department_id'],
+                        password=entry['password'] or make_password(None)
+                    )
+                    for entry in entries
+                ], batch_size=BATCH_SIZE, update_conflicts=True, unique_fields=['roll_number'], update_fields=update_fields)
+
+        student_ids = dict(Student.objects.filter(
+            roll_number__in=[entry['roll_number'] for entry in valid]
+        ).values_list('roll_number', 'id'))
+        added = add_enrollments(
+            (student_ids[entry['roll_number']], course_id)
+            for entry in valid
+            for course_id in entry['course_ids']
+        )
+        # The upsert sends no signals either, so drop the cached users it changed
+        invalidate_users(student_ids[roll_number] for roll_number in updated)
+
+    return ImportResult(created, updated, rejected, len(added))
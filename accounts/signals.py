@@ -0,0 +1,18 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Student, StudentImportJob
+from .user_cache import invalidate_users
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def student_changed(sender, instance, **kwargs):
+    # Covers password, activation and permission changes as well as last_login updates
+    invalidate_users([instance.id])
+
+
+@receiver(post_delete, sender=StudentImportJob)
+def delete_import_sheet(sender, instance, **kwargs):
+    # The sheet holds plain-text passwords; a job deleted before it ran must not leave it behind
+    if instance.sheet:
+        instance.sheet.delete(save=False)
@@ -1,3 +1,255 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from analytics.jobs import run_import_job
+from analytics.models import CourseEnrollmentCount
+from core.models import School, Department, Course
+from core.tests import AsyncBudgetMixin
+from .checks import check_cache_is_shared
+from .enrollment import cohort_students, enroll_cohort
+from .models import Student, StudentCourse, StudentImportJob
+from .provisioning import import_students, read_rows
 
-# Create your tests here.
+SHEET = (
+    'roll_number,name,password,school,department,courses\n'
+    'CS001,Asha Renamed,,ENG,CS,CS301\n'
+    'CS002,Ravi,secret-2,Engineering,Computing,CS301\n'
+    'CS003,Meena,,ENG,CS,\n'
+    'CS002,Ravi again,secret-2,ENG,CS,\n'
+    'ADMIN,Admin,secret-3,ENG,CS,\n'
+    'CS004,Kiran,secret-4,ENG,CS,CS999\n'
+)
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(QUERY_BUDGETS_STRICT=True)
+class LookupQueryBudgetTests(AsyncBudgetMixin, TestCase):
+    """The registration lookups stay within their QUERY_BUDGETS, cold and cached"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = School.objects.create(name='Engineering', code='ENG')
+        cls.department = Department.objects.create(school=cls.school, name='Computing', code='CS')
+        Course.objects.create(department=cls.department, name='Databases', code='CS301', semester=1, year=2024)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_departments(self):
+        url = reverse('accounts:api_departments') + f'?school={self.school.id}'
+        for _ in range(2):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+
+    def test_courses(self):
+        url = reverse('accounts:api_courses') + f'?department={self.department.id}'
+        for _ in range(2):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+
+    def test_invalid_id(self):
+        response = self.client.get(reverse('accounts:api_courses') + '?department=abc')
+        self.assertEqual(response.json(), [])
+
+    async def test_lookups_async(self):
+        response = await self.aassertWithinBudget(reverse('accounts:api_departments') + f'?school={self.school.id}')
+        self.assertEqual(len(response.json()), 1)
+        response = await self.aassertWithinBudget(reverse('accounts:api_courses') + f'?department={self.department.id}')
+        self.assertEqual(len(response.json()), 1)
+
+
+class LookupConditionalTests(TestCase):
+    """The registration lookups answer a matching If-None-Match with 304 until the rows change"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = School.objects.create(name='Engineering', code='ENG')
+        cls.department = Department.objects.create(school=cls.school, name='Computing', code='CS')
+        Course.objects.create(department=cls.department, name='Databases', code='CS301', semester=1, year=2024)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_departments_not_modified(self):
+        url = reverse('accounts:api_departments') + f'?school={self.school.id}'
+        etag = self.client.get(url).headers['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response.headers['ETag'], etag)
+
+    def test_courses_changed(self):
+        url = reverse('accounts:api_courses') + f'?department={self.department.id}'
+        etag = self.client.get(url).headers['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Course.objects.create(department=self.department, name='Networks', code='CS302', semester=1, year=2024)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertEqual(len(response.json()), 2)
+
+
+class EnrollCohortTests(TestCase):
+    """A dry run reports exactly what the real run changes, and writes nothing"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = School.objects.create(name='Engineering', code='ENG')
+        cls.department = Department.objects.create(school=cls.school, name='Computing', code='CS')
+        cls.courses = [
+            Course.objects.create(department=cls.department, name=name, code=code, semester=1, year=2024)
+            for name, code in [('Databases', 'CS301'), ('Networks', 'CS302')]
+        ]
+        cls.students = []
+        for number in range(4):
+            student = Student.objects.create_user(f'CS{number:03}', f'Student {number}', 'pw')
+            student.school, student.department = cls.school, cls.department
+            student.save()
+            cls.students.append(student)
+        admin = Student.objects.create_superuser('ADMIN', 'Admin', 'pw')
+        admin.department = cls.department
+        admin.save()
+        StudentCourse.objects.create(student=cls.students[0], course=cls.courses[0])
+
+    def enrollments(self):
+        return sorted(StudentCourse.objects.values_list('student_id', 'course_id'))
+
+    def assertTotalsMatchEnrollments(self):
+        totals = {course.id: 0 for course in self.courses}
+        totals.update(CourseEnrollmentCount.objects.values_list('course_id', 'total'))
+        self.assertEqual(totals, {
+            course.id: StudentCourse.objects.filter(course=course).count() for course in self.courses
+        })
+
+    def test_enroll(self):
+        students = cohort_students(department=self.department, roll_to='CS002')
+        course_ids = [course.id for course in self.courses]
+        before = self.enrollments()
+
+        planned = enroll_cohort(students, course_ids, dry_run=True)
+        self.assertEqual(self.enrollments(), before)
+        self.assertEqual(len(planned), 5)
+        self.assertNotIn((self.students[0].id, self.courses[0].id), planned)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            added = enroll_cohort(students, course_ids)
+        self.assertEqual(sorted(added), sorted(planned))
+        self.assertEqual(self.enrollments(), sorted(before + planned))
+        self.assertTotalsMatchEnrollments()
+
+        self.assertEqual(enroll_cohort(students, course_ids, dry_run=True), [])
+        self.assertEqual(enroll_cohort(students, course_ids), [])
+
+    def test_unenroll(self):
+        students = cohort_students(school=self.school)
+        course_ids = [self.courses[0].id]
+        planned = enroll_cohort(students, course_ids, enroll=False, dry_run=True)
+        self.assertEqual(planned, [(self.students[0].id, self.courses[0].id)])
+        self.assertEqual(len(self.enrollments()), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            removed = enroll_cohort(students, course_ids, enroll=False)
+        self.assertEqual(removed, planned)
+        self.assertEqual(self.enrollments(), [])
+        self.assertTotalsMatchEnrollments()
+
+
+class CacheCheckTests(SimpleTestCase):
+    def error_ids(self):
+        return [error.id for error in check_cache_is_shared(None)]
+
+    @override_settings(CACHES=LOCMEM_CACHES, DEBUG=False, SESSION_ENGINE='django.contrib.sessions.backends.db', USER_CACHE_ENABLED=False)
+    def test_locmem_is_refused_in_production(self):
+        self.assertEqual(self.error_ids(), ['accounts.E003'])
+
+    @override_settings(CACHES=LOCMEM_CACHES, DEBUG=True, SESSION_ENGINE='django.contrib.sessions.backends.cached_db', USER_CACHE_ENABLED=True)
+    def test_cached_sessions_and_users_need_a_shared_cache(self):
+        self.assertEqual(self.error_ids(), ['accounts.E001', 'accounts.E002'])
+
+    def test_default_settings(self):
+        self.assertEqual(self.error_ids(), [])
+
+
+class StudentImportTests(TestCase):
+    """Importing a student sheet creates, updates and rejects rows as reported"""
+
+    @classmethod
+    def setUpTestData(cls):
+        school = School.objects.create(name='Engineering', code='ENG')
+        department = Department.objects.create(school=school, name='Computing', code='CS')
+        cls.course = Course.objects.create(department=department, name='Databases', code='CS301', semester=1, year=2024)
+        cls.existing = Student.objects.create_user('CS001', 'Asha', 'old-password')
+        Student.objects.create_superuser('ADMIN', 'Admin', 'pw')
+
+    def rows(self):
+        return read_rows(io.BytesIO(SHEET.encode()), 'students.csv')
+
+    def test_dry_run_writes_nothing(self):
+        result = import_students(self.rows(), dry_run=True)
+        self.assertEqual((result.created, result.updated), (['CS002'], ['CS001']))
+        self.assertFalse(Student.objects.filter(roll_number='CS002').exists())
+
+    def test_import(self):
+        result = import_students(self.rows())
+        self.assertEqual(result.created, ['CS002'])
+        self.assertEqual(result.updated, ['CS001'])
+        self.assertEqual([(line, roll_number) for line, roll_number, _ in result.rejected], [
+            (4, 'CS003'), (5, 'CS002'), (6, 'ADMIN'), (7, 'CS004'),
+        ])
+        self.assertEqual(result.enrollments, 2)
+
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.name, 'Asha Renamed')
+        self.assertTrue(self.existing.check_password('old-password'))
+        self.assertTrue(Student.objects.get(roll_number='CS002').check_password('secret-2'))
+        self.assertEqual(StudentCourse.objects.filter(course=self.course).count(), 2)
+
+        # Running the same sheet again updates both and adds no enrollments
+        again = import_students(self.rows())
+        self.assertEqual((again.created, again.updated, again.enrollments), ([], ['CS001', 'CS002'], 0))
+
+
+class StudentImportJobTests(TestCase):
+    """Uploaded sheets stay out of MEDIA_ROOT and are deleted once their job ends"""
+
+    def setUp(self):
+        School.objects.create(name='Engineering', code='ENG')
+        Department.objects.create(school=School.objects.get(), name='Computing', code='CS')
+        self.media_root = tempfile.mkdtemp()
+        self.private_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.addCleanup(shutil.rmtree, self.private_root)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root, PRIVATE_MEDIA_ROOT=self.private_root))
+
+    def create_job(self):
+        job = StudentImportJob(filename='students.csv')
+        job.sheet.save('students.csv', ContentFile(SHEET.encode()))
+        return job
+
+    def test_sheet_is_private_and_deleted_after_the_job(self):
+        job = self.create_job()
+        path = job.sheet.path
+        self.assertTrue(path.startswith(self.private_root))
+        self.assertTrue(os.path.exists(path))
+
+        self.assertTrue(run_import_job(job))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.created_count, job.rejected_count), ('done', 1, 5))
+        self.assertEqual(job.sheet.name, '')
+        self.assertFalse(os.path.exists(path))
+
+    def test_deleting_a_pending_job_deletes_its_sheet(self):
+        job = self.create_job()
+        path = job.sheet.path
+        job.delete()
+        self.assertFalse(os.path.exists(path))
@@ -0,0 +1,75 @@
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils.crypto import constant_time_compare
+
+def user_key(user_id):
+    return f'accounts:user:{user_id}'
+
+
+def _session_user(request):
+    """(user_id, backend_path, session_hash) stored by login(), or None for anonymous sessions"""
+    try:
+        user_id = get_user_model()._meta.pk.to_python(request.session[SESSION_KEY])
+        backend_path = request.session[BACKEND_SESSION_KEY]
+    except (KeyError, ValidationError):
+        return None
+    return user_id, backend_path, request.session.get(HASH_SESSION_KEY)
+
+
+def _can_authenticate(backend_path, user):
+    """The is_active check auth.get_user() gets from the backend's get_user()"""
+    backend = auth.load_backend(backend_path)
+    user_can_authenticate = getattr(backend, 'user_can_authenticate', None)
+    if user_can_authenticate is None:
+        return getattr(user, 'is_active', True)
+    return user_can_authenticate(user)
+
+
+def get_cached_user(request):
+    """
+    auth.get_user() with the Student row kept in the cache under its id.
+
+    A cached user is only returned when the session's password-hash version
+    still matches it and its backend still lets it authenticate, so a changed
+    password or a deactivated account logs the session out exactly as with the
+    database lookup. Anything else falls back to auth.get_user(), which
+    verifies the session against the database and may flush it. With
+    USER_CACHE_ENABLED off this is auth.get_user().
+    """
+    if not settings.USER_CACHE_ENABLED:
+        return auth.get_user(request)
+
+    session_user = _session_user(request)
+    if session_user is None:
+        return auth.get_user(request)
+
+    user_id, backend_path, session_hash = session_user
+    key = user_key(user_id)
+    user = cache.get(key)
+    if (
+        user is not None
+        and backend_path in settings.AUTHENTICATION_BACKENDS
+        and session_hash
+        and constant_time_compare(session_hash, user.get_session_auth_hash())
+        and _can_authenticate(backend_path, user)
+    ):
+        user.backend = backend_path
+        return user
+    if user is not None:
+        cache.delete(key)
+
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+    return user
+
+
+def invalidate_users(user_ids):
+    """Drop the cached rows of the given users once the current transaction commits"""
+    keys = [user_key(user_id) for user_id in set(user_ids)]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
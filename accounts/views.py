@@ -1,10 +1,12 @@
 from django.shortcuts import render, redirect
-from django.contrib.auth import login, logout, authenticate
+from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 from .forms import StudentRegistrationForm, StudentLoginForm
-from core.models import Department, Course
+from core import reference_data
 
 def register(request):
     if request.user.is_authenticated:
@@ -29,13 +31,12 @@ def user_login(request):
     if request.method == 'POST':
         form = StudentLoginForm(request, data=request.POST)
         if form.is_valid():
-            roll_number = form.cleaned_data.get('username')
-            password = form.cleaned_data.get('password')
-            user = authenticate(roll_number=roll_number, password=password)
-            if user is not None:
-                login(request, user)
-                messages.success(request, f'Welcome back, {user.name}!')
-                return redirect('forms_app:dashboard')
+            # The form has already authenticated the user; authenticating again
+            # would hash the password a second time
+            user = form.get_user()
+            login(request, user)
+            messages.success(request, f'Welcome back, {user.name}!')
+            return redirect('forms_app:dashboard')
     else:
         form = StudentLoginForm()
     
@@ -48,18 +49,33 @@ def user_logout(request):
     return redirect('accounts:login')
 
 # API Views for dynamic dropdowns
-def get_departments(request):
+# Async views: lookups are revalidated with ETags that come from the reference
+# cache, so an unchanged list is answered with 304 Not Modified without
+# touching the ORM, and a miss uses the async ORM without tying up a thread
+LOOKUP_MAX_AGE = 60
+
+async def _lookup_response(request, etag, load):
+    """Conditional GET handling of @condition plus the headers of @cache_control"""
+    response = None
+    if etag is not None:
+        etag = quote_etag(etag)
+        response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = JsonResponse(await load() if etag is not None else [], safe=False)
+    if etag is not None:
+        response.headers['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=LOOKUP_MAX_AGE)
+    return response
+
+async def get_departments(request):
     """API endpoint to get departments by school"""
-    school_id = request.GET.get('school')
-    if school_id:
-        departments = Department.objects.filter(school_id=school_id).values('id', 'name', 'code')
-        return JsonResponse(list(departments), safe=False)
-    return JsonResponse([], safe=False)
+    # Only a valid id reaches the cache keys; anything else gets an empty list
+    school_id = reference_data.parse_id(request.GET.get('school'))
+    etag = await reference_data.adepartments_etag(school_id) if school_id else None
+    return await _lookup_response(request, etag, lambda: reference_data.aget_departments(school_id))
 
-def get_courses(request):
+async def get_courses(request):
     """API endpoint to get courses by department"""
-    department_id = request.GET.get('department')
-    if department_id:
-        courses = Course.objects.filter(department_id=department_id).values('id', 'name', 'code')
-        return JsonResponse(list(courses), safe=False)
-    return JsonResponse([], safe=False)
\ No newline at end of file
+    department_id = reference_data.parse_id(request.GET.get('department'))
+    etag = await reference_data.acourses_etag(department_id) if department_id else None
+    return await _lookup_response(request, etag, lambda: reference_data.aget_courses(department_id))
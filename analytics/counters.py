@@ -0,0 +1,169 @@
+import threading
+from django.db import transaction
+from django.db.models import Count, F
+from forms_app.models import FormSubmission, Response
+from .increments import upsert_increments
+from .models import OptionResponseCount, FormSubmissionCount
+from . import statistics, progress
+
+
+def record_submission(submission, option_answers, scores=None):
+    """
+    Add a new submission to the counters, question statistics and submission buckets.
+
+    option_answers is a list of (question_id, option_id) pairs picked in the
+    submission; scores is the optional statistics.option_scores() of the form.
+    Must be called inside the transaction that creates it.
+    """
+    _increment_form_total(submission.form_id, 1)
+    _increment_option_counts(option_answers, 1)
+    statistics.record_answers(submission.form, option_answers, scores, 1)
+    progress.record_submission(submission, 1)
+
+
+def discard_submission(submission):
+    """Remove a submission (about to be deleted) from the counters, statistics and buckets"""
+    option_answers = list(
+        submission.responses.filter(
+            mcq_answer__isnull=False
+        ).values_list('question_id', 'mcq_answer_id')
+    )
+    _increment_form_total(submission.form_id, -1)
+    _increment_option_counts(option_answers, -1)
+    statistics.record_answers(submission.form, option_answers, step=-1)
+    progress.record_submission(submission, -1)
+
+
+_pending = threading.local()
+
+
+def rebuild_forms_on_commit(form_ids):
+    """
+    Rebuild the counters, statistics and buckets of the forms once the current
+    transaction commits. Used when a cascade deletes too many submissions to
+    take them out one at a time, or when questions or options change how a
+    form is scored; forms queued several times in the same transaction are
+    rebuilt together.
+    """
+    pending = getattr(_pending, 'form_ids', None)
+    if pending is None:
+        pending = _pending.form_ids = set()
+    pending.update(form_ids)
+    transaction.on_commit(_rebuild_pending_forms)
+
+
+def _rebuild_pending_forms():
+    form_ids = getattr(_pending, 'form_ids', None)
+    _pending.form_ids = None
+    if form_ids:
+        form_ids = sorted(form_ids)
+        rebuild(form_ids)
+        statistics.rebuild(form_ids)
+        progress.rebuild(form_ids)
+
+
+def _increment_form_total(form_id, step):
+    if step > 0:
+        # Creates the counter on the form's first submission in the same statement
+        upsert_increments(FormSubmissionCount, ['form_id'], [{'form_id': form_id, 'total': step}], ['total'])
+        return
+    FormSubmissionCount.objects.filter(form_id=form_id, total__gte=-step).update(total=F('total') + step)
+
+
+def _increment_option_counts(option_answers, step):
+    if not option_answers:
+        return
+
+    if step > 0:
+        # Each option appears at most once per submission, so one upsert covers them all
+        upsert_increments(OptionResponseCount, ['question_id', 'mcq_option_id'], [
+            {'question_id': question_id, 'mcq_option_id': option_id, 'count': step}
+            for question_id, option_id in option_answers
+        ], ['count'])
+        return
+    OptionResponseCount.objects.filter(
+        mcq_option_id__in=[option_id for _, option_id in option_answers],
+        count__gte=-step
+    ).update(count=F('count') + step)
+
+
+def submission_total(form):
+    """Return the number of submissions of a form from the counter table"""
+    counter = FormSubmissionCount.objects.filter(form=form).values_list('total', flat=True).first()
+    return counter or 0
+
+
+def count_from_responses(forms=None):
+    """
+    Recount everything from the raw Response and FormSubmission tables.
+
+    Returns ({(question_id, option_id): count}, {form_id: total}).
+    """
+    responses = Response.objects.filter(mcq_answer__isnull=False)
+    submissions = FormSubmission.objects.all()
+    if forms is not None:
+        responses = responses.filter(question__form__in=forms)
+        submissions = submissions.filter(form__in=forms)
+
+    option_rows = responses.values('question_id', 'mcq_answer_id').annotate(count=Count('id')).order_by()
+    form_rows = submissions.values('form_id').annotate(total=Count('id')).order_by()
+
+    option_counts = {(row['question_id'], row['mcq_answer_id']): row['count'] for row in option_rows}
+    form_totals = {row['form_id']: row['total'] for row in form_rows}
+    return option_counts, form_totals
+
+
+def stored_counts(forms=None):
+    """Return the counter tables in the same shape as count_from_responses"""
+    option_counters = OptionResponseCount.objects.filter(count__gt=0)
+    form_counters = FormSubmissionCount.objects.filter(total__gt=0)
+    if forms is not None:
+        option_counters = option_counters.filter(question__form__in=forms)
+        form_counters = form_counters.filter(form__in=forms)
+
+    option_counts = {
+        (question_id, option_id): count
+        for question_id, option_id, count in option_counters.values_list('question_id', 'mcq_option_id', 'count')
+    }
+    form_totals = dict(form_counters.values_list('form_id', 'total'))
+    return option_counts, form_totals
+
+
+def find_mismatches(forms=None):
+    """Compare counters against the raw tables and return a list of (key, stored, actual)"""
+    actual_options, actual_forms = count_from_responses(forms)
+    stored_options, stored_forms = stored_counts(forms)
+
+    mismatches = []
+    for key in sorted(set(actual_options) | set(stored_options)):
+        if actual_options.get(key, 0) != stored_options.get(key, 0):
+            mismatches.append((('option',) + key, stored_options.get(key, 0), actual_options.get(key, 0)))
+    for form_id in sorted(set(actual_forms) | set(stored_forms)):
+        if actual_forms.get(form_id, 0) != stored_forms.get(form_id, 0):
+            mismatches.append((('form', form_id), stored_forms.get(form_id, 0), actual_forms.get(form_id, 0)))
+    return mismatches
+
+
+def rebuild(forms=None):
+    """Replace the counters with fresh counts from the raw tables"""
+    with transaction.atomic():
+        option_counts, form_totals = count_from_responses(forms)
+
+        option_counters = OptionResponseCount.objects.all()
+        form_counters = FormSubmissionCount.objects.all()
+        if forms is not None:
+            option_counters = option_counters.filter(question__form__in=forms)
+            form_counters = form_counters.filter(form__in=forms)
+        option_counters.delete()
+        form_counters.delete()
+
+        OptionResponseCount.objects.bulk_create([
+            OptionResponseCount(question_id=question_id, mcq_option_id=option_id, count=count)
+            for (question_id, option_id), count in option_counts.items()
+        ], batch_size=1000)
+        FormSubmissionCount.objects.bulk_create([
+            FormSubmissionCount(form_id=form_id, total=total)
+            for form_id, total in form_totals.items()
+        ], batch_size=1000)
+
+    return len(option_counts), len(form_totals)
@@ -0,0 +1,273 @@
+import re
+import tempfile
+import zipfile
+from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from forms_app.models import Response
+from .counters import submission_total
+from .models import FormSubmissionCount
+from .results import build_form_results, build_results_for_forms
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Style objects are shared by every cell instead of being rebuilt per row
+HEADER_FILL = PatternFill(start_color="6366F1", end_color="6366F1", fill_type="solid")
+HEADER_FONT = Font(bold=True, color="FFFFFF", size=12)
+TITLE_FONT = Font(bold=True, size=16, color="6366F1")
+BOLD_FONT = Font(bold=True)
+THIN_BORDER = Border(
+    left=Side(style='thin'),
+    right=Side(style='thin'),
+    top=Side(style='thin'),
+    bottom=Side(style='thin')
+)
+CENTER = Alignment(horizontal='center', vertical='center')
+WRAP_TOP = Alignment(wrap_text=True, vertical='top')
+
+TEXT_CHUNK_SIZE = 2000
+INVALID_SHEET_CHARS = re.compile(r'[\[\]:*?/\\]')
+
+
+def styled_cell(ws, value, font=None, fill=None, border=None, alignment=None):
+    """Build a write-only cell carrying the given shared styles"""
+    cell = WriteOnlyCell(ws, value=value)
+    if font:
+        cell.font = font
+    if fill:
+        cell.fill = fill
+    if border:
+        cell.border = border
+    if alignment:
+        cell.alignment = alignment
+    return cell
+
+
+def set_widths(ws, widths):
+    """Set column widths on a write-only sheet; must run before the first row is appended"""
+    for column, width in widths.items():
+        ws.column_dimensions[column].width = width
+
+
+def append_header(ws, titles):
+    ws.append([
+        styled_cell(ws, title, font=HEADER_FONT, fill=HEADER_FILL, border=THIN_BORDER, alignment=CENTER)
+        for title in titles
+    ])
+
+
+def question_label(question):
+    return f"Q{question.order}: {question.question_text}"
+
+
+def summary_rows(form, total_submissions):
+    return [
+        ("Form Title:", form.title),
+        ("Course:", f"{form.course.code} - {form.course.name}"),
+        ("Teacher:", form.teacher.name),
+        ("Department:", form.course.department.name),
+        ("School:", form.course.department.school.name),
+        ("Total Submissions:", total_submissions),
+        ("Generated On:", datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+    ]
+
+
+def write_summary_sheet(wb, form, total_submissions, title="Summary"):
+    ws = wb.create_sheet(title)
+    set_widths(ws, {'A': 20, 'B': 50})
+
+    ws.append([styled_cell(ws, "Feedback Report", font=TITLE_FONT)])
+    ws.append([])
+    for label, value in summary_rows(form, total_submissions):
+        ws.append([styled_cell(ws, label, font=BOLD_FONT), value])
+    return ws
+
+
+def write_mcq_sheet(wb, results, title="MCQ Results"):
+    ws = wb.create_sheet(title)
+    set_widths(ws, {'A': 50, 'B': 40, 'C': 12, 'D': 12})
+    append_mcq_rows(ws, results)
+    return ws
+
+
+def append_mcq_rows(ws, results):
+    append_header(ws, ["Question", "Option", "Count", "Percentage"])
+    for result in results:
+        if result['question'].question_type != 'mcq':
+            continue
+        total_responses = result['total_responses']
+        for idx, item in enumerate(result['data']):
+            # Write-only sheets cannot merge cells, so the question is only written on its first row
+            label = question_label(result['question']) if idx == 0 else None
+            if total_responses > 0:
+                percentage = f"{(item['count'] / total_responses) * 100:.1f}%"
+            else:
+                percentage = "0%"
+            ws.append([
+                styled_cell(ws, label, font=BOLD_FONT, border=THIN_BORDER),
+                styled_cell(ws, item['mcq_answer__option_text'], border=THIN_BORDER),
+                styled_cell(ws, item['count'], border=THIN_BORDER),
+                styled_cell(ws, percentage, border=THIN_BORDER),
+            ])
+        ws.append([])  # Empty row between questions
+
+
+def iter_text_answers(forms):
+    """
+    Yield (form_id, question_id, student_name, text, submitted_at) for the given
+    forms, grouped by form, without loading all rows into memory.
+    """
+    return Response.objects.filter(
+        question__form__in=forms,
+        question__question_type='text'
+    ).exclude(
+        text_answer=''
+    ).order_by(
+        'question__form_id', 'question__order', 'question_id', 'submission__submitted_at'
+    ).values_list(
+        'question__form_id',
+        'question_id',
+        'submission__student__name',
+        'text_answer',
+        'submission__submitted_at'
+    ).iterator(chunk_size=TEXT_CHUNK_SIZE)
+
+
+def write_text_sheet(wb, results, text_rows, title="Text Responses"):
+    ws = wb.create_sheet(title)
+    set_widths(ws, {'A': 50, 'B': 25, 'C': 60, 'D': 18})
+    append_text_rows(ws, results, text_rows)
+    return ws
+
+
+def append_text_rows(ws, results, text_rows):
+    append_header(ws, ["Question", "Student", "Response", "Submitted On"])
+    labels = {result['question'].id: question_label(result['question']) for result in results}
+    for _, question_id, student_name, text_answer, submitted_at in text_rows:
+        ws.append([
+            styled_cell(ws, labels[question_id], border=THIN_BORDER),
+            styled_cell(ws, student_name, border=THIN_BORDER),
+            styled_cell(ws, text_answer, border=THIN_BORDER, alignment=WRAP_TOP),
+            styled_cell(ws, submitted_at.strftime("%Y-%m-%d %H:%M"), border=THIN_BORDER),
+        ])
+
+
+def write_form_workbook(form, fileobj):
+    """
+    Write the feedback report of a form to fileobj using a write-only workbook.
+
+    Rows are flushed to temporary files as they are appended, so memory use
+    does not grow with the number of submissions.
+    """
+    wb = Workbook(write_only=True)
+    results = build_form_results(form, include_text=False)
+    write_summary_sheet(wb, form, submission_total(form))
+    write_mcq_sheet(wb, results)
+    write_text_sheet(wb, results, iter_text_answers([form.id]))
+    wb.save(fileobj)
+
+
+def form_workbook_file(form):
+    """Return an open temporary file positioned at the start of the form's report"""
+    fileobj = tempfile.TemporaryFile()
+    write_form_workbook(form, fileobj)
+    fileobj.seek(0)
+    return fileobj
+
+
+def report_filename(form):
+    return f"Feedback_{form.course.code}_{form.teacher.name.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.xlsx"
+
+
+def sheet_title(form, used_titles):
+    """Return a unique Excel-safe sheet title (at most 31 characters) for a form"""
+    base = INVALID_SHEET_CHARS.sub('-', f"{form.course.code} {form.teacher.name}")[:31]
+    title, suffix = base, 2
+    while title.lower() in used_titles:
+        marker = f" ({suffix})"
+        title = base[:31 - len(marker)] + marker
+        suffix += 1
+    used_titles.add(title.lower())
+    return title
+
+
+def write_form_report_sheet(wb, form, total_submissions, results, text_rows, title):
+    """Write the whole report of one form (summary, MCQ counts, text answers) to a single sheet"""
+    ws = wb.create_sheet(title)
+    set_widths(ws, {'A': 50, 'B': 40, 'C': 60, 'D': 18})
+
+    ws.append([styled_cell(ws, form.title, font=TITLE_FONT)])
+    for label, value in summary_rows(form, total_submissions):
+        ws.append([styled_cell(ws, label, font=BOLD_FONT), value])
+    ws.append([])
+    append_mcq_rows(ws, results)
+    ws.append([])
+    append_text_rows(ws, results, text_rows)
+    return ws
+
+
+def text_rows_by_form(form_ids, rows):
+    """Split one ordered text answer iterator into (form_id, rows) pairs following form_ids"""
+    groups = groupby(rows, key=itemgetter(0))
+    current = next(groups, None)
+    for form_id in form_ids:
+        if current is not None and current[0] == form_id:
+            yield form_id, current[1]
+            current = next(groups, None)
+        else:
+            yield form_id, iter(())
+
+
+def write_bulk_report(forms, fileobj, output_format='xlsx', progress=None):
+    """
+    Write the reports of many forms in one batched pass over the data.
+
+    output_format 'xlsx' writes one workbook with a sheet per form; 'zip' writes
+    a ZIP archive with one workbook per form. progress, if given, is called with
+    the number of forms written so far.
+    """
+    forms = list(forms.select_related(
+        'course', 'teacher', 'course__department', 'course__department__school'
+    ).order_by('id'))
+    form_ids = [form.id for form in forms]
+    forms_by_id = {form.id: form for form in forms}
+
+    results = build_results_for_forms(form_ids)
+    totals = dict(FormSubmissionCount.objects.filter(form_id__in=form_ids).values_list('form_id', 'total'))
+    text_rows = text_rows_by_form(form_ids, iter_text_answers(form_ids))
+
+    if output_format == 'zip':
+        archive = zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_STORED)
+    else:
+        archive = None
+        wb = Workbook(write_only=True)
+        used_titles = set()
+
+    for done, (form_id, rows) in enumerate(text_rows, 1):
+        form = forms_by_id[form_id]
+        form_results = results.get(form_id, [])
+        total = totals.get(form_id, 0)
+
+        if archive is not None:
+            # Workbooks are already compressed, so they are stored as-is in the archive
+            form_wb = Workbook(write_only=True)
+            write_summary_sheet(form_wb, form, total)
+            write_mcq_sheet(form_wb, form_results)
+            write_text_sheet(form_wb, form_results, rows)
+            with archive.open(f"{form.id}_{report_filename(form)}", 'w') as entry:
+                form_wb.save(entry)
+        else:
+            write_form_report_sheet(wb, form, total, form_results, rows, sheet_title(form, used_titles))
+
+        if progress:
+            progress(done)
+
+    if archive is not None:
+        archive.close()
+    else:
+        if not forms:
+            wb.create_sheet("No Forms")
+        wb.save(fileobj)
@@ -0,0 +1,50 @@
+from django.db import connections, router
+
+
+def upsert_increments(model, unique_fields, rows, increment_fields, replace_fields=(), max_fields=()):
+    """
+    Add rows to a counter table with a single INSERT ... ON CONFLICT DO UPDATE.
+
+    Each row is a dict of field values (attnames, e.g. 'form_id') holding
+    everything a new row needs. A row whose unique_fields already exist has its
+    increment_fields raised by the row's values, its replace_fields
+    overwritten and its max_fields raised to the row's value if that is
+    larger; its other fields are left alone. This is one statement whether or
+    not the rows exist yet, and concurrent submissions cannot lose an
+    increment. Returns the number of rows written.
+    """
+    if not rows:
+        return 0
+
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    fields = [model._meta.get_field(name) for name in rows[0]]
+
+    placeholders = '(' + ', '.join(['%s'] * len(fields)) + ')'
+    params = [
+        field.get_db_prep_save(row[field.attname], connection)
+        for row in rows
+        for field in fields
+    ]
+    assignments = [
+        f'{quote(column)} = {table}.{quote(column)} + EXCLUDED.{quote(column)}'
+        for column in (model._meta.get_field(name).column for name in increment_fields)
+    ] + [
+        f'{quote(column)} = EXCLUDED.{quote(column)}'
+        for column in (model._meta.get_field(name).column for name in replace_fields)
+    ] + [
+        f'{quote(column)} = CASE WHEN EXCLUDED.{quote(column)} > {table}.{quote(column)} '
+        f'THEN EXCLUDED.{quote(column)} ELSE {table}.{quote(column)} END'
+        for column in (model._meta.get_field(name).column for name in max_fields)
+    ]
+
+    sql = (
+        f'INSERT INTO {table} ({", ".join(quote(field.column) for field in fields)}) '
+        f'VALUES {", ".join([placeholders] * len(rows))} '
+        f'ON CONFLICT ({", ".join(quote(model._meta.get_field(name).column) for name in unique_fields)}) '
+        f'DO UPDATE SET {", ".join(assignments)}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+    return len(rows)
@@ -0,0 +1,158 @@
+import logging
+import tempfile
+from datetime import timedelta
+from django.conf import settings
+from django.core.files import File
+from django.db.models import F
+from django.utils import timezone
+from accounts.models import StudentImportJob
+from accounts.provisioning import read_rows, import_students
+from forms_app.models import FeedbackForm
+from .exports import write_bulk_report
+from .models import ReportExportJob
+
+logger = logging.getLogger(__name__)
+
+# A job whose worker died is retried this many times in all before it is marked failed
+MAX_ATTEMPTS = 3
+
+SCOPE_FILTERS = {
+    'school': 'course__department__school_id',
+    'department': 'course__department_id',
+    'course': 'course_id',
+}
+
+
+def forms_for_scope(scope, scope_id):
+    return FeedbackForm.objects.filter(**{SCOPE_FILTERS[scope]: scope_id})
+
+
+def requeue_stale_jobs(model=ReportExportJob):
+    """
+    Put running jobs that have not sent a heartbeat for JOB_TIMEOUT seconds
+    back in the queue, or fail them after MAX_ATTEMPTS. Returns the number of
+    jobs changed.
+    """
+    now = timezone.now()
+    stale = model.objects.filter(
+        status='running',
+        heartbeat_at__lt=now - timedelta(seconds=settings.JOB_TIMEOUT)
+    )
+    given_up = list(stale.filter(attempts__gte=MAX_ATTEMPTS).values_list('pk', flat=True))
+    failed = model.objects.filter(pk__in=given_up).update(
+        status='failed',
+        error='The worker stopped responding.',
+        finished_at=now
+    )
+    if model is StudentImportJob:
+        for job in StudentImportJob.objects.filter(pk__in=given_up).exclude(sheet=''):
+            _finish_import(job)
+    requeued = stale.update(status='pending', started_at=None, heartbeat_at=None)
+    if failed or requeued:
+        logger.warning('Re-queued %s and failed %s stale %s(s)', requeued, failed, model._meta.verbose_name)
+    return failed + requeued
+
+
+def claim_next_job(model=ReportExportJob):
+    """Atomically mark the oldest pending job of a job model as running and return it, or None"""
+    requeue_stale_jobs(model)
+    for job in model.objects.filter(status='pending').order_by('created_at')[:5]:
+        now = timezone.now()
+        claimed = model.objects.filter(pk=job.pk, status='pending').update(
+            status='running',
+            started_at=now,
+            heartbeat_at=now,
+            attempts=F('attempts') + 1
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+
+def run_job(job):
+    """Build the bulk report of a claimed job and store it under MEDIA_ROOT"""
+    forms = forms_for_scope(job.scope, job.scope_id)
+    total_forms = forms.count()
+    ReportExportJob.objects.filter(pk=job.pk).update(
+        total_forms=total_forms,
+        processed_forms=0,
+        heartbeat_at=timezone.now()
+    )
+
+    def progress(done):
+        ReportExportJob.objects.filter(pk=job.pk).update(processed_forms=done, heartbeat_at=timezone.now())
+
+    try:
+        with tempfile.TemporaryFile() as fileobj:
+            write_bulk_report(forms, fileobj, output_format=job.output_format, progress=progress)
+            fileobj.seek(0)
+            name = f"Feedback_{job.scope}_{job.scope_id}_{timezone.now().strftime('%Y%m%d%H%M%S')}.{job.output_format}"
+            job.file.save(name, File(fileobj), save=False)
+    except Exception as e:
+        logger.exception('Report export job %s failed', job.pk)
+        ReportExportJob.objects.filter(pk=job.pk).update(
+            status='failed',
+            error=str(e),
+            finished_at=timezone.now()
+        )
+        return False
+
+    ReportExportJob.objects.filter(pk=job.pk).update(
+        status='done',
+        file=job.file.name,
+        processed_forms=total_forms,
+        finished_at=timezone.now()
+    )
+    return True
+
+
+def run_import_job(job):
+    """Import the student sheet of a claimed StudentImportJob, then delete the sheet"""
+    def progress(done):
+        StudentImportJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now())
+
+    try:
+        with job.sheet.open('rb') as fileobj:
+            result = import_students(read_rows(fileobj, job.sheet.name), progress=progress)
+    except Exception as e:
+        logger.exception('Student import job %s failed', job.pk)
+        _finish_import(job, status='failed', error=str(e))
+        return False
+
+    _finish_import(
+        job,
+        status='done',
+        created_count=len(result.created),
+        updated_count=len(result.updated),
+        rejected_count=len(result.rejected),
+        enrollments=result.enrollments,
+        report='\n'.join(
+            f'Line {line} ({roll_number or "no roll number"}): {reason}'
+            for line, roll_number, reason in result.rejected
+        )
+    )
+    return True
+
+
+def _finish_import(job, **fields):
+    # The sheet holds plain-text passwords, so it is not kept once the job ends
+    if job.sheet:
+        job.sheet.delete(save=False)
+    StudentImportJob.objects.filter(pk=job.pk).update(sheet='', finished_at=timezone.now(), **fields)
+
+
+# Job models the worker polls, in order, with the function that runs a claimed job
+RUNNERS = (
+    (ReportExportJob, run_job),
+    (StudentImportJob, run_import_job),
+)
+
+
+def claim_any_job():
+    """Claim the next job of any kind; returns (job, runner) or (None, None)"""
+    for model, runner in RUNNERS:
+        job = claim_next_job(model)
+        if job is not None:
+            return job, runner
+    return None, None
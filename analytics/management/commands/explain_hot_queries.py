@@ -0,0 +1,64 @@
+import json
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from core import reference_data
+from core.models import Course
+from forms_app.models import FeedbackForm, FormSubmission, Response
+
+
+def hot_queries():
+    """The lookups that run on every result page, dashboard and registration request"""
+    question_id = Response.objects.values_list('question_id', flat=True).first() or 1
+    form = FeedbackForm.objects.values('id', 'course_id').first() or {'id': 1, 'course_id': 1}
+    student_id = FormSubmission.objects.values_list('student_id', flat=True).first() or 1
+    department_id = Course.objects.values_list('department_id', flat=True).first() or 1
+
+    return {
+        'option_counts': Response.objects.filter(
+            question_id=question_id, mcq_answer__isnull=False
+        ).values('mcq_answer_id').annotate(count=Count('id')).order_by(),
+        'active_forms_for_course': FeedbackForm.objects.filter(
+            is_active=True, course_id=form['course_id']
+        ),
+        'submitted_forms_of_student': FormSubmission.objects.filter(
+            student_id=student_id
+        ).values_list('form_id', flat=True).order_by(),
+        'text_answers_by_time': Response.objects.filter(
+            question_id=question_id
+        ).exclude(text_answer='').order_by('submission__submitted_at').values_list('text_answer'),
+        'courses_of_department': reference_data.department_courses(department_id),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Capture the query plans of the hot lookup paths, optionally comparing them with a saved baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Write the plans as JSON to this file')
+        parser.add_argument('--baseline', help='JSON file from an earlier run to print next to the current plans')
+
+    def handle(self, *args, **options):
+        plans = {
+            name: {'sql': str(queryset.query), 'plan': queryset.explain()}
+            for name, queryset in hot_queries().items()
+        }
+
+        baseline = {}
+        if options['baseline']:
+            with open(options['baseline']) as fh:
+                baseline = json.load(fh)
+
+        for name, captured in plans.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            if name in baseline:
+                self.stdout.write('  before:')
+                for line in baseline[name]['plan'].splitlines():
+                    self.stdout.write(f'    {line}')
+                self.stdout.write('  after:')
+            for line in captured['plan'].splitlines():
+                self.stdout.write(f'    {line}')
+
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(plans, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Plans written to {options["output"]}'))
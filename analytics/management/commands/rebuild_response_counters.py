@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from forms_app.models import FeedbackForm
+from analytics import counters, statistics, progress
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the response counters, question statistics, teacher rollups and submission progress from the raw tables and verify them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--form', type=int, action='append', dest='form_ids',
+            help='Only rebuild the counters of this form id (may be repeated)'
+        )
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only compare the counters against the raw tables, do not rebuild'
+        )
+
+    def handle(self, *args, **options):
+        forms = None
+        if options['form_ids']:
+            forms = FeedbackForm.objects.filter(id__in=options['form_ids'])
+
+        if not options['check']:
+            option_rows, form_rows = counters.rebuild(forms)
+            self.stdout.write(f'Rebuilt {option_rows} option counter(s) and {form_rows} form total(s).')
+            question_rows = statistics.rebuild(forms)
+            self.stdout.write(f'Rebuilt the statistics of {question_rows} question(s) and their teacher rollups.')
+            bucket_rows, course_rows = progress.rebuild(forms)
+            self.stdout.write(f'Rebuilt {bucket_rows} submission bucket(s) and {course_rows} course enrollment total(s).')
+
+        mismatches = counters.find_mismatches(forms)
+        for key, stored, actual in mismatches:
+            self.stdout.write(f'Mismatch {key}: stored {stored}, actual {actual}')
+
+        if mismatches:
+            raise CommandError(f'{len(mismatches)} counter(s) do not match the responses table.')
+        self.stdout.write(self.style.SUCCESS('Counters match the responses table.'))
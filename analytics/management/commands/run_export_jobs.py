@@ -0,0 +1,32 @@
+import time
+from django.core.management.base import BaseCommand
+from analytics import jobs
+
+
+class Command(BaseCommand):
+    help = 'Background worker that builds pending bulk report exports and runs student sheet imports'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Process the pending jobs and exit instead of polling forever'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=5.0,
+            help='Seconds to wait between polls when there is nothing to do'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            job, runner = jobs.claim_any_job()
+            if job is None:
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
+                continue
+
+            self.stdout.write(f'Running {job._meta.verbose_name} {job.pk} ({job})')
+            if runner(job):
+                self.stdout.write(self.style.SUCCESS(f'{job._meta.verbose_name.capitalize()} {job.pk} finished.'))
+            else:
+                self.stdout.write(self.style.ERROR(f'{job._meta.verbose_name.capitalize()} {job.pk} failed.'))
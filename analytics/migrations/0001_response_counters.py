@@ -0,0 +1,63 @@
+# Generated by Django 4.2.4 on 2026-10-17 02:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+
+def backfill_counters(apps, schema_editor):
+    Response = apps.get_model('forms_app', 'Response')
+    FormSubmission = apps.get_model('forms_app', 'FormSubmission')
+    OptionResponseCount = apps.get_model('analytics', 'OptionResponseCount')
+    FormSubmissionCount = apps.get_model('analytics', 'FormSubmissionCount')
+
+    option_rows = Response.objects.filter(
+        mcq_answer__isnull=False
+    ).values('question_id', 'mcq_answer_id').annotate(count=Count('id')).order_by()
+    OptionResponseCount.objects.bulk_create([
+        OptionResponseCount(question_id=row['question_id'], mcq_option_id=row['mcq_answer_id'], count=row['count'])
+        for row in option_rows
+    ], batch_size=1000)
+
+    form_rows = FormSubmission.objects.values('form_id').annotate(total=Count('id')).order_by()
+    FormSubmissionCount.objects.bulk_create([
+        FormSubmissionCount(form_id=row['form_id'], total=row['total'])
+        for row in form_rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('forms_app', '0003_formtemplate_templatequestion_templateoption_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FormSubmissionCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('form', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='submission_total', to='forms_app.feedbackform')),
+            ],
+            options={
+                'db_table': 'form_submission_counts',
+            },
+        ),
+        migrations.CreateModel(
+            name='OptionResponseCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('mcq_option', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='response_counts', to='forms_app.mcqoption')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='option_counts', to='forms_app.question')),
+            ],
+            options={
+                'db_table': 'option_response_counts',
+                'unique_together': {('question', 'mcq_option')},
+            },
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
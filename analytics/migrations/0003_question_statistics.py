@@ -0,0 +1,99 @@
+# Generated by Django 4.2.4 on 2026-10-17 02:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+import numpy as np
+
+# Frozen copies of analytics.statistics as of this migration, so later changes
+# to the application code cannot change what the backfill computes
+MOMENT_FIELDS = ('responses', 'score_sum', 'score_sq_sum', 'top_box', 'bottom_box')
+
+
+def moments_from_counts(counts, scales):
+    scales = np.asarray(scales, dtype=np.int64)
+    counts = np.asarray(counts, dtype=np.int64).reshape(len(scales), -1)
+    scores = np.arange(1, counts.shape[1] + 1)
+    rows = np.arange(len(scales))
+    return {
+        'responses': counts.sum(axis=1),
+        'score_sum': counts @ scores,
+        'score_sq_sum': counts @ (scores * scores),
+        'top_box': counts[rows, np.maximum(scales - 1, 0)] * (scales > 0),
+        'bottom_box': (counts * (scores[None, :] <= (scales // 2)[:, None])).sum(axis=1),
+    }
+
+
+def backfill_statistics(apps, schema_editor):
+    Question = apps.get_model('forms_app', 'Question')
+    MCQOption = apps.get_model('forms_app', 'MCQOption')
+    OptionResponseCount = apps.get_model('analytics', 'OptionResponseCount')
+    QuestionStatistic = apps.get_model('analytics', 'QuestionStatistic')
+
+    question_rows = list(Question.objects.filter(question_type='mcq').values_list(
+        'id', 'form_id', 'form__teacher_id', 'form__course__department_id', 'order'
+    ))
+    if not question_rows:
+        return
+    position = {row[0]: index for index, row in enumerate(question_rows)}
+
+    # Score of each option: its 1-based position in option order
+    scores = {}
+    scales = [0] * len(question_rows)
+    for question_id, option_id in MCQOption.objects.order_by('question_id', 'order', 'id').values_list('question_id', 'id'):
+        if question_id in position:
+            scales[position[question_id]] += 1
+            scores[option_id] = scales[position[question_id]]
+
+    matrix = np.zeros((len(question_rows), max(max(scales), 1)), dtype=np.int64)
+    for question_id, option_id, count in OptionResponseCount.objects.values_list('question_id', 'mcq_option_id', 'count'):
+        if question_id in position and option_id in scores:
+            matrix[position[question_id], scores[option_id] - 1] = count
+    moments = moments_from_counts(matrix, scales)
+
+    QuestionStatistic.objects.bulk_create([
+        QuestionStatistic(
+            question_id=question_id,
+            form_id=form_id,
+            teacher_id=teacher_id,
+            department_id=department_id,
+            question_order=order,
+            scale=scales[index],
+            **{field: int(moments[field][index]) for field in MOMENT_FIELDS}
+        )
+        for index, (question_id, form_id, teacher_id, department_id, order) in enumerate(question_rows)
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_course_department_name_idx'),
+        ('forms_app', '0005_hot_path_indexes'),
+        ('analytics', '0002_report_export_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question_order', models.IntegerField(default=0)),
+                ('scale', models.PositiveSmallIntegerField(default=0)),
+                ('responses', models.PositiveIntegerField(default=0)),
+                ('score_sum', models.PositiveBigIntegerField(default=0)),
+                ('score_sq_sum', models.PositiveBigIntegerField(default=0)),
+                ('top_box', models.PositiveIntegerField(default=0)),
+                ('bottom_box', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_statistics', to='core.department')),
+                ('form', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_statistics', to='forms_app.feedbackform')),
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='statistics', to='forms_app.question')),
+                ('teacher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_statistics', to='forms_app.teacher')),
+            ],
+            options={
+                'db_table': 'question_statistics',
+                'indexes': [models.Index(fields=['department', 'question_order'], name='stat_department_order_idx'), models.Index(fields=['department', 'teacher'], name='stat_department_teacher_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_statistics, migrations.RunPython.noop),
+    ]
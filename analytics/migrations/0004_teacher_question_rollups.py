@@ -0,0 +1,63 @@
+# Generated by Django 4.2.4 on 2026-10-17 02:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Max, Sum
+
+MOMENT_FIELDS = ('responses', 'score_sum', 'score_sq_sum', 'top_box', 'bottom_box')
+
+
+def backfill_rollups(apps, schema_editor):
+    QuestionStatistic = apps.get_model('analytics', 'QuestionStatistic')
+    TeacherQuestionRollup = apps.get_model('analytics', 'TeacherQuestionRollup')
+
+    pooled = QuestionStatistic.objects.values('teacher_id', 'form__course_id', 'department_id', 'question_order').annotate(
+        max_scale=Max('scale'),
+        **{field + '_total': Sum(field) for field in MOMENT_FIELDS}
+    ).order_by()
+    TeacherQuestionRollup.objects.bulk_create([
+        TeacherQuestionRollup(
+            teacher_id=row['teacher_id'],
+            course_id=row['form__course_id'],
+            department_id=row['department_id'],
+            question_order=row['question_order'],
+            scale=row['max_scale'],
+            **{field: row[field + '_total'] for field in MOMENT_FIELDS}
+        )
+        for row in pooled
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_course_department_name_idx'),
+        ('forms_app', '0005_hot_path_indexes'),
+        ('analytics', '0003_question_statistics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeacherQuestionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question_order', models.IntegerField(default=0)),
+                ('scale', models.PositiveSmallIntegerField(default=0)),
+                ('responses', models.PositiveIntegerField(default=0)),
+                ('score_sum', models.PositiveBigIntegerField(default=0)),
+                ('score_sq_sum', models.PositiveBigIntegerField(default=0)),
+                ('top_box', models.PositiveIntegerField(default=0)),
+                ('bottom_box', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='teacher_rollups', to='core.course')),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='teacher_rollups', to='core.department')),
+                ('teacher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_rollups', to='forms_app.teacher')),
+            ],
+            options={
+                'db_table': 'teacher_question_rollups',
+                'indexes': [models.Index(fields=['department', 'teacher'], name='rollup_department_teacher_idx')],
+                'unique_together': {('teacher', 'course', 'question_order')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
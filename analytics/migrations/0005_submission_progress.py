@@ -0,0 +1,70 @@
+# Generated by Django 4.2.4 on 2026-10-17 02:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+
+
+def backfill_progress(apps, schema_editor):
+    FormSubmission = apps.get_model('forms_app', 'FormSubmission')
+    StudentCourse = apps.get_model('accounts', 'StudentCourse')
+    SubmissionBucket = apps.get_model('analytics', 'SubmissionBucket')
+    CourseEnrollmentCount = apps.get_model('analytics', 'CourseEnrollmentCount')
+
+    tz = timezone.get_current_timezone()
+    for granularity, trunc in (('hour', TruncHour), ('day', TruncDay)):
+        rows = FormSubmission.objects.annotate(
+            bucket_start=trunc('submitted_at', tzinfo=tz)
+        ).values('form_id', 'bucket_start').annotate(count=Count('id')).order_by()
+        SubmissionBucket.objects.bulk_create([
+            SubmissionBucket(form_id=row['form_id'], granularity=granularity,
+                             bucket_start=row['bucket_start'], count=row['count'])
+            for row in rows
+        ], batch_size=1000)
+
+    enrolled = StudentCourse.objects.values('course_id').annotate(total=Count('id')).order_by()
+    CourseEnrollmentCount.objects.bulk_create([
+        CourseEnrollmentCount(course_id=row['course_id'], total=row['total'])
+        for row in enrolled
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('core', '0002_course_department_name_idx'),
+        ('forms_app', '0005_hot_path_indexes'),
+        ('analytics', '0004_teacher_question_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseEnrollmentCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='enrollment_total', to='core.course')),
+            ],
+            options={
+                'db_table': 'course_enrollment_counts',
+            },
+        ),
+        migrations.CreateModel(
+            name='SubmissionBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('bucket_start', models.DateTimeField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('form', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submission_buckets', to='forms_app.feedbackform')),
+            ],
+            options={
+                'db_table': 'submission_buckets',
+                'unique_together': {('form', 'granularity', 'bucket_start')},
+            },
+        ),
+        migrations.RunPython(backfill_progress, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,169 @@
 from django.db import models
+from django.conf import settings
+from core.models import Department, Course
+from forms_app.models import Teacher, FeedbackForm, Question, MCQOption
 
-# Create your models here.
+
+class OptionResponseCount(models.Model):
+    """Materialized number of responses that picked each MCQ option"""
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='option_counts')
+    mcq_option = models.ForeignKey(MCQOption, on_delete=models.CASCADE, related_name='response_counts')
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'option_response_counts'
+        unique_together = ['question', 'mcq_option']
+
+    def __str__(self):
+        return f"{self.mcq_option.option_text}: {self.count}"
+
+
+class FormSubmissionCount(models.Model):
+    """Materialized number of submissions received by each form"""
+    form = models.OneToOneField(FeedbackForm, on_delete=models.CASCADE, related_name='submission_total')
+    total = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'form_submission_counts'
+
+    def __str__(self):
+        return f"{self.form.title}: {self.total}"
+
+
+class SubmissionBucket(models.Model):
+    """Number of submissions a form received in one hour or one (local) day"""
+    GRANULARITIES = (
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+    )
+
+    form = models.ForeignKey(FeedbackForm, on_delete=models.CASCADE, related_name='submission_buckets')
+    granularity = models.CharField(max_length=4, choices=GRANULARITIES)
+    bucket_start = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'submission_buckets'
+        unique_together = ['form', 'granularity', 'bucket_start']
+
+    def __str__(self):
+        return f"{self.form.title} {self.granularity} {self.bucket_start}: {self.count}"
+
+
+class CourseEnrollmentCount(models.Model):
+    """Materialized number of students enrolled in each course"""
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, related_name='enrollment_total')
+    total = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'course_enrollment_counts'
+
+    def __str__(self):
+        return f"{self.course.code}: {self.total}"
+
+
+class QuestionStatistic(models.Model):
+    """
+    Running score moments of one rating scale question, where each option
+    scores its 1-based position in option order. Mean, spread and top-box
+    shares are derived from these sums, which also add up across questions
+    and teachers.
+    """
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, related_name='statistics')
+    form = models.ForeignKey(FeedbackForm, on_delete=models.CASCADE, related_name='question_statistics')
+    # Copied from the form so department and teacher comparisons need no joins
+    teacher = models.ForeignKey(Teacher, on_delete=models.CASCADE, related_name='question_statistics')
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='question_statistics')
+    question_order = models.IntegerField(default=0)
+    scale = models.PositiveSmallIntegerField(default=0)
+    responses = models.PositiveIntegerField(default=0)
+    score_sum = models.PositiveBigIntegerField(default=0)
+    score_sq_sum = models.PositiveBigIntegerField(default=0)
+    top_box = models.PositiveIntegerField(default=0)
+    bottom_box = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'question_statistics'
+        indexes = [
+            models.Index(fields=['department', 'question_order'], name='stat_department_order_idx'),
+            models.Index(fields=['department', 'teacher'], name='stat_department_teacher_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.question}: {self.responses} response(s)"
+
+
+class TeacherQuestionRollup(models.Model):
+    """
+    Score moments of every form a teacher has for one course, pooled by
+    question order. The teacher comparison reads these instead of responses.
+    """
+    teacher = models.ForeignKey(Teacher, on_delete=models.CASCADE, related_name='question_rollups')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='teacher_rollups')
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='teacher_rollups')
+    question_order = models.IntegerField(default=0)
+    scale = models.PositiveSmallIntegerField(default=0)
+    responses = models.PositiveIntegerField(default=0)
+    score_sum = models.PositiveBigIntegerField(default=0)
+    score_sq_sum = models.PositiveBigIntegerField(default=0)
+    top_box = models.PositiveIntegerField(default=0)
+    bottom_box = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'teacher_question_rollups'
+        unique_together = ['teacher', 'course', 'question_order']
+        indexes = [
+            models.Index(fields=['department', 'teacher'], name='rollup_department_teacher_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.teacher} / {self.course} Q{self.question_order}"
+
+
+class ReportExportJob(models.Model):
+    """Bulk report export for every form of a school, department or course, built by a background worker"""
+    SCOPES = (
+        ('school', 'School'),
+        ('department', 'Department'),
+        ('course', 'Course'),
+    )
+    FORMATS = (
+        ('xlsx', 'One workbook, one sheet per form'),
+        ('zip', 'ZIP of workbooks'),
+    )
+    STATUSES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='export_jobs')
+    scope = models.CharField(max_length=20, choices=SCOPES)
+    scope_id = models.PositiveIntegerField()
+    output_format = models.CharField(max_length=10, choices=FORMATS, default='xlsx')
+    status = models.CharField(max_length=10, choices=STATUSES, default='pending')
+    total_forms = models.PositiveIntegerField(default=0)
+    processed_forms = models.PositiveIntegerField(default=0)
+    file = models.FileField(upload_to='exports/', blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Refreshed by the worker as it goes; a running job that stops beating is re-queued
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'report_export_jobs'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.get_scope_display()} {self.scope_id} export ({self.status})"
+
+    def progress(self):
+        if not self.total_forms:
+            return 100 if self.status == 'done' else 0
+        return int(self.processed_forms * 100 / self.total_forms)
@@ -0,0 +1,167 @@
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Coalesce, TruncDay, TruncHour
+from django.utils import timezone
+from accounts.models import StudentCourse
+from forms_app.models import FeedbackForm, FormSubmission
+from .increments import upsert_increments
+from .models import SubmissionBucket, CourseEnrollmentCount
+
+HOUR = 'hour'
+DAY = 'day'
+RECENT_HOURS = 24
+
+
+def bucket_starts(moment):
+    """Start of the local hour and the local day containing moment"""
+    hour = timezone.localtime(moment).replace(minute=0, second=0, microsecond=0)
+    return {HOUR: hour, DAY: hour.replace(hour=0)}
+
+
+def record_submission(submission, step=1):
+    """
+    Add (step=1) or remove (step=-1) a submission from its hour and day
+    buckets. Must run inside the transaction that creates or deletes it.
+    """
+    starts = bucket_starts(submission.submitted_at)
+    if step > 0:
+        # The hour and day buckets are created or incremented by one statement
+        upsert_increments(SubmissionBucket, ['form_id', 'granularity', 'bucket_start'], [
+            {'form_id': submission.form_id, 'granularity': granularity, 'bucket_start': start, 'count': step}
+            for granularity, start in starts.items()
+        ], ['count'])
+        return
+
+    SubmissionBucket.objects.filter(form_id=submission.form_id, count__gte=-step).filter(
+        Q(granularity=HOUR, bucket_start=starts[HOUR]) | Q(granularity=DAY, bucket_start=starts[DAY])
+    ).update(count=F('count') + step)
+
+
+def record_enrollments(course_ids, step=1):
+    """
+    Add (step=1) or remove (step=-1) one enrollment per course id. Pass a
+    course id once for each StudentCourse row written; bulk writes do not
+    send the signals that call this for single rows.
+    """
+    per_course = {}
+    for course_id in course_ids:
+        per_course[course_id] = per_course.get(course_id, 0) + 1
+
+    for amount, ids in _group_by_amount(per_course).items():
+        totals = CourseEnrollmentCount.objects.filter(course_id__in=ids)
+        if step < 0:
+            totals = totals.filter(total__gte=amount)
+        updated = totals.update(total=F('total') + amount * step)
+        if updated < len(ids) and step > 0:
+            existing = set(totals.values_list('course_id', flat=True))
+            missing = [course_id for course_id in ids if course_id not in existing]
+            CourseEnrollmentCount.objects.bulk_create(
+                [CourseEnrollmentCount(course_id=course_id, total=0) for course_id in missing],
+                ignore_conflicts=True
+            )
+            CourseEnrollmentCount.objects.filter(course_id__in=missing).update(total=F('total') + amount * step)
+
+
+def _group_by_amount(per_course):
+    # Courses gaining the same number of enrollments share one UPDATE
+    groups = {}
+    for course_id, amount in per_course.items():
+        groups.setdefault(amount, []).append(course_id)
+    return groups
+
+
+def rebuild(forms=None):
+    """Recount the submission buckets and course enrollment totals from the raw tables"""
+    tz = timezone.get_current_timezone()
+    submissions = FormSubmission.objects.all()
+    enrollments = StudentCourse.objects.all()
+    buckets = SubmissionBucket.objects.all()
+    totals = CourseEnrollmentCount.objects.all()
+    if forms is not None:
+        course_ids = FeedbackForm.objects.filter(id__in=forms).values('course_id')
+        submissions = submissions.filter(form__in=forms)
+        enrollments = enrollments.filter(course_id__in=course_ids)
+        buckets = buckets.filter(form__in=forms)
+        totals = totals.filter(course_id__in=course_ids)
+
+    rows = []
+    for granularity, trunc in ((HOUR, TruncHour), (DAY, TruncDay)):
+        counted = submissions.annotate(
+            bucket_start=trunc('submitted_at', tzinfo=tz)
+        ).values('form_id', 'bucket_start').annotate(count=Count('id')).order_by()
+        rows.extend(
+            SubmissionBucket(form_id=row['form_id'], granularity=granularity,
+                             bucket_start=row['bucket_start'], count=row['count'])
+            for row in counted
+        )
+    enrolled = enrollments.values('course_id').annotate(total=Count('id')).order_by()
+
+    with transaction.atomic():
+        buckets.delete()
+        totals.delete()
+        SubmissionBucket.objects.bulk_create(rows, batch_size=1000)
+        CourseEnrollmentCount.objects.bulk_create([
+            CourseEnrollmentCount(course_id=row['course_id'], total=row['total'])
+            for row in enrolled
+        ], batch_size=1000)
+    return len(rows), len(enrolled)
+
+
+def form_progress(forms, now=None):
+    """
+    Submission progress of each form from the counter tables, in two queries.
+
+    Returns a list of dicts with the form's submissions, enrolled students,
+    completion rate (percent), submissions this hour and today, and 'hourly',
+    the counts of the last RECENT_HOURS hours, oldest first.
+    """
+    now = now or timezone.now()
+    starts = bucket_starts(now)
+    first_hour = starts[HOUR] - timedelta(hours=RECENT_HOURS - 1)
+
+    rows = list(forms.values(
+        'id',
+        'title',
+        'is_active',
+        'course__code',
+        'course__name',
+        'teacher__name',
+    ).annotate(
+        submissions=Coalesce('submission_total__total', Value(0)),
+        enrolled=Coalesce('course__enrollment_total__total', Value(0)),
+    ))
+
+    recent = SubmissionBucket.objects.filter(form_id__in=[row['id'] for row in rows]).filter(
+        Q(granularity=HOUR, bucket_start__gte=first_hour) | Q(granularity=DAY, bucket_start=starts[DAY])
+    ).values_list('form_id', 'granularity', 'bucket_start', 'count')
+
+    hourly = {}
+    today = {}
+    for form_id, granularity, bucket_start, count in recent:
+        if granularity == DAY:
+            today[form_id] = count
+        else:
+            hourly[(form_id, timezone.localtime(bucket_start))] = count
+
+    hours = [first_hour + timedelta(hours=offset) for offset in range(RECENT_HOURS)]
+    for row in rows:
+        row['completion'] = round(row['submissions'] * 100 / row['enrolled'], 1) if row['enrolled'] else None
+        row['hourly'] = [hourly.get((row['id'], hour), 0) for hour in hours]
+        row['this_hour'] = row['hourly'][-1]
+        row['today'] = today.get(row['id'], 0)
+    return rows
+
+
+def progress_summary(rows):
+    """Totals over the rows of form_progress"""
+    submissions = sum(row['submissions'] for row in rows)
+    enrolled = sum(row['enrolled'] for row in rows)
+    return {
+        'forms': len(rows),
+        'submissions': submissions,
+        'enrolled': enrolled,
+        'completion': round(submissions * 100 / enrolled, 1) if enrolled else None,
+        'this_hour': sum(row['this_hour'] for row in rows),
+        'today': sum(row['today'] for row in rows),
+    }
@@ -0,0 +1,210 @@
+from collections import defaultdict
+from django.db.models import Count
+from django.urls import reverse
+from forms_app.models import Question, Response
+from .models import OptionResponseCount, FormSubmissionCount, QuestionStatistic
+from .statistics import MOMENT_FIELDS, summarize
+
+TEXT_PAGE_SIZE = 20
+MAX_TEXT_PAGE_SIZE = 100
+
+
+def mcq_option_counts(form):
+    """Return {(question_id, option_id): count} for every MCQ option of a form from the counter table"""
+    rows = OptionResponseCount.objects.filter(
+        question__form=form
+    ).values_list(
+        'question_id',
+        'mcq_option_id',
+        'count'
+    )
+
+    return {(question_id, option_id): count for question_id, option_id, count in rows}
+
+
+def text_answers(form, newest_first=True):
+    """Return {question_id: [(text, student_name, submitted_at), ...]} for all text answers of a form"""
+    ordering = '-submission__submitted_at' if newest_first else 'submission__submitted_at'
+    rows = Response.objects.filter(
+        question__form=form,
+        question__question_type='text'
+    ).exclude(
+        text_answer=''
+    ).values_list(
+        'question_id',
+        'text_answer',
+        'submission__student__name',
+        'submission__submitted_at'
+    ).order_by(ordering)
+
+    answers = defaultdict(list)
+    for question_id, text, student_name, submitted_at in rows:
+        answers[question_id].append((text, student_name, submitted_at))
+    return answers
+
+
+def question_result(question, counts, answers):
+    """Build the result entry of one question from preloaded option counts and text answers"""
+    question_data = {
+        'question': question,
+        'total_responses': 0,
+        'data': []
+    }
+
+    if question.question_type == 'mcq':
+        # Options are prefetched, so this loop does not touch the database
+        for option in question.options.all():
+            question_data['data'].append({
+                'mcq_answer__id': option.id,
+                'mcq_answer__option_text': option.option_text,
+                'mcq_answer__order': option.order,
+                'count': counts.get((question.id, option.id), 0)
+            })
+        question_data['total_responses'] = sum(item['count'] for item in question_data['data'])
+
+    elif question.question_type == 'text':
+        question_data['data'] = answers.get(question.id, [])
+        question_data['total_responses'] = len(question_data['data'])
+
+    return question_data
+
+
+def build_form_results(form, include_text=True, newest_first=True):
+    """
+    Collect per-question results for a form with a fixed number of queries.
+
+    Each entry is a dict with 'question', 'total_responses' and 'data'. For MCQ
+    questions 'data' lists every option (including unanswered ones) in option
+    order; for text questions it lists (text, student_name, submitted_at) tuples.
+    """
+    questions = form.questions.all().prefetch_related('options')
+    counts = mcq_option_counts(form)
+    answers = text_answers(form, newest_first=newest_first) if include_text else {}
+
+    return [question_result(question, counts, answers) for question in questions]
+
+
+def build_results_for_forms(forms):
+    """
+    Collect MCQ results for many forms at once, returning {form_id: results}.
+
+    Uses the same three queries whatever the number of forms; text answers are
+    left out and should be streamed separately.
+    """
+    questions = Question.objects.filter(form__in=forms).prefetch_related('options')
+    rows = OptionResponseCount.objects.filter(
+        question__form__in=forms
+    ).values_list(
+        'question_id',
+        'mcq_option_id',
+        'count'
+    )
+    counts = {(question_id, option_id): count for question_id, option_id, count in rows}
+
+    results = defaultdict(list)
+    for question in questions:
+        results[question.form_id].append(question_result(question, counts, {}))
+    return results
+
+
+async def form_results_payload(form):
+    """
+    JSON-ready results of a form, read with the async ORM from the counter and
+    statistics tables. MCQ questions carry their option labels, count vectors
+    and percentages, ready for a chart; text questions only their number of
+    answers and the URL of their paginated answers.
+    """
+    total = await FormSubmissionCount.objects.filter(form=form).values_list('total', flat=True).afirst()
+    questions = [question async for question in form.questions.prefetch_related('options')]
+    counts = {
+        (question_id, option_id): count
+        async for question_id, option_id, count in OptionResponseCount.objects.filter(
+            question__form=form
+        ).values_list('question_id', 'mcq_option_id', 'count')
+    }
+    stats = summarize([
+        row async for row in QuestionStatistic.objects.filter(form=form).values(
+            'question_id', 'scale', *MOMENT_FIELDS
+        )
+    ])
+    stats = {row['question_id']: row for row in stats}
+    text_counts = {
+        row['question_id']: row['answers']
+        async for row in Response.objects.filter(
+            question__form=form,
+            question__question_type='text'
+        ).exclude(
+            text_answer=''
+        ).values('question_id').annotate(answers=Count('id')).order_by()
+    }
+
+    entries = []
+    for question in questions:
+        entry = {
+            'id': question.id,
+            'order': question.order,
+            'text': question.question_text,
+            'type': question.question_type,
+        }
+        if question.question_type == 'mcq':
+            options = list(question.options.all())
+            entry['options'] = [option.option_text for option in options]
+            entry['counts'] = [counts.get((question.id, option.id), 0) for option in options]
+            entry['total_responses'] = sum(entry['counts'])
+            entry['percentages'] = [
+                round(count * 100 / entry['total_responses'], 1) if entry['total_responses'] else 0
+                for count in entry['counts']
+            ]
+            entry['statistics'] = {
+                name: stats[question.id][name]
+                for name in ('mean', 'std_dev', 'top_box_pct', 'net_score', 'normalized_mean')
+            } if question.id in stats else None
+        else:
+            entry['total_responses'] = text_counts.get(question.id, 0)
+            entry['answers_url'] = reverse('analytics:form_text_answers_api', args=[form.id, question.id])
+        entries.append(entry)
+
+    return {
+        'form': {
+            'id': form.id,
+            'title': form.title,
+            'course': {'code': form.course.code, 'name': form.course.name},
+            'department': form.course.department.name,
+            'teacher': form.teacher.name,
+        },
+        'total_submissions': total or 0,
+        'questions': entries,
+    }
+
+
+async def text_answer_page(question, cursor=None, limit=TEXT_PAGE_SIZE):
+    """
+    One page of a question's text answers, newest first. Pages are keyed on
+    the response id, so each one is a single index range scan however deep
+    the reader goes; pass the returned next_cursor to get the following page.
+    """
+    rows = Response.objects.filter(
+        question=question,
+        mcq_answer__isnull=True
+    ).exclude(
+        text_answer=''
+    )
+    if cursor is not None:
+        rows = rows.filter(id__lt=cursor)
+    rows = rows.order_by('-id').values_list(
+        'id',
+        'text_answer',
+        'submission__student__name',
+        'submission__submitted_at'
+    )[:limit + 1]
+
+    page = [row async for row in rows]
+    has_more = len(page) > limit
+    page = page[:limit]
+    return {
+        'answers': [
+            {'id': response_id, 'text': text, 'student': student_name, 'submitted_at': submitted_at}
+            for response_id, text, student_name, submitted_at in page
+        ],
+        'next_cursor': page[-1][0] if has_more else None,
+    }
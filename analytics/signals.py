@@ -0,0 +1,86 @@
+from django.db.models.signals import pre_delete, post_save, post_delete
+from django.dispatch import receiver
+from accounts.enrollment import in_bulk_enrollment_change
+from accounts.models import Student, StudentCourse
+from core.models import School, Department, Course
+from forms_app.models import Teacher, FeedbackForm, FormSubmission, Question, MCQOption
+from . import counters, statistics, progress
+
+# Deleting one of these deletes whole forms, and with them their counters,
+# statistics and buckets; deleting a teacher or course also deletes its rollups
+FORM_CASCADE_ORIGINS = (School, Department, Teacher, Course)
+
+
+def _origin_model(origin):
+    # origin is the instance or queryset whose delete() started the cascade
+    return getattr(origin, 'model', type(origin))
+
+
+@receiver(pre_delete, sender=FormSubmission)
+def remove_submission_from_counters(sender, instance, origin=None, **kwargs):
+    """Keep the response counters in step when a submission is deleted"""
+    # Counters are removed by the cascade when the whole form goes away, and a
+    # deleted student's forms are rebuilt once by rebuild_forms_of_student
+    if _origin_model(origin) in (FeedbackForm, Student) + FORM_CASCADE_ORIGINS:
+        return
+    counters.discard_submission(instance)
+
+
+@receiver(pre_delete, sender=Student)
+def rebuild_forms_of_student(sender, instance, **kwargs):
+    """Recount the forms a deleted student submitted instead of subtracting every submission"""
+    form_ids = list(FormSubmission.objects.filter(student=instance).values_list('form_id', flat=True))
+    if form_ids:
+        counters.rebuild_forms_on_commit(form_ids)
+
+
+@receiver(pre_delete, sender=FeedbackForm)
+def remove_form_from_rollups(sender, instance, origin=None, **kwargs):
+    """Teacher rollups pool several forms, so a deleted form is subtracted instead of cascaded"""
+    # The rollups of a deleted teacher or course go away with it
+    if _origin_model(origin) in FORM_CASCADE_ORIGINS:
+        return
+    statistics.discard_form(instance)
+
+
+@receiver(post_save, sender=FeedbackForm)
+def refresh_form_statistics(sender, instance, created, **kwargs):
+    """Move a form's statistics and rollups over when its teacher or course changes"""
+    # The statistics copy the teacher and department; the rollups are keyed by (teacher, course).
+    # _previous_keys is set by forms_app.signals.remember_form_keys
+    previous = getattr(instance, '_previous_keys', None)
+    if previous and previous != (instance.teacher_id, instance.course_id):
+        statistics.move_form(instance, previous)
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def question_changed(sender, instance, origin=None, **kwargs):
+    """Opting a question in or out of scoring, reordering or removing it changes its form's statistics"""
+    if _origin_model(origin) in (FeedbackForm,) + FORM_CASCADE_ORIGINS:
+        return
+    counters.rebuild_forms_on_commit([instance.form_id])
+
+
+@receiver(post_save, sender=MCQOption)
+@receiver(post_delete, sender=MCQOption)
+def option_changed(sender, instance, origin=None, **kwargs):
+    """Options score their position in option order, so adding, moving or removing one rescores the question"""
+    # question_changed already covers the options of a deleted question
+    if _origin_model(origin) in (FeedbackForm, Question) + FORM_CASCADE_ORIGINS:
+        return
+    form_id = Question.objects.filter(pk=instance.question_id).values_list('form_id', flat=True).first()
+    if form_id is not None:
+        counters.rebuild_forms_on_commit([form_id])
+
+
+@receiver(post_save, sender=StudentCourse)
+def enrollment_added(sender, instance, created, **kwargs):
+    if created and not in_bulk_enrollment_change():
+        progress.record_enrollments([instance.course_id], 1)
+
+
+@receiver(post_delete, sender=StudentCourse)
+def enrollment_removed(sender, instance, **kwargs):
+    if not in_bulk_enrollment_change():
+        progress.record_enrollments([instance.course_id], -1)
@@ -0,0 +1,436 @@
+import numpy as np
+from django.db import transaction
+from django.db.models import Case, When, F, Q, Value, Sum, Max, Count
+from django.db.models.functions import Now
+from django.utils import timezone
+from forms_app.models import FeedbackForm, Question, MCQOption
+from .increments import upsert_increments
+from .models import OptionResponseCount, QuestionStatistic, TeacherQuestionRollup
+
+MOMENT_FIELDS = ('responses', 'score_sum', 'score_sq_sum', 'top_box', 'bottom_box')
+
+
+def option_scores(questions):
+    """
+    Map option ids to (question_id, question_order, score, scale) from questions
+    with prefetched options. Only MCQ questions marked is_rating_scale are
+    scored: an option scores its 1-based position in option order, so their
+    options run from worst to best; scale is the number of options.
+    """
+    scores = {}
+    for question in questions:
+        if question.question_type != 'mcq' or not question.is_rating_scale:
+            continue
+        options = sorted(question.options.all(), key=lambda option: (option.order, option.id))
+        for score, option in enumerate(options, 1):
+            scores[option.id] = (question.id, question.order, score, len(options))
+    return scores
+
+
+def _load_option_scores(question_ids):
+    rows = MCQOption.objects.filter(
+        question_id__in=question_ids,
+        question__question_type='mcq',
+        question__is_rating_scale=True
+    ).order_by(
+        'question_id', 'order', 'id'
+    ).values_list('question_id', 'question__order', 'id')
+
+    by_question = {}
+    for question_id, question_order, option_id in rows:
+        by_question.setdefault((question_id, question_order), []).append(option_id)
+
+    scores = {}
+    for (question_id, question_order), option_ids in by_question.items():
+        for score, option_id in enumerate(option_ids, 1):
+            scores[option_id] = (question_id, question_order, score, len(option_ids))
+    return scores
+
+
+def is_top_box(score, scale):
+    return score == scale
+
+
+def is_bottom_box(score, scale):
+    # The lower half of the scale, e.g. the two lowest of five options
+    return score <= scale // 2
+
+
+def _answer_moments(score, scale):
+    return {
+        'responses': 1,
+        'score_sum': score,
+        'score_sq_sum': score * score,
+        'top_box': int(is_top_box(score, scale)),
+        'bottom_box': int(is_bottom_box(score, scale)),
+    }
+
+
+def record_answers(form, option_answers, scores=None, step=1):
+    """
+    Add (step=1) or remove (step=-1) the picked options of one submission to
+    the question statistics and the teacher rollups of its form.
+
+    option_answers is a list of (question_id, option_id) pairs; scores may be
+    passed from option_scores() when the options are already loaded. Each
+    table changes in a single statement, an upsert when adding and an UPDATE
+    when removing. Must run inside the submission's transaction.
+    """
+    if not option_answers:
+        return
+    if scores is None:
+        scores = _load_option_scores({question_id for question_id, _ in option_answers})
+
+    by_question = {}
+    by_order = {}
+    question_orders = {}
+    question_scales = {}
+    order_scales = {}
+    for question_id, option_id in option_answers:
+        if option_id not in scores:
+            continue
+        _, order, score, scale = scores[option_id]
+        moments = _answer_moments(score, scale)
+        by_question[question_id] = moments
+        pooled = by_order.setdefault(order, dict.fromkeys(MOMENT_FIELDS, 0))
+        for field in MOMENT_FIELDS:
+            pooled[field] += moments[field]
+        question_orders[question_id] = order
+        question_scales[question_id] = scale
+        order_scales[order] = max(order_scales.get(order, 0), scale)
+    if not by_question:
+        return
+
+    if step > 0:
+        # New rows are created by the same statement, so each table costs one write
+        now = timezone.now()
+        department_id = form.course.department_id
+        upsert_increments(QuestionStatistic, ['question_id'], [
+            dict(
+                question_id=question_id,
+                form_id=form.id,
+                teacher_id=form.teacher_id,
+                department_id=department_id,
+                question_order=question_orders[question_id],
+                scale=question_scales[question_id],
+                updated_at=now,
+                **{field: moments[field] * step for field in MOMENT_FIELDS}
+            )
+            for question_id, moments in by_question.items()
+        ], MOMENT_FIELDS, ['updated_at'])
+        upsert_increments(TeacherQuestionRollup, ['teacher_id', 'course_id', 'question_order'], [
+            dict(
+                teacher_id=form.teacher_id,
+                course_id=form.course_id,
+                department_id=department_id,
+                question_order=order,
+                scale=order_scales[order],
+                updated_at=now,
+                **{field: moments[field] * step for field in MOMENT_FIELDS}
+            )
+            for order, moments in by_order.items()
+        ], MOMENT_FIELDS, ['updated_at'], max_fields=['scale'])
+        return
+
+    _increment(QuestionStatistic.objects.filter(question_id__in=by_question), 'question_id', by_question, step)
+    _increment(
+        TeacherQuestionRollup.objects.filter(teacher_id=form.teacher_id, course_id=form.course_id),
+        'question_order', by_order, step
+    )
+
+
+def discard_form(form):
+    """Take the statistics of a form (about to be deleted) out of its teacher rollups"""
+    by_order = {
+        row.pop('question_order'): row
+        for row in QuestionStatistic.objects.filter(form=form).values('question_order').annotate(
+            **{field: Sum(field) for field in MOMENT_FIELDS}
+        ).order_by()
+    }
+    rollups = TeacherQuestionRollup.objects.filter(teacher_id=form.teacher_id, course_id=form.course_id)
+    _increment(rollups, 'question_order', by_order, -1)
+
+
+def _increment(queryset, key_field, increments, step):
+    """Add step times the moments of each key to its row with one UPDATE; returns the rows changed"""
+    if not increments:
+        return 0
+    if step < 0:
+        # Never take a row below zero
+        allowed = Q()
+        for key, moments in increments.items():
+            allowed |= Q(**{key_field: key, 'responses__gte': moments['responses']})
+        queryset = queryset.filter(allowed)
+
+    def per_key(field):
+        return Case(
+            *[When(**{key_field: key, 'then': Value(moments[field] * step)}) for key, moments in increments.items()],
+            default=Value(0)
+        )
+
+    return queryset.update(
+        updated_at=Now(),
+        **{field: F(field) + per_key(field) for field in MOMENT_FIELDS}
+    )
+
+
+def moments_from_counts(counts, scales):
+    """
+    Score moments of many questions at once.
+
+    counts is a (questions x max_scale) matrix of option counts in score order,
+    padded with zeros; scales holds the number of options of each question.
+    Returns a dict of arrays keyed by MOMENT_FIELDS.
+    """
+    scales = np.asarray(scales, dtype=np.int64)
+    counts = np.asarray(counts, dtype=np.int64)
+    # reshape cannot infer the width of an empty matrix
+    counts = counts.reshape(len(scales), -1) if counts.size else np.zeros((len(scales), 0), dtype=np.int64)
+    if counts.shape[1] == 0:
+        counts = np.zeros((len(scales), 1), dtype=np.int64)
+    scores = np.arange(1, counts.shape[1] + 1)
+    rows = np.arange(len(scales))
+
+    return {
+        'responses': counts.sum(axis=1),
+        'score_sum': counts @ scores,
+        'score_sq_sum': counts @ (scores * scores),
+        'top_box': counts[rows, np.maximum(scales - 1, 0)] * (scales > 0),
+        'bottom_box': (counts * (scores[None, :] <= (scales // 2)[:, None])).sum(axis=1),
+    }
+
+
+def summarize(rows):
+    """
+    Add mean, std_dev, top_box_pct, net_score and normalized_mean to a list of
+    dicts holding MOMENT_FIELDS and scale, computed for all rows at once.
+
+    net_score is the NPS-style top-box share minus the bottom-half share, and
+    normalized_mean maps the mean onto 0-100 so different scales compare.
+    Metrics are None for rows without responses.
+    """
+    if not rows:
+        return rows
+
+    n = np.array([row['responses'] for row in rows], dtype=float)
+    total = np.array([row['score_sum'] for row in rows], dtype=float)
+    squares = np.array([row['score_sq_sum'] for row in rows], dtype=float)
+    top = np.array([row['top_box'] for row in rows], dtype=float)
+    bottom = np.array([row['bottom_box'] for row in rows], dtype=float)
+    scale = np.array([row['scale'] or 0 for row in rows], dtype=float)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = total / n
+        std_dev = np.sqrt(np.maximum(squares / n - mean * mean, 0.0))
+        top_box_pct = top * 100 / n
+        net_score = (top - bottom) * 100 / n
+        normalized_mean = np.where(scale > 1, (mean - 1) * 100 / (scale - 1), np.nan)
+
+    metrics = {
+        'mean': mean,
+        'std_dev': std_dev,
+        'top_box_pct': top_box_pct,
+        'net_score': net_score,
+        'normalized_mean': normalized_mean,
+    }
+    for index, row in enumerate(rows):
+        for name, values in metrics.items():
+            value = values[index]
+            row[name] = None if np.isnan(value) else round(float(value), 2)
+    return rows
+
+
+def _aggregate(queryset, *group_by):
+    rows = list(queryset.values(*group_by).annotate(
+        max_scale=Max('scale'),
+        questions=Count('id'),
+        **{field + '_total': Sum(field) for field in MOMENT_FIELDS}
+    ).order_by(*group_by))
+    for row in rows:
+        row['scale'] = row.pop('max_scale')
+        for field in MOMENT_FIELDS:
+            row[field] = row.pop(field + '_total') or 0
+    return summarize(rows)
+
+
+def question_statistics(form):
+    """Return {question_id: metrics} for the MCQ questions of a form"""
+    rows = list(QuestionStatistic.objects.filter(form=form).values(
+        'question_id', 'question_order', 'scale', *MOMENT_FIELDS
+    ))
+    return {row['question_id']: row for row in summarize(rows)}
+
+
+def department_question_statistics(department_id):
+    """Return {question_order: metrics} pooled over every form of a department"""
+    rows = _aggregate(QuestionStatistic.objects.filter(department_id=department_id), 'question_order')
+    return {row['question_order']: row for row in rows}
+
+
+def teacher_statistics(department_id):
+    """Per-teacher metrics pooled over all their forms in a department, best first"""
+    rows = _aggregate(
+        TeacherQuestionRollup.objects.filter(department_id=department_id),
+        'teacher_id', 'teacher__name'
+    )
+    return sorted(rows, key=_ranking_key)
+
+
+def _ranking_key(row):
+    # Normalized means keep teachers comparable when their forms use different scales
+    return (row['normalized_mean'] is None, -(row['normalized_mean'] or 0), -row['responses'])
+
+
+def teacher_comparison(department_id):
+    """
+    Rank every teacher of a department by their pooled scores, with a per
+    question order breakdown next to the department figures.
+
+    Reads the teacher rollups of the department in one query and returns
+    {'question_orders', 'department', 'teachers'}: department maps each
+    question order to its pooled metrics; teachers is ranked best first and
+    each entry carries its courses and 'by_order' metrics.
+    """
+    rows = list(TeacherQuestionRollup.objects.filter(department_id=department_id).values(
+        'teacher_id', 'teacher__name', 'course__code', 'question_order', 'scale', *MOMENT_FIELDS
+    ))
+
+    def pool(groups, key, row):
+        group = groups.setdefault(key, dict(dict.fromkeys(MOMENT_FIELDS, 0), scale=0))
+        for field in MOMENT_FIELDS:
+            group[field] += row[field]
+        group['scale'] = max(group['scale'], row['scale'])
+        return group
+
+    teachers = {}
+    by_teacher_order = {}
+    by_order = {}
+    for row in rows:
+        teacher = pool(teachers, row['teacher_id'], row)
+        teacher.setdefault('teacher_id', row['teacher_id'])
+        teacher.setdefault('teacher__name', row['teacher__name'])
+        teacher.setdefault('courses', set()).add(row['course__code'])
+        pool(by_teacher_order, (row['teacher_id'], row['question_order']), row)
+        pool(by_order, row['question_order'], row)
+
+    summarize(list(teachers.values()) + list(by_teacher_order.values()) + list(by_order.values()))
+
+    for (teacher_id, order), metrics in by_teacher_order.items():
+        teachers[teacher_id].setdefault('by_order', {})[order] = metrics
+    ranked = sorted(teachers.values(), key=_ranking_key)
+    for rank, teacher in enumerate(ranked, 1):
+        teacher['rank'] = rank
+        teacher['courses'] = sorted(teacher['courses'])
+
+    return {
+        'question_orders': sorted(by_order),
+        'department': by_order,
+        'teachers': ranked,
+    }
+
+
+def rebuild(forms=None):
+    """Recompute the question statistics from the option counters, then the affected teacher rollups"""
+    question_rows = _rebuild_question_statistics(forms)
+    if forms is None:
+        pairs = None
+    else:
+        pairs = set(FeedbackForm.objects.filter(id__in=forms).values_list('teacher_id', 'course_id'))
+    rebuild_rollups(pairs)
+    return question_rows
+
+
+def move_form(form, previous_pair):
+    """
+    Recompute the statistics of a form whose teacher or course changed, and
+    the rollups of both its previous and its current (teacher_id, course_id)
+    so its scores move from one to the other.
+    """
+    _rebuild_question_statistics([form.id])
+    return rebuild_rollups({tuple(previous_pair), (form.teacher_id, form.course_id)})
+
+
+def rebuild_rollups(pairs=None):
+    """Recompute the teacher rollups of the given (teacher_id, course_id) pairs, or all of them"""
+    stats = QuestionStatistic.objects.all()
+    rollups = TeacherQuestionRollup.objects.all()
+    if pairs is not None:
+        if not pairs:
+            return 0
+        rollup_filter = Q()
+        stats_filter = Q()
+        for teacher_id, course_id in pairs:
+            rollup_filter |= Q(teacher_id=teacher_id, course_id=course_id)
+            stats_filter |= Q(teacher_id=teacher_id, form__course_id=course_id)
+        rollups = rollups.filter(rollup_filter)
+        stats = stats.filter(stats_filter)
+
+    pooled = stats.values('teacher_id', 'form__course_id', 'department_id', 'question_order').annotate(
+        max_scale=Max('scale'),
+        **{field + '_total': Sum(field) for field in MOMENT_FIELDS}
+    ).order_by()
+
+    with transaction.atomic():
+        rollups.delete()
+        created = TeacherQuestionRollup.objects.bulk_create([
+            TeacherQuestionRollup(
+                teacher_id=row['teacher_id'],
+                course_id=row['form__course_id'],
+                department_id=row['department_id'],
+                question_order=row['question_order'],
+                scale=row['max_scale'],
+                **{field: row[field + '_total'] for field in MOMENT_FIELDS}
+            )
+            for row in pooled
+        ], batch_size=1000)
+    return len(created)
+
+
+def _rebuild_question_statistics(forms=None):
+    """Recompute the question statistics rows from the option counters"""
+    questions = Question.objects.filter(question_type='mcq', is_rating_scale=True)
+    if forms is not None:
+        questions = questions.filter(form__in=forms)
+    question_rows = list(questions.values_list(
+        'id', 'form_id', 'form__teacher_id', 'form__course__department_id', 'order'
+    ))
+    question_ids = [row[0] for row in question_rows]
+
+    scores = _load_option_scores(question_ids)
+    counts = dict(
+        ((question_id, option_id), count)
+        for question_id, option_id, count in OptionResponseCount.objects.filter(
+            question_id__in=question_ids
+        ).values_list('question_id', 'mcq_option_id', 'count')
+    )
+
+    scales = {}
+    for question_id, _, _, scale in scores.values():
+        scales[question_id] = scale
+    max_scale = max(scales.values(), default=0)
+    position = {question_id: index for index, question_id in enumerate(question_ids)}
+
+    matrix = np.zeros((len(question_ids), max_scale), dtype=np.int64)
+    for option_id, (question_id, _, score, _) in scores.items():
+        matrix[position[question_id], score - 1] = counts.get((question_id, option_id), 0)
+    moments = moments_from_counts(matrix, [scales.get(question_id, 0) for question_id in question_ids])
+
+    with transaction.atomic():
+        stats = QuestionStatistic.objects.all()
+        if forms is not None:
+            stats = stats.filter(form__in=forms)
+        stats.delete()
+        QuestionStatistic.objects.bulk_create([
+            QuestionStatistic(
+                question_id=question_id,
+                form_id=form_id,
+                teacher_id=teacher_id,
+                department_id=department_id,
+                question_order=order,
+                scale=scales.get(question_id, 0),
+                **{field: int(moments[field][index]) for field in MOMENT_FIELDS}
+            )
+            for index, (question_id, form_id, teacher_id, department_id, order) in enumerate(question_rows)
+        ], batch_size=1000)
+
+    return len(question_rows)
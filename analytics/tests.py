@@ -1,3 +1,170 @@
-from django.test import TestCase
+import io
+from unittest import mock
+import openpyxl
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from accounts.models import Student, StudentCourse
+from core.models import School, Department, Course
+from core.tests import AsyncBudgetMixin
+from forms_app.models import Teacher, FeedbackForm, FormSubmission
+from forms_app.tests import create_form, answers
+from . import counters, statistics
+from .exports import XLSX_CONTENT_TYPE
+from .models import QuestionStatistic, TeacherQuestionRollup
 
-# Create your tests here.
+MOMENT_COLUMNS = ('responses', 'score_sum', 'score_sq_sum', 'top_box', 'bottom_box', 'scale')
+
+
+def statistics_rows():
+    # Like stored_counts, rows taken down to zero count as absent
+    return (
+        sorted(QuestionStatistic.objects.filter(responses__gt=0).values_list('question_id', 'teacher_id', 'department_id', *MOMENT_COLUMNS)),
+        sorted(TeacherQuestionRollup.objects.filter(responses__gt=0).values_list('teacher_id', 'course_id', 'question_order', *MOMENT_COLUMNS)),
+    )
+
+
+class CounterTests(TestCase):
+    maxDiff = None
+    """The counters, statistics and rollups stay equal to a rebuild from the raw tables"""
+
+    @classmethod
+    def setUpTestData(cls):
+        school = School.objects.create(name='Engineering', code='ENG')
+        cls.computing = Department.objects.create(school=school, name='Computing', code='CS')
+        cls.maths = Department.objects.create(school=school, name='Mathematics', code='MA')
+        databases = Course.objects.create(department=cls.computing, name='Databases', code='CS301', semester=1, year=2024)
+        cls.algebra = Course.objects.create(department=cls.maths, name='Algebra', code='MA101', semester=1, year=2024)
+        # Dr. Rao teaches in both departments
+        cls.rao = Teacher.objects.create(name='Dr. Rao', email='rao@example.com', department=cls.computing)
+        iyer = Teacher.objects.create(name='Dr. Iyer', email='iyer@example.com', department=cls.maths)
+        forms = [create_form(databases, cls.rao), create_form(cls.algebra, cls.rao), create_form(cls.algebra, iyer)]
+
+        client = Client()
+        for number in range(4):
+            student = Student.objects.create_user(f'CS{number:03}', f'Student {number}', 'pw')
+            StudentCourse.objects.create(student=student, course=databases)
+            StudentCourse.objects.create(student=student, course=cls.algebra)
+            client.force_login(student)
+            for form in forms:
+                client.post(reverse('forms_app:fill_form', args=[form.id]), answers(form, number % 4))
+
+    def assertMatchesRebuild(self):
+        self.assertEqual(counters.find_mismatches(), [])
+        stored = statistics_rows()
+        statistics.rebuild()
+        self.assertEqual(stored, statistics_rows())
+
+    def test_submit(self):
+        self.assertEqual(FormSubmission.objects.count(), 12)
+        self.assertMatchesRebuild()
+
+    def test_delete_submission(self):
+        FormSubmission.objects.first().delete()
+        self.assertMatchesRebuild()
+
+    def test_delete_student(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Student.objects.first().delete()
+        self.assertMatchesRebuild()
+
+    def test_delete_form(self):
+        FeedbackForm.objects.filter(course=self.algebra, teacher=self.rao).get().delete()
+        self.assertMatchesRebuild()
+
+    def test_cascade_deletes_skip_per_submission_updates(self):
+        for obj in (self.rao, self.algebra, self.maths, self.computing.school):
+            with self.subTest(origin=type(obj).__name__):
+                with mock.patch.object(counters, 'discard_submission') as discard:
+                    with mock.patch.object(statistics, 'discard_form') as discard_form:
+                        with self.captureOnCommitCallbacks(execute=True):
+                            type(obj).objects.get(pk=obj.pk).delete()
+                discard.assert_not_called()
+                discard_form.assert_not_called()
+                self.assertMatchesRebuild()
+                self._rollback_delete()
+
+    def _rollback_delete(self):
+        # Each origin deletes a different part of the fixture; start the next one from scratch
+        self._fixture_teardown()
+        self._fixture_setup()
+
+
+@override_settings(QUERY_BUDGETS_STRICT=True)
+class StaffQueryBudgetTests(AsyncBudgetMixin, TestCase):
+    """The analytics pages stay within their QUERY_BUDGETS, cold and cached"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = School.objects.create(name='Engineering', code='ENG')
+        cls.department = Department.objects.create(school=cls.school, name='Computing', code='CS')
+        course = Course.objects.create(department=cls.department, name='Databases', code='CS301', semester=1, year=2024)
+        teacher = Teacher.objects.create(name='Dr. Rao', email='rao@example.com', department=cls.department)
+        cls.form = create_form(course, teacher)
+        cls.text_question = cls.form.questions.filter(question_type='text').first()
+
+        client = Client()
+        url = reverse('forms_app:fill_form', args=[cls.form.id])
+        for number in range(5):
+            student = Student.objects.create_user(f'CS{number:03}', f'Student {number}', 'pw')
+            student.school = cls.school
+            student.department = cls.department
+            student.save()
+            StudentCourse.objects.create(student=student, course=course)
+            client.force_login(student)
+            client.post(url, answers(cls.form, number % 4))
+        cls.staff = Student.objects.create_superuser('admin', 'Admin', 'pw')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.staff)
+
+    def assertWithinBudget(self, url, repeat=2):
+        # QUERY_BUDGETS_STRICT makes the middleware raise on the first request over budget
+        for _ in range(repeat):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return response
+
+    def test_dashboard(self):
+        self.assertWithinBudget(reverse('analytics:dashboard'))
+        self.assertWithinBudget(reverse('analytics:dashboard') + f'?school={self.school.id}&department={self.department.id}')
+
+    def test_teacher_comparison(self):
+        self.assertWithinBudget(reverse('analytics:teacher_comparison'))
+        self.assertWithinBudget(reverse('analytics:teacher_comparison') + f'?department={self.department.id}')
+
+    def test_submission_progress(self):
+        self.assertWithinBudget(reverse('analytics:submission_progress'))
+        self.assertWithinBudget(reverse('analytics:submission_progress_data'))
+        self.assertWithinBudget(reverse('analytics:submission_progress_data') + '?all=1')
+
+    def test_form_results(self):
+        self.assertWithinBudget(reverse('analytics:form_results', args=[self.form.id]))
+        data = self.assertWithinBudget(reverse('analytics:form_results_api', args=[self.form.id])).json()
+        self.assertEqual(data['total_submissions'], 5)
+
+    def test_text_answers(self):
+        url = reverse('analytics:form_text_answers_api', args=[self.form.id, self.text_question.id])
+        page = self.assertWithinBudget(url + '?limit=2').json()
+        self.assertEqual(len(page['answers']), 2)
+        self.assertWithinBudget(url + f'?limit=2&cursor={page["next_cursor"]}')
+
+    async def test_result_apis_async(self):
+        data = (await self.aassertWithinBudget(reverse('analytics:form_results_api', args=[self.form.id]))).json()
+        self.assertEqual(data['total_submissions'], 5)
+        url = reverse('analytics:form_text_answers_api', args=[self.form.id, self.text_question.id])
+        page = (await self.aassertWithinBudget(url + '?limit=2')).json()
+        self.assertEqual(len(page['answers']), 2)
+
+    def test_export_results(self):
+        self.assertWithinBudget(reverse('analytics:export_results', args=[self.form.id]))
+        response = self.client.get(reverse('analytics:export_results', args=[self.form.id]))
+        self.assertEqual(response['Content-Type'], XLSX_CONTENT_TYPE)
+        workbook = openpyxl.load_workbook(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(workbook.sheetnames, ['Summary', 'MCQ Results', 'Text Responses'])
+
+    def test_export_students(self):
+        self.assertWithinBudget(reverse('analytics:export_students'))
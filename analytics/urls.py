@@ -5,7 +5,15 @@ app_name = 'analytics'
 
 urlpatterns = [
     path('', views.analytics_dashboard, name='dashboard'),
+    path('teachers/', views.teacher_comparison, name='teacher_comparison'),
+    path('progress/', views.submission_progress, name='submission_progress'),
+    path('progress/data/', views.submission_progress_data, name='submission_progress_data'),
     path('form/<int:form_id>/results/', views.form_results, name='form_results'),
+    path('api/form/<int:form_id>/results/', views.form_results_api, name='form_results_api'),
+    path('api/form/<int:form_id>/questions/<int:question_id>/answers/', views.form_text_answers_api, name='form_text_answers_api'),
     path('form/<int:form_id>/export/', views.export_form_results, name='export_results'),
     path('students/export/', views.export_students_list, name='export_students'),
+    path('exports/', views.start_bulk_export, name='start_bulk_export'),
+    path('exports/<int:job_id>/', views.export_job_status, name='export_job_status'),
+    path('exports/<int:job_id>/download/', views.download_export, name='download_export'),
 ]
\ No newline at end of file
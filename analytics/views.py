@@ -1,30 +1,39 @@
 from django.shortcuts import render, get_object_or_404
+from django.urls import reverse
+from django.views.decorators.http import require_POST
 from django.contrib.admin.views.decorators import staff_member_required
-from django.db.models import Count
-from django.http import HttpResponse
-from forms_app.models import FeedbackForm, Question, Response, MCQOption
-from core.models import School, Department, Course
-from accounts.models import Student, StudentCourse
+from django.http import HttpResponse, FileResponse, JsonResponse, Http404
+from forms_app.models import FeedbackForm, Question
+from .results import form_results_payload, text_answer_page, TEXT_PAGE_SIZE, MAX_TEXT_PAGE_SIZE
+from .counters import submission_total
+from . import statistics, progress
+from .exports import form_workbook_file, report_filename, XLSX_CONTENT_TYPE
+from .models import ReportExportJob
+from core.models import School, Department
+from core import reference_data
+from core.decorators import async_staff_member_required
+from accounts.models import Student
 import openpyxl
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from collections import Counter
 from datetime import datetime
 
 @staff_member_required
 def analytics_dashboard(request):
-    schools = School.objects.all()
+    schools = reference_data.get_schools()
     selected_school = request.GET.get('school')
     selected_department = request.GET.get('department')
     selected_course = request.GET.get('course')
     
-    departments = Department.objects.none()
-    courses = Course.objects.none()
+    departments = []
+    courses = []
     forms = FeedbackForm.objects.none()
     
     if selected_school:
-        departments = Department.objects.filter(school_id=selected_school)
+        departments = reference_data.get_departments(selected_school)
     
     if selected_department:
-        courses = Course.objects.filter(department_id=selected_department)
+        courses = reference_data.get_courses(selected_department)
     
     if selected_course:
         forms = FeedbackForm.objects.filter(course_id=selected_course).select_related(
@@ -42,8 +51,107 @@ def analytics_dashboard(request):
     }
     return render(request, 'analytics/dashboard.html', context)
 
+@staff_member_required
+def teacher_comparison(request):
+    """Rank the teachers of a department by their pooled scores across all their forms"""
+    schools = reference_data.get_schools()
+    selected_school = request.GET.get('school')
+    selected_department = request.GET.get('department')
+
+    departments = reference_data.get_departments(selected_school) if selected_school else []
+    comparison = None
+    if selected_department:
+        # Reads the department's teacher rollups only, never the responses table
+        comparison = statistics.teacher_comparison(selected_department)
+        orders = comparison['question_orders']
+        comparison['department_cells'] = [comparison['department'][order] for order in orders]
+        for teacher in comparison['teachers']:
+            teacher['order_cells'] = []
+            for order in orders:
+                metrics = teacher.get('by_order', {}).get(order)
+                trend = ''
+                if metrics and metrics['mean'] is not None:
+                    department_mean = comparison['department'][order]['mean']
+                    if metrics['mean'] > department_mean:
+                        trend = 'above'
+                    elif metrics['mean'] < department_mean:
+                        trend = 'below'
+                teacher['order_cells'].append({'metrics': metrics, 'trend': trend})
+
+    context = {
+        'schools': schools,
+        'departments': departments,
+        'selected_school': selected_school,
+        'selected_department': selected_department,
+        'comparison': comparison,
+    }
+    return render(request, 'analytics/teacher_comparison.html', context)
+
+def _progress_forms(request):
+    """Forms selected by the school/department/course filters of the progress page"""
+    forms = FeedbackForm.objects.filter(is_master=False).order_by('course__code', 'title')
+    if request.GET.get('all') != '1':
+        forms = forms.filter(is_active=True)
+    if request.GET.get('course'):
+        forms = forms.filter(course_id=request.GET['course'])
+    elif request.GET.get('department'):
+        forms = forms.filter(course__department_id=request.GET['department'])
+    elif request.GET.get('school'):
+        forms = forms.filter(course__department__school_id=request.GET['school'])
+    return forms
+
+def _sparkline(hourly):
+    peak = max(hourly) or 1
+    return [{'count': count, 'height': round(count * 100 / peak)} for count in hourly]
+
+@staff_member_required
+def submission_progress(request):
+    """Live submission progress of each form, read from the counter tables only"""
+    selected_school = request.GET.get('school')
+    selected_department = request.GET.get('department')
+    rows = progress.form_progress(_progress_forms(request))
+    for row in rows:
+        row['sparkline'] = _sparkline(row['hourly'])
+
+    context = {
+        'schools': reference_data.get_schools(),
+        'departments': reference_data.get_departments(selected_school) if selected_school else [],
+        'selected_school': selected_school,
+        'selected_department': selected_department,
+        'show_all': request.GET.get('all') == '1',
+        'rows': rows,
+        'summary': progress.progress_summary(rows),
+        'data_url': reverse('analytics:submission_progress_data') + '?' + request.GET.urlencode(),
+    }
+    return render(request, 'analytics/progress.html', context)
+
+@staff_member_required
+def submission_progress_data(request):
+    """JSON form of the progress page, polled by the page to stay current"""
+    rows = progress.form_progress(_progress_forms(request))
+    return JsonResponse({
+        'summary': progress.progress_summary(rows),
+        'forms': [
+            {
+                'id': row['id'],
+                'submissions': row['submissions'],
+                'enrolled': row['enrolled'],
+                'completion': row['completion'],
+                'this_hour': row['this_hour'],
+                'today': row['today'],
+                'hourly': row['hourly'],
+            }
+            for row in rows
+        ],
+    })
+
 @staff_member_required
 def form_results(request, form_id):
+    """
+    Results page shell: form details and score statistics. Option counts and
+    text answers are fetched by the page from the JSON endpoints as each
+    question scrolls into view.
+    """
     form = get_object_or_404(
         FeedbackForm.objects.select_related(
             'course', 'teacher', 'course__department', 'course__department__school'
@@ -51,81 +159,63 @@ def form_results(request, form_id):
         id=form_id
     )
     
-    questions = form.questions.all().prefetch_related('options')
-    total_submissions = form.submissions.count()
-    
-    results = []
-    
-    for question in questions:
-        question_data = {
+    total_submissions = submission_total(form)
+    questions = list(form.questions.all())
+
+    # Precomputed score statistics, next to the department average of the same question
+    question_stats = statistics.question_statistics(form)
+    department_stats = statistics.department_question_statistics(form.course.department_id)
+    results = [
+        {
             'question': question,
-            'total_responses': 0,
-            'data': []
+            'statistics': question_stats.get(question.id),
+            'department_statistics': department_stats.get(question.order),
         }
-        
-        if question.question_type == 'mcq':
-            # Get all options for this question first
-            all_options = question.options.all().order_by('order')
-            
-            # Get response counts for each option
-            option_counts = Response.objects.filter(
-                question=question,
-                mcq_answer__isnull=False
-            ).values(
-                'mcq_answer__id',
-                'mcq_answer__option_text',
-                'mcq_answer__order'
-            ).annotate(
-                count=Count('id')
-            ).order_by('mcq_answer__order')
-            
-            # Convert to dict for easier lookup
-            counts_dict = {item['mcq_answer__id']: item for item in option_counts}
-            
-            # Build complete data including options with 0 responses
-            complete_data = []
-            for option in all_options:
-                if option.id in counts_dict:
-                    complete_data.append(counts_dict[option.id])
-                else:
-                    # Add option with 0 count
-                    complete_data.append({
-                        'mcq_answer__id': option.id,
-                        'mcq_answer__option_text': option.option_text,
-                        'mcq_answer__order': option.order,
-                        'count': 0
-                    })
-            
-            question_data['total_responses'] = sum(item['count'] for item in complete_data)
-            question_data['data'] = complete_data
-            
-        elif question.question_type == 'text':
-            # Get all text responses with student info
-            text_responses = Response.objects.filter(
-                question=question,
-                text_answer__isnull=False
-            ).exclude(
-                text_answer=''
-            ).select_related(
-                'submission__student'
-            ).values_list(
-                'text_answer',
-                'submission__student__name',
-                'submission__submitted_at'
-            ).order_by('-submission__submitted_at')
-            
-            question_data['total_responses'] = text_responses.count()
-            question_data['data'] = list(text_responses)
-        
-        results.append(question_data)
+        for question in questions
+    ]
+
+    teacher_ranking = statistics.teacher_statistics(form.course.department_id)
+    teacher_rank = next(
+        (rank for rank, row in enumerate(teacher_ranking, 1) if row['teacher_id'] == form.teacher_id),
+        None
+    )
     
     context = {
         'form': form,
         'results': results,
         'total_submissions': total_submissions,
+        'teacher_stats': teacher_ranking[teacher_rank - 1] if teacher_rank else None,
+        'teacher_rank': teacher_rank,
+        'teachers_ranked': len(teacher_ranking),
+        'results_url': reverse('analytics:form_results_api', args=[form.id]),
     }
     return render(request, 'analytics/form_results.html', context)
 
+@async_staff_member_required
+async def form_results_api(request, form_id):
+    """Compact JSON results of a form, served by an async view"""
+    try:
+        form = await FeedbackForm.objects.select_related('course__department', 'teacher').aget(id=form_id)
+    except FeedbackForm.DoesNotExist:
+        raise Http404('No FeedbackForm matches the given query.')
+    return JsonResponse(await form_results_payload(form))
+
+@async_staff_member_required
+async def form_text_answers_api(request, form_id, question_id):
+    """Cursor-paginated text answers of one question (?cursor=<next_cursor>&limit=<n>)"""
+    try:
+        question = await Question.objects.aget(id=question_id, form_id=form_id, question_type='text')
+    except Question.DoesNotExist:
+        raise Http404('No text question matches the given query.')
+
+    cursor = request.GET.get('cursor')
+    limit = request.GET.get('limit', str(TEXT_PAGE_SIZE))
+    if (cursor and not cursor.isdigit()) or not limit.isdigit() or not 0 < int(limit) <= MAX_TEXT_PAGE_SIZE:
+        return JsonResponse({'error': f'cursor must be a next_cursor value and limit between 1 and {MAX_TEXT_PAGE_SIZE}.'}, status=400)
+
+    page = await text_answer_page(question, int(cursor) if cursor else None, int(limit))
+    return JsonResponse(page)
+
 @staff_member_required
 def export_form_results(request, form_id):
     """Export form results to Excel file"""
@@ -136,171 +226,13 @@ def export_form_results(request, form_id):
         id=form_id
     )
     
-    # Create workbook
-    wb = openpyxl.Workbook()
-    
-    # Summary Sheet
-    ws_summary = wb.active
-    ws_summary.title = "Summary"
-    
-    # Header styling
-    header_fill = PatternFill(start_color="6366F1", end_color="6366F1", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
+    # A write-only workbook streamed from a temporary file, whatever the size of the form
+    return FileResponse(
+        form_workbook_file(form),
+        as_attachment=True,
+        filename=report_filename(form),
+        content_type=XLSX_CONTENT_TYPE
     )
-    
-    # Summary information
-    ws_summary['A1'] = "Feedback Report"
-    ws_summary['A1'].font = Font(bold=True, size=16, color="6366F1")
-    
-    ws_summary['A3'] = "Form Title:"
-    ws_summary['B3'] = form.title
-    ws_summary['A4'] = "Course:"
-    ws_summary['B4'] = f"{form.course.code} - {form.course.name}"
-    ws_summary['A5'] = "Teacher:"
-    ws_summary['B5'] = form.teacher.name
-    ws_summary['A6'] = "Department:"
-    ws_summary['B6'] = form.course.department.name
-    ws_summary['A7'] = "School:"
-    ws_summary['B7'] = form.course.department.school.name
-    ws_summary['A8'] = "Total Submissions:"
-    ws_summary['B8'] = form.submissions.count()
-    ws_summary['A9'] = "Generated On:"
-    ws_summary['B9'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    # Make labels bold
-    for row in range(3, 10):
-        ws_summary[f'A{row}'].font = Font(bold=True)
-    
-    # MCQ Results Sheet
-    ws_mcq = wb.create_sheet("MCQ Results")
-    
-    # Headers
-    ws_mcq['A1'] = "Question"
-    ws_mcq['B1'] = "Option"
-    ws_mcq['C1'] = "Count"
-    ws_mcq['D1'] = "Percentage"
-    
-    for col in ['A', 'B', 'C', 'D']:
-        ws_mcq[f'{col}1'].fill = header_fill
-        ws_mcq[f'{col}1'].font = header_font
-        ws_mcq[f'{col}1'].border = border
-        ws_mcq[f'{col}1'].alignment = Alignment(horizontal='center', vertical='center')
-    
-    current_row = 2
-    questions = form.questions.filter(question_type='mcq').prefetch_related('options')
-    
-    for question in questions:
-        # Get response counts
-        option_counts = Response.objects.filter(
-            question=question,
-            mcq_answer__isnull=False
-        ).values(
-            'mcq_answer__option_text'
-        ).annotate(
-            count=Count('id')
-        ).order_by('mcq_answer__order')
-        
-        total_responses = sum(item['count'] for item in option_counts)
-        
-        # Write question and options
-        first_row = current_row
-        for idx, item in enumerate(option_counts):
-            if idx == 0:
-                ws_mcq[f'A{current_row}'] = f"Q{question.order}: {question.question_text}"
-                ws_mcq[f'A{current_row}'].font = Font(bold=True)
-            
-            ws_mcq[f'B{current_row}'] = item['mcq_answer__option_text']
-            ws_mcq[f'C{current_row}'] = item['count']
-            
-            if total_responses > 0:
-                percentage = (item['count'] / total_responses) * 100
-                ws_mcq[f'D{current_row}'] = f"{percentage:.1f}%"
-            else:
-                ws_mcq[f'D{current_row}'] = "0%"
-            
-            # Apply borders
-            for col in ['A', 'B', 'C', 'D']:
-                ws_mcq[f'{col}{current_row}'].border = border
-            
-            current_row += 1
-        
-        # Merge question cells
-        if len(option_counts) > 1:
-            ws_mcq.merge_cells(f'A{first_row}:A{current_row-1}')
-        
-        current_row += 1  # Empty row between questions
-    
-    # Text Responses Sheet
-    ws_text = wb.create_sheet("Text Responses")
-    
-    # Headers
-    ws_text['A1'] = "Question"
-    ws_text['B1'] = "Student"
-    ws_text['C1'] = "Response"
-    ws_text['D1'] = "Submitted On"
-    
-    for col in ['A', 'B', 'C', 'D']:
-        ws_text[f'{col}1'].fill = header_fill
-        ws_text[f'{col}1'].font = header_font
-        ws_text[f'{col}1'].border = border
-        ws_text[f'{col}1'].alignment = Alignment(horizontal='center', vertical='center')
-    
-    current_row = 2
-    text_questions = form.questions.filter(question_type='text')
-    
-    for question in text_questions:
-        responses = Response.objects.filter(
-            question=question,
-            text_answer__isnull=False
-        ).exclude(
-            text_answer=''
-        ).select_related(
-            'submission__student'
-        ).order_by('submission__submitted_at')
-        
-        for response in responses:
-            ws_text[f'A{current_row}'] = f"Q{question.order}: {question.question_text}"
-            ws_text[f'B{current_row}'] = response.submission.student.name
-            ws_text[f'C{current_row}'] = response.text_answer
-            ws_text[f'D{current_row}'] = response.submission.submitted_at.strftime("%Y-%m-%d %H:%M")
-            
-            # Apply borders
-            for col in ['A', 'B', 'C', 'D']:
-                ws_text[f'{col}{current_row}'].border = border
-            
-            # Wrap text for response column
-            ws_text[f'C{current_row}'].alignment = Alignment(wrap_text=True, vertical='top')
-            
-            current_row += 1
-    
-    # Adjust column widths
-    ws_summary.column_dimensions['A'].width = 20
-    ws_summary.column_dimensions['B'].width = 50
-    
-    ws_mcq.column_dimensions['A'].width = 50
-    ws_mcq.column_dimensions['B'].width = 40
-    ws_mcq.column_dimensions['C'].width = 12
-    ws_mcq.column_dimensions['D'].width = 12
-    
-    ws_text.column_dimensions['A'].width = 50
-    ws_text.column_dimensions['B'].width = 25
-    ws_text.column_dimensions['C'].width = 60
-    ws_text.column_dimensions['D'].width = 18
-    
-    # Create response
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    filename = f"Feedback_{form.course.code}_{form.teacher.name.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.xlsx"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    wb.save(response)
-    return response
 
 @staff_member_required
 def export_students_list(request):
@@ -336,12 +268,19 @@ def export_students_list(request):
         'school', 'department'
     ).prefetch_related('enrolled_courses__course').order_by('school', 'department', 'name')
     
-    # Write data
+    # Write data, counting the summary distributions from the same rows
     row_num = 2
+    total_students = 0
+    school_counts = Counter()
+    department_counts = Counter()
     for idx, student in enumerate(students, 1):
-        # Get enrolled courses
+        total_students = idx
+        school_counts[student.school_id] += 1
+        department_counts[student.department_id] += 1
+        
+        # Enrolled courses come from the prefetch cache
         courses = student.enrolled_courses.all()
-        course_list = ', '.join([f"{sc.course.code}" for sc in courses]) if courses.exists() else 'None'
+        course_list = ', '.join([f"{sc.course.code}" for sc in courses]) if courses else 'None'
         
         # Write row
         ws.cell(row=row_num, column=1, value=idx)
@@ -373,7 +312,7 @@ def export_students_list(request):
     ws_summary['A1'].font = Font(bold=True, size=16, color="6366F1")
     
     ws_summary['A3'] = "Total Students:"
-    ws_summary['B3'] = students.count()
+    ws_summary['B3'] = total_students
     ws_summary['A4'] = "Generated On:"
     ws_summary['B4'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
@@ -384,9 +323,8 @@ def export_students_list(request):
     
     schools = School.objects.all()
     for school in schools:
-        school_students = students.filter(school=school).count()
         ws_summary[f'A{row}'] = school.name
-        ws_summary[f'B{row}'] = school_students
+        ws_summary[f'B{row}'] = school_counts[school.id]
         row += 1
     
     # Department-wise count
@@ -394,11 +332,10 @@ def export_students_list(request):
     ws_summary[f'A{row+1}'].font = Font(bold=True)
     row += 2
     
-    departments = Department.objects.all()
+    departments = Department.objects.select_related('school')
     for dept in departments:
-        dept_students = students.filter(department=dept).count()
         ws_summary[f'A{row}'] = f"{dept.name} ({dept.school.name})"
-        ws_summary[f'B{row}'] = dept_students
+        ws_summary[f'B{row}'] = department_counts[dept.id]
         row += 1
     
     ws_summary.column_dimensions['A'].width = 40
@@ -412,4 +349,67 @@ def export_students_list(request):
     response['Content-Disposition'] = f'attachment; filename="{filename}"'
     
     wb.save(response)
-    return response
\ No newline at end of file
+    return response
+
+def _job_status(job):
+    data = {
+        'id': job.id,
+        'status': job.status,
+        'total_forms': job.total_forms,
+        'processed_forms': job.processed_forms,
+        'progress': job.progress(),
+        'error': job.error,
+        'download_url': None,
+    }
+    if job.status == 'done' and job.file:
+        data['download_url'] = reverse('analytics:download_export', args=[job.id])
+    return data
+
+@staff_member_required
+@require_POST
+def start_bulk_export(request):
+    """Queue a bulk report export for the most specific selected school, department or course"""
+    scope, scope_id = None, None
+    for name in ('course', 'department', 'school'):
+        value = request.POST.get(name)
+        if value and value.isdigit():
+            scope, scope_id = name, int(value)
+            break
+    
+    if scope is None:
+        return JsonResponse({'error': 'Select a school, department or course first.'}, status=400)
+    
+    output_format = request.POST.get('output_format', 'xlsx')
+    if output_format not in dict(ReportExportJob.FORMATS):
+        return JsonResponse({'error': 'Unknown export format.'}, status=400)
+    
+    job = ReportExportJob.objects.create(
+        requested_by=request.user,
+        scope=scope,
+        scope_id=scope_id,
+        output_format=output_format
+    )
+    data = _job_status(job)
+    data['status_url'] = reverse('analytics:export_job_status', args=[job.id])
+    return JsonResponse(data, status=202)
+
+@staff_member_required
+def export_job_status(request, job_id):
+    """Pollable progress of a bulk report export"""
+    job = get_object_or_404(ReportExportJob, id=job_id)
+    return JsonResponse(_job_status(job))
+
+@staff_member_required
+def download_export(request, job_id):
+    """Download the finished file of a bulk report export"""
+    job = get_object_or_404(ReportExportJob, id=job_id, status='done')
+    if not job.file:
+        raise Http404('Export file is missing')
+    
+    content_type = XLSX_CONTENT_TYPE if job.output_format == 'xlsx' else 'application/zip'
+    return FileResponse(
+        job.file.open('rb'),
+        as_attachment=True,
+        filename=job.file.name.split('/')[-1],
+        content_type=content_type
+    )
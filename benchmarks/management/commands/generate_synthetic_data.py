@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from benchmarks import synthetic
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic institution with students, feedback forms and submissions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schools', type=int, help='Number of schools')
+        parser.add_argument('--departments', type=int, help='Departments per school')
+        parser.add_argument('--courses', type=int, help='Courses per department')
+        parser.add_argument('--teachers', type=int, help='Teachers per department')
+        parser.add_argument('--students', type=int, help='Total number of students')
+        parser.add_argument('--courses-per-student', type=int, help='Courses each student is enrolled in')
+        parser.add_argument('--forms-per-course', type=int, help='Feedback forms per course')
+        parser.add_argument('--mcq-questions', type=int, help='MCQ questions per form')
+        parser.add_argument('--text-questions', type=int, help='Text questions per form')
+        parser.add_argument('--submission-rate', type=float, help='Share of enrolled students who submit each form (0-1)')
+        parser.add_argument('--seed', type=int, help='Random seed, for reproducible datasets')
+        parser.add_argument('--prefix', help='Prefix for codes and roll numbers, to keep datasets apart')
+        parser.add_argument('--password', help='Password of every synthetic student; by default they cannot log in')
+        parser.add_argument('--force', action='store_true', help='Run even though DEBUG is off')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError(
+                f'DEBUG is off, so {connection.settings_dict["NAME"]} may be a production database. '
+                'Pass --force to add synthetic data to it anyway.'
+            )
+
+        keys = synthetic.DEFAULTS.keys()
+        created = synthetic.generate(password=options['password'], **{key: options.get(key) for key in keys})
+        for model, count in created.items():
+            self.stdout.write(f'{model}: {count}')
+        if options['password']:
+            self.stdout.write(self.style.SUCCESS('Synthetic data generated. Students log in with the given password.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Synthetic data generated. Students cannot log in; pass --password to allow it.'))
@@ -0,0 +1,91 @@
+import json
+import platform
+import subprocess
+from datetime import datetime
+import django
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_databases, teardown_databases, setup_test_environment, teardown_test_environment
+from benchmarks import suite, synthetic
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the main views on synthetic datasets of several sizes, in a throwaway test database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='small,medium',
+            help=f'Comma separated dataset sizes to run ({", ".join(suite.SIZES)})'
+        )
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per scenario; the median is reported')
+        parser.add_argument('--logins', type=int, default=40, help='Logins per login throughput run (0 to skip)')
+        parser.add_argument(
+            '--login-threads', type=int, default=4,
+            help='Threads of the concurrent login throughput run, next to the one-at-a-time run'
+        )
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        sizes = [size.strip() for size in options['sizes'].split(',') if size.strip()]
+        unknown = [size for size in sizes if size not in suite.SIZES]
+        if unknown:
+            raise CommandError(f'Unknown size(s): {", ".join(unknown)}')
+
+        report = {
+            'meta': {
+                'commit': git_commit(),
+                'generated_at': datetime.now().isoformat(timespec='seconds'),
+                'database': connection.vendor,
+                'django': django.get_version(),
+                'python': platform.python_version(),
+                'repeat': options['repeat'],
+            },
+            'results': [],
+        }
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            for size in sizes:
+                call_command('flush', interactive=False, verbosity=0)
+                # flush restarts the ids, so cached dashboards of the last size would match new students
+                cache.clear()
+                dataset = synthetic.generate(password=suite.STUDENT_PASSWORD, **suite.SIZES[size])
+                self.stdout.write(self.style.MIGRATE_HEADING(
+                    f'{size}: {dataset["students"]} students, {dataset["forms"]} forms, {dataset["responses"]} responses'
+                ))
+
+                for scenario, measurements in suite.run_scenarios(options['repeat']).items():
+                    summary = suite.summarize(measurements)
+                    report['results'].append(dict(size=size, scenario=scenario, dataset=dataset, **summary))
+                    self.stdout.write(
+                        f'  {scenario:<28} queries={summary.get("queries")} '
+                        f'wall_ms={summary.get("wall_ms")} peak_kib={summary.get("peak_kib")}'
+                    )
+
+                if options['logins']:
+                    for threads in sorted({1, options['login_threads']}):
+                        throughput = suite.login_throughput(options['logins'], threads)
+                        scenario = f'login_threads_{threads}'
+                        report['results'].append(dict(size=size, scenario=scenario, dataset=dataset, **throughput))
+                        self.stdout.write(
+                            f'  {scenario:<28} logins={throughput["logins"]} failed={throughput["failed"]} '
+                            f'logins_per_sec={throughput["logins_per_sec"]}'
+                        )
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}'))
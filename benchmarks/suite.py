@@ -0,0 +1,214 @@
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from django.core.cache import cache
+from django.db import connection, connections
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from accounts.models import Student, StudentCourse
+from forms_app.models import Teacher, FeedbackForm, FormSubmission
+from forms_app.allocation import create_forms_with_questions
+from . import synthetic
+
+SIZES = {
+    'small': {'schools': 1, 'departments': 2, 'courses': 3, 'teachers': 3, 'students': 100},
+    'medium': {'schools': 2, 'departments': 3, 'courses': 4, 'teachers': 4, 'students': 1000},
+    'large': {'schools': 3, 'departments': 4, 'courses': 5, 'teachers': 5, 'students': 5000},
+}
+
+STAFF_ROLL_NUMBER = 'BENCH-STAFF'
+# Password of the synthetic students, for the login throughput runs
+STUDENT_PASSWORD = 'password'
+
+
+def measure(func):
+    """Run func once and return its query count, wall time (ms) and peak Python memory (KiB)"""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        status = func()
+        elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'status': status,
+        'queries': len(queries.captured_queries),
+        'wall_ms': round(elapsed * 1000, 2),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def _consume(response):
+    # Streaming responses only do their work while being read
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response.status_code
+
+
+class Workload:
+    """Fixtures and request helpers shared by the scenarios of one dataset"""
+
+    def __init__(self):
+        self.client = Client()
+        self.staff, _ = Student.objects.get_or_create(
+            roll_number=STAFF_ROLL_NUMBER,
+            defaults={'name': 'Benchmark Staff', 'is_staff': True, 'is_admin': True, 'is_superuser': True}
+        )
+        self.busiest_form = FeedbackForm.objects.annotate(
+            total=Count('submissions')
+        ).order_by('-total').first()
+        self.master_count = 0
+
+    def login(self, user):
+        self.client.force_login(user)
+
+    def unsubmitted_pairs(self, limit):
+        """(student, form) pairs where an enrolled student has not yet submitted an active form"""
+        submitted = set(FormSubmission.objects.values_list('student_id', 'form_id'))
+        pairs = []
+        enrollments = StudentCourse.objects.select_related('student').order_by('id')
+        forms_by_course = {}
+        for form in FeedbackForm.objects.filter(is_active=True):
+            forms_by_course.setdefault(form.course_id, []).append(form)
+        for enrollment in enrollments.iterator():
+            for form in forms_by_course.get(enrollment.course_id, []):
+                if (enrollment.student_id, form.id) not in submitted:
+                    pairs.append((enrollment.student, form))
+                    if len(pairs) >= limit:
+                        return pairs
+        return pairs
+
+    def answers(self, form):
+        data = {}
+        for question in form.questions.prefetch_related('options'):
+            if question.question_type == 'mcq':
+                data[f'question_{question.id}'] = str(question.options.all()[0].id)
+            else:
+                data[f'question_{question.id}'] = 'Benchmark comment'
+        return data
+
+    def new_master_form(self):
+        """A fresh master form, so every allocation run creates the same number of forms"""
+        self.master_count += 1
+        source = self.busiest_form
+        master = FeedbackForm(
+            course=source.course,
+            teacher=source.teacher,
+            title=f'[MASTER] Benchmark Template {self.master_count}',
+            is_active=False,
+            is_master=True
+        )
+        create_forms_with_questions([master], synthetic.question_tree(
+            synthetic.DEFAULTS['mcq_questions'], synthetic.DEFAULTS['text_questions']
+        ))
+        return master
+
+
+def scenario_fill_form(workload, repeat):
+    results = []
+    for student, form in workload.unsubmitted_pairs(repeat):
+        data = workload.answers(form)
+        workload.login(student)
+        results.append(measure(lambda: workload.client.post(f'/form/{form.id}/', data).status_code))
+    return results
+
+
+def scenario_dashboard(workload, repeat, warm):
+    results = []
+    for student in Student.objects.filter(enrolled_courses__isnull=False).distinct()[:repeat]:
+        workload.login(student)
+        if warm:
+            workload.client.get('/')
+        else:
+            cache.clear()
+        results.append(measure(lambda: workload.client.get('/').status_code))
+    return results
+
+
+def scenario_staff_get(workload, repeat, url):
+    workload.login(workload.staff)
+    return [measure(lambda: _consume(workload.client.get(url))) for _ in range(repeat)]
+
+
+def scenario_allocation(workload, repeat):
+    workload.login(workload.staff)
+    department = workload.busiest_form.course.department
+    teachers = list(Teacher.objects.filter(department=department).values_list('id', flat=True))
+    courses = list(department.courses.values_list('id', flat=True))
+    results = []
+    for _ in range(repeat):
+        master = workload.new_master_form()
+        data = {'master_form': master.id, 'teachers': teachers, 'courses': courses, 'is_active': 'on'}
+        results.append(measure(lambda: workload.client.post('/admin/forms_app/feedbackform/allocate/', data).status_code))
+    return results
+
+
+def _post_login(roll_number):
+    client = Client()
+    response = client.post('/accounts/login/', {'username': roll_number, 'password': STUDENT_PASSWORD})
+    return response.status_code
+
+
+def _post_login_in_thread(roll_number):
+    try:
+        return _post_login(roll_number)
+    finally:
+        connections.close_all()
+
+
+def login_throughput(logins, threads=1):
+    """
+    Log synthetic students in through the login view and return the logins per
+    second one process sustains. With threads > 1 the logins run concurrently
+    in a thread pool, as in a threaded or ASGI worker; PBKDF2 releases the GIL,
+    so this shows how far password hashing scales across cores.
+    """
+    roll_numbers = list(Student.objects.filter(is_staff=False).order_by('id').values_list(
+        'roll_number', flat=True
+    )[:logins])
+    started = time.perf_counter()
+    if threads > 1:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            statuses = list(pool.map(_post_login_in_thread, roll_numbers))
+    else:
+        statuses = [_post_login(roll_number) for roll_number in roll_numbers]
+    elapsed = time.perf_counter() - started
+    return {
+        'threads': threads,
+        'logins': len(statuses),
+        # A successful login redirects to the dashboard
+        'failed': sum(status != 302 for status in statuses),
+        'wall_ms': round(elapsed * 1000, 2),
+        'logins_per_sec': round(len(statuses) / elapsed, 1) if elapsed else None,
+    }
+
+
+def run_scenarios(repeat):
+    """Run every scenario against the current database and return {scenario: [measurements]}"""
+    workload = Workload()
+    form_id = workload.busiest_form.id
+    scenarios = [
+        ('dashboard_cold', lambda: scenario_dashboard(workload, repeat, warm=False)),
+        ('dashboard_warm', lambda: scenario_dashboard(workload, repeat, warm=True)),
+        ('form_results', lambda: scenario_staff_get(workload, repeat, f'/analytics/form/{form_id}/results/')),
+        ('form_results_api', lambda: scenario_staff_get(workload, repeat, f'/analytics/api/form/{form_id}/results/')),
+        ('export_form_results', lambda: scenario_staff_get(workload, repeat, f'/analytics/form/{form_id}/export/')),
+        ('export_students_list', lambda: scenario_staff_get(workload, repeat, '/analytics/students/export/')),
+        ('admin_allocation', lambda: scenario_allocation(workload, repeat)),
+        ('fill_form_post', lambda: scenario_fill_form(workload, repeat)),
+    ]
+    return {name: run() for name, run in scenarios}
+
+
+def summarize(measurements):
+    """Median of each metric over the repeated runs of a scenario"""
+    if not measurements:
+        return {'runs': 0}
+    summary = {'runs': len(measurements), 'status': measurements[0]['status']}
+    for metric in ('queries', 'wall_ms', 'peak_kib'):
+        values = sorted(m[metric] for m in measurements)
+        summary[metric] = values[len(values) // 2]
+    return summary
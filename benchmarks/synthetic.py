@@ -0,0 +1,215 @@
+import random
+from datetime import date
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from accounts.models import Student, StudentCourse
+from forms_app.allocation import create_forms_with_questions
+from core.models import School, Department, Course
+from core.reference_data import bump_reference_version
+from forms_app.models import Teacher, FeedbackForm, Question, FormSubmission, Response, MCQOption
+from analytics import counters, statistics, progress
+
+BATCH_SIZE = 1000
+
+RATING_OPTIONS = ['Poor', 'Fair', 'Good', 'Very Good', 'Excellent']
+COMMENT_WORDS = [
+    'clear', 'helpful', 'engaging', 'fast', 'slow', 'examples', 'notes', 'lab',
+    'assignments', 'explains', 'concepts', 'well', 'more', 'practice', 'doubts',
+]
+
+DEFAULTS = {
+    'schools': 2,
+    'departments': 3,
+    'courses': 4,
+    'teachers': 4,
+    'students': 200,
+    'courses_per_student': 3,
+    'forms_per_course': 1,
+    'mcq_questions': 15,
+    'text_questions': 2,
+    'submission_rate': 0.8,
+    'seed': 42,
+    'prefix': 'SYN',
+}
+
+
+def question_tree(mcq_questions, text_questions):
+    """A feedback form layout shaped like the standard 17 question master form"""
+    tree = []
+    for order in range(1, mcq_questions + 1):
+        tree.append(({
+            'question_text': f'Rate the teacher on aspect {order}',
+            'question_type': 'mcq',
+            'order': order,
+            'is_required': True,
+            'is_rating_scale': True,
+        }, [{'option_text': text, 'order': idx} for idx, text in enumerate(RATING_OPTIONS, 1)]))
+    for order in range(mcq_questions + 1, mcq_questions + text_questions + 1):
+        tree.append(({
+            'question_text': f'Any other comments ({order})',
+            'question_type': 'text',
+            'order': order,
+            'is_required': False,
+        }, []))
+    return tree
+
+
+def generate(password=None, **options):
+    """
+    Generate a synthetic institution with students, forms and submissions.
+
+    Every keyword of DEFAULTS can be overridden. Students get an unusable
+    password unless one is given. All rows are written with batched inserts
+    and the analytics counters, statistics and progress buckets of the new
+    forms are rebuilt at the end; existing data is left alone.
+    Returns a dict with the number of rows created per model.
+    """
+    opts = dict(DEFAULTS, **{key: value for key, value in options.items() if value is not None})
+    rng = random.Random(opts['seed'])
+    prefix = opts['prefix']
+
+    with transaction.atomic():
+        schools = School.objects.bulk_create([
+            School(name=f'{prefix} School {s}', code=f'{prefix}-S{s}')
+            for s in range(opts['schools'])
+        ])
+
+        departments = Department.objects.bulk_create([
+            Department(school=school, name=f'{prefix} Department {school.code}-{d}', code=f'D{d}')
+            for school in schools
+            for d in range(opts['departments'])
+        ])
+
+        year = date.today().year
+        courses = Course.objects.bulk_create([
+            Course(department=dept, name=f'Course {dept.pk}-{c}', code=f'{prefix}{dept.pk}{c:02d}', semester=1, year=year)
+            for dept in departments
+            for c in range(opts['courses'])
+        ], batch_size=BATCH_SIZE)
+
+        teachers = Teacher.objects.bulk_create([
+            Teacher(
+                name=f'Teacher {dept.pk}-{t}',
+                email=f'{prefix.lower()}.teacher.{dept.pk}.{t}@example.com',
+                employee_id=f'{prefix}-E{dept.pk}-{t}',
+                department=dept
+            )
+            for dept in departments
+            for t in range(opts['teachers'])
+        ], batch_size=BATCH_SIZE)
+
+        # Hashing once keeps generation fast; make_password(None) is unusable, so nobody can log in
+        password = make_password(password)
+        students = Student.objects.bulk_create([
+            Student(
+                roll_number=f'{prefix}{n:06d}',
+                name=f'Student {n}',
+                school=dept.school,
+                department=dept,
+                password=password
+            )
+            for n, dept in ((n, rng.choice(departments)) for n in range(opts['students']))
+        ], batch_size=BATCH_SIZE)
+
+        courses_by_dept = {}
+        for course in courses:
+            courses_by_dept.setdefault(course.department_id, []).append(course)
+        teachers_by_dept = {}
+        for teacher in teachers:
+            teachers_by_dept.setdefault(teacher.department_id, []).append(teacher)
+
+        enrollments = []
+        for student in students:
+            dept_courses = courses_by_dept[student.department_id]
+            for course in rng.sample(dept_courses, min(opts['courses_per_student'], len(dept_courses))):
+                enrollments.append(StudentCourse(student=student, course=course))
+        StudentCourse.objects.bulk_create(enrollments, batch_size=BATCH_SIZE)
+
+        forms = [
+            FeedbackForm(
+                course=course,
+                teacher=rng.choice(teachers_by_dept[course.department_id]),
+                title=f'{prefix} Feedback {course.code} #{f}',
+                is_active=True
+            )
+            for course in courses
+            for f in range(opts['forms_per_course'])
+        ]
+        create_forms_with_questions(forms, question_tree(opts['mcq_questions'], opts['text_questions']))
+
+        submissions, responses = _generate_submissions(rng, forms, enrollments, opts['submission_rate'])
+
+        form_ids = [form.id for form in forms]
+        counters.rebuild(form_ids)
+        statistics.rebuild(form_ids)
+        progress.rebuild(form_ids)
+        # bulk_create sends no signals; the new students have no cached dashboards yet
+        transaction.on_commit(bump_reference_version)
+
+    return {
+        'schools': len(schools),
+        'departments': len(departments),
+        'courses': len(courses),
+        'teachers': len(teachers),
+        'students': len(students),
+        'enrollments': len(enrollments),
+        'forms': len(forms),
+        'submissions': submissions,
+        'responses': responses,
+    }
+
+
+def _generate_submissions(rng, forms, enrollments, submission_rate):
+    """Submit a share of the enrolled students to each form, batch by batch"""
+    forms_by_course = {}
+    for form in forms:
+        forms_by_course.setdefault(form.course_id, []).append(form)
+
+    questions = {}
+    for question_id, form_id, question_type in Question.objects.filter(
+        form__in=forms
+    ).values_list('id', 'form_id', 'question_type'):
+        questions.setdefault(form_id, []).append((question_id, question_type))
+
+    options = {}
+    for question_id, option_id in MCQOption.objects.filter(
+        question__form__in=forms
+    ).values_list('question_id', 'id'):
+        options.setdefault(question_id, []).append(option_id)
+
+    pending = [
+        (enrollment.student_id, form)
+        for enrollment in enrollments
+        for form in forms_by_course.get(enrollment.course_id, [])
+        if rng.random() < submission_rate
+    ]
+
+    total_submissions = 0
+    total_responses = 0
+    for start in range(0, len(pending), BATCH_SIZE):
+        batch = FormSubmission.objects.bulk_create([
+            FormSubmission(form=form, student_id=student_id)
+            for student_id, form in pending[start:start + BATCH_SIZE]
+        ])
+
+        rows = []
+        for submission in batch:
+            for question_id, question_type in questions.get(submission.form_id, []):
+                if question_type == 'mcq':
+                    rows.append(Response(
+                        submission=submission,
+                        question_id=question_id,
+                        mcq_answer_id=rng.choice(options[question_id])
+                    ))
+                elif rng.random() < 0.5:
+                    rows.append(Response(
+                        submission=submission,
+                        question_id=question_id,
+                        text_answer=' '.join(rng.choices(COMMENT_WORDS, k=rng.randint(4, 20)))
+                    ))
+        Response.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+
+        total_submissions += len(batch)
+        total_responses += len(rows)
+
+    return total_submissions, total_responses
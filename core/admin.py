@@ -1,6 +1,33 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.template.response import TemplateResponse
+from forms_app.rollover import rollover, next_term
 from .models import School, Department, Course
 
+class RolloverForm(forms.Form):
+    to_year = forms.IntegerField(label="Target year")
+    to_semester = forms.IntegerField(label="Target semester", min_value=1)
+    carry_forms = forms.BooleanField(
+        required=False,
+        initial=True,
+        label="Carry over every teacher's feedback forms"
+    )
+    activate_forms = forms.BooleanField(
+        required=False,
+        initial=True,
+        label="Activate the carried over forms immediately"
+    )
+    enrollments = forms.ChoiceField(
+        choices=[
+            ('none', 'Leave enrollments alone'),
+            ('copy', 'Copy enrollments to the new courses'),
+            ('move', 'Move enrollments to the new courses'),
+        ],
+        initial='none',
+        widget=forms.RadioSelect()
+    )
+
 @admin.register(School)
 class SchoolAdmin(admin.ModelAdmin):
     list_display = ('name', 'code', 'created_at')
@@ -19,4 +46,44 @@ class CourseAdmin(admin.ModelAdmin):
     list_display = ('code', 'name', 'department', 'semester', 'year')
     search_fields = ('code', 'name')
     list_filter = ('department', 'semester', 'year')
-    autocomplete_fields = ['department']
\ No newline at end of file
+    autocomplete_fields = ['department']
+    actions = ['roll_over_to_next_term']
+    
+    def roll_over_to_next_term(self, request, queryset):
+        """Clone the selected courses to a new term, with their forms and optionally their students"""
+        courses = list(queryset.select_related('department'))
+        if 'apply' in request.POST:
+            form = RolloverForm(request.POST)
+            if form.is_valid():
+                data = form.cleaned_data
+                result = rollover(
+                    courses,
+                    data['to_year'],
+                    data['to_semester'],
+                    forms=data['carry_forms'],
+                    enrollments=data['enrollments'],
+                    is_active=data['activate_forms']
+                )
+                self.message_user(
+                    request,
+                    f'Rolled over to {data["to_year"]} semester {data["to_semester"]}: '
+                    f'{result.courses_created} course(s) created ({result.courses_existing} already there), '
+                    f'{result.forms_created} form(s) created ({result.forms_skipped} already there), '
+                    f'{result.enrollments_added} enrollment(s) added, {result.enrollments_removed} removed.',
+                    level=messages.SUCCESS
+                )
+                return None
+        else:
+            to_year, to_semester = next_term(*max((course.year, course.semester) for course in courses))
+            form = RolloverForm(initial={'to_year': to_year, 'to_semester': to_semester})
+        
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Roll Courses Over to a New Term',
+            'form': form,
+            'courses': courses,
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+            'opts': self.model._meta,
+        }
+        return TemplateResponse(request, 'admin/course_rollover.html', context)
+    roll_over_to_next_term.short_description = "Roll over to the next term"
@@ -0,0 +1,37 @@
+import contextvars
+import functools
+from django.core.cache.backends.db import DatabaseCache as BaseDatabaseCache
+
+# True while a DatabaseCache call is running its queries
+in_cache_call = contextvars.ContextVar('in_cache_call', default=False)
+
+
+def _marked(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if in_cache_call.get():
+            return method(self, *args, **kwargs)
+        token = in_cache_call.set(True)
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            in_cache_call.reset(token)
+    return wrapper
+
+
+class DatabaseCache(BaseDatabaseCache):
+    """
+    Django's DatabaseCache with its queries marked by in_cache_call, so
+    RequestMetricsMiddleware can keep them out of the per-view query budgets.
+    How many queries the cache costs depends on the backend and on what is
+    already cached, not on the view.
+    """
+    get = _marked(BaseDatabaseCache.get)
+    get_many = _marked(BaseDatabaseCache.get_many)
+    set = _marked(BaseDatabaseCache.set)
+    add = _marked(BaseDatabaseCache.add)
+    touch = _marked(BaseDatabaseCache.touch)
+    delete = _marked(BaseDatabaseCache.delete)
+    delete_many = _marked(BaseDatabaseCache.delete_many)
+    has_key = _marked(BaseDatabaseCache.has_key)
+    clear = _marked(BaseDatabaseCache.clear)
@@ -0,0 +1,37 @@
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.urls import reverse
+
+
+def _load_user(request):
+    # Reading an attribute evaluates the lazy user, and with it the session
+    request.user.is_authenticated
+    return request.user
+
+
+async def aget_user(request):
+    """Resolve request.user off the event loop so async views can read it freely"""
+    return await sync_to_async(_load_user)(request)
+
+
+def async_login_required(view_func):
+    """login_required for async views"""
+    @wraps(view_func)
+    async def _wrapped_view(request, *args, **kwargs):
+        user = await aget_user(request)
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view_func(request, *args, **kwargs)
+    return _wrapped_view
+
+
+def async_staff_member_required(view_func):
+    """staff_member_required for async views, sending others to the admin login"""
+    @wraps(view_func)
+    async def _wrapped_view(request, *args, **kwargs):
+        user = await aget_user(request)
+        if not (user.is_active and user.is_staff):
+            return redirect_to_login(request.get_full_path(), reverse('admin:login'))
+        return await view_func(request, *args, **kwargs)
+    return _wrapped_view
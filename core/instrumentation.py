@@ -0,0 +1,186 @@
+import logging
+import os
+import socket
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets; the last bucket catches everything above
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+PROCESS_INDEX_KEY = 'core:metrics:processes'
+PUBLISH_TIMEOUT = 24 * 60 * 60
+PROCESS_ID = f'{socket.gethostname()}:{os.getpid()}'
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised instead of logged when QUERY_BUDGETS_STRICT is on (tests)"""
+
+
+def _bucket_index(bounds, value):
+    for index, bound in enumerate(bounds):
+        if value <= bound:
+            return index
+    return len(bounds)
+
+
+def _empty_view_stats():
+    return {
+        'requests': 0,
+        'queries_total': 0,
+        'queries_max': 0,
+        'db_ms_total': 0.0,
+        'render_ms_total': 0.0,
+        'total_ms_total': 0.0,
+        'total_ms_max': 0.0,
+        'budget_exceeded': 0,
+        'query_histogram': [0] * (len(QUERY_BUCKETS) + 1),
+        'latency_histogram': [0] * (len(LATENCY_BUCKETS_MS) + 1),
+    }
+
+
+class RequestMetrics:
+    """In-process per-view histogram of query counts and timings"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+        self._last_publish = 0.0
+
+    def record(self, view_name, queries, db_ms, render_ms, total_ms, over_budget=False):
+        with self._lock:
+            stats = self._views.setdefault(view_name, _empty_view_stats())
+            stats['requests'] += 1
+            stats['queries_total'] += queries
+            stats['queries_max'] = max(stats['queries_max'], queries)
+            stats['db_ms_total'] += db_ms
+            stats['render_ms_total'] += render_ms
+            stats['total_ms_total'] += total_ms
+            stats['total_ms_max'] = max(stats['total_ms_max'], total_ms)
+            stats['budget_exceeded'] += int(over_budget)
+            stats['query_histogram'][_bucket_index(QUERY_BUCKETS, queries)] += 1
+            stats['latency_histogram'][_bucket_index(LATENCY_BUCKETS_MS, total_ms)] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                view_name: dict(
+                    stats,
+                    query_histogram=list(stats['query_histogram']),
+                    latency_histogram=list(stats['latency_histogram'])
+                )
+                for view_name, stats in self._views.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+    def publish_if_due(self):
+        """
+        Copy this process's snapshot to the cache every METRICS_PUBLISH_INTERVAL
+        seconds so the endpoint and command can merge all workers. Needs a shared
+        cache backend (file or database) to see across processes.
+        """
+        if self.publish_due():
+            self.publish()
+
+    def publish_due(self):
+        """True (once per interval) when the snapshot should be published again"""
+        interval = getattr(settings, 'METRICS_PUBLISH_INTERVAL', 30)
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_publish < interval:
+                return False
+            self._last_publish = now
+            return True
+
+    def publish(self):
+        key = f'core:metrics:{PROCESS_ID}'
+        cache.set(key, self.snapshot(), PUBLISH_TIMEOUT)
+        # Diagnostics only: a lost update here just hides a worker until its next publish
+        keys = set(cache.get(PROCESS_INDEX_KEY, ()))
+        if key not in keys:
+            keys.add(key)
+            cache.set(PROCESS_INDEX_KEY, sorted(keys), PUBLISH_TIMEOUT)
+
+
+metrics = RequestMetrics()
+
+
+def query_budget(view_name):
+    """The configured maximum number of queries for a view, or None"""
+    return getattr(settings, 'QUERY_BUDGETS', {}).get(view_name)
+
+
+def check_budget(view_name, queries):
+    """Warn (or raise when QUERY_BUDGETS_STRICT is on) if a view ran more queries than its budget"""
+    budget = query_budget(view_name)
+    if budget is None or queries <= budget:
+        return False
+    message = f'{view_name} ran {queries} queries, over its budget of {budget}'
+    if getattr(settings, 'QUERY_BUDGETS_STRICT', False):
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+    return True
+
+
+def merge(snapshots):
+    """Add up several snapshots view by view"""
+    merged = {}
+    for snapshot in snapshots:
+        for view_name, stats in snapshot.items():
+            target = merged.setdefault(view_name, _empty_view_stats())
+            for field, value in stats.items():
+                if field.endswith('_max'):
+                    target[field] = max(target[field], value)
+                elif field.endswith('_histogram'):
+                    target[field] = [a + b for a, b in zip(target[field], value)]
+                else:
+                    target[field] += value
+    return merged
+
+
+def collect():
+    """Merged snapshot of every published worker plus the live numbers of this one"""
+    own_key = f'core:metrics:{PROCESS_ID}'
+    keys = [key for key in cache.get(PROCESS_INDEX_KEY, ()) if key != own_key]
+    published = cache.get_many(keys)
+    return merge(list(published.values()) + [metrics.snapshot()]), len(published) + 1
+
+
+def clear_published():
+    keys = cache.get(PROCESS_INDEX_KEY, ())
+    cache.delete_many(list(keys) + [PROCESS_INDEX_KEY])
+    metrics.reset()
+
+
+def report(snapshot):
+    """Per-view averages, maxima and budgets, slowest views first"""
+    rows = []
+    for view_name, stats in snapshot.items():
+        requests = stats['requests'] or 1
+        rows.append({
+            'view': view_name,
+            'requests': stats['requests'],
+            'queries_avg': round(stats['queries_total'] / requests, 1),
+            'queries_max': stats['queries_max'],
+            'query_budget': query_budget(view_name),
+            'budget_exceeded': stats['budget_exceeded'],
+            'db_ms_avg': round(stats['db_ms_total'] / requests, 2),
+            'render_ms_avg': round(stats['render_ms_total'] / requests, 2),
+            'total_ms_avg': round(stats['total_ms_total'] / requests, 2),
+            'total_ms_max': round(stats['total_ms_max'], 2),
+            'query_histogram': dict(zip(_bucket_labels(QUERY_BUCKETS), stats['query_histogram'])),
+            'latency_histogram_ms': dict(zip(_bucket_labels(LATENCY_BUCKETS_MS), stats['latency_histogram'])),
+        })
+    rows.sort(key=lambda row: row['total_ms_avg'], reverse=True)
+    return rows
+
+
+def _bucket_labels(bounds):
+    return [f'<={bound}' for bound in bounds] + [f'>{bounds[-1]}']
@@ -0,0 +1,36 @@
+import json
+from django.core.management.base import BaseCommand
+from core import instrumentation
+
+
+class Command(BaseCommand):
+    help = 'Print the per-view query count and latency histograms published by the running workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true', help='Print the raw report as JSON')
+        parser.add_argument('--over-budget', action='store_true', help='Only show views that exceeded their query budget')
+        parser.add_argument('--reset', action='store_true', help='Clear the published metrics after printing them')
+
+    def handle(self, *args, **options):
+        snapshot, processes = instrumentation.collect()
+        rows = instrumentation.report(snapshot)
+        if options['over_budget']:
+            rows = [row for row in rows if row['budget_exceeded']]
+
+        if options['json']:
+            self.stdout.write(json.dumps({'processes': processes, 'views': rows}, indent=2))
+        else:
+            self.stdout.write(f'{len(rows)} view(s) from {processes} process(es)')
+            for row in rows:
+                budget = row['query_budget'] if row['query_budget'] is not None else '-'
+                line = (
+                    f'{row["view"]:<48} n={row["requests"]:<6} '
+                    f'queries avg={row["queries_avg"]} max={row["queries_max"]} budget={budget} '
+                    f'db={row["db_ms_avg"]}ms render={row["render_ms_avg"]}ms '
+                    f'total avg={row["total_ms_avg"]}ms max={row["total_ms_max"]}ms'
+                )
+                self.stdout.write(self.style.WARNING(line) if row['budget_exceeded'] else line)
+
+        if options['reset']:
+            instrumentation.clear_published()
+            self.stdout.write(self.style.SUCCESS('Published metrics cleared.'))
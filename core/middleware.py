@@ -0,0 +1,126 @@
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from whitenoise.middleware import WhiteNoiseMiddleware
+from .cache import in_cache_call
+from .instrumentation import metrics, check_budget
+
+
+class QueryCounter:
+    """
+    execute_wrapper that counts the queries of one request and adds up their
+    time. Queries run by core.cache.DatabaseCache are also counted in
+    cache_queries, which the query budgets leave out.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.cache_queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.queries += 1
+            if in_cache_call.get():
+                self.cache_queries += 1
+
+    @property
+    def view_queries(self):
+        return self.queries - self.cache_queries
+
+
+def _add_execute_wrapper(wrapper):
+    # connection.execute_wrapper() as separate enter and exit calls
+    connection.execute_wrappers.append(wrapper)
+
+
+def _remove_execute_wrapper(wrapper):
+    connection.execute_wrappers.remove(wrapper)
+
+
+class RequestMetricsMiddleware:
+    """
+    Record the view name, SQL query count, database time and render time of
+    every request in the in-process histogram, and check per-view query budgets.
+    render_ms is the time spent outside the database: view code plus templates.
+    Runs natively under both WSGI and ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        self.record(request, counter, started)
+        metrics.publish_if_due()
+        return response
+
+    async def __acall__(self, request):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        # Connections belong to a thread, and the async ORM, sync views and cache
+        # calls of a request all run in its thread-sensitive worker thread, so
+        # the wrapper goes on that thread's connection, not the event loop's
+        await sync_to_async(_add_execute_wrapper, thread_sensitive=True)(counter)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(_remove_execute_wrapper, thread_sensitive=True)(counter)
+        self.record(request, counter, started)
+        if metrics.publish_due():
+            await sync_to_async(metrics.publish)()
+        return response
+
+    def record(self, request, counter, started):
+        total_ms = (time.perf_counter() - started) * 1000
+        db_ms = counter.seconds * 1000
+
+        match = request.resolver_match
+        view_name = match.view_name if match else '<unresolved>'
+        over_budget = check_budget(view_name, counter.view_queries)
+        metrics.record(view_name, counter.queries, db_ms, max(total_ms - db_ms, 0.0), total_ms, over_budget)
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise that also runs natively under ASGI. The stock middleware is
+    sync-only, which would push every async request through one thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, **kwargs):
+        super().__init__(get_response, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.4 on 2026-10-17 02:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['department', 'name'], name='course_department_name_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.4 on 2026-10-17 03:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_course_department_name_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='course',
+            name='course_department_name_idx',
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['department', 'year', 'semester', 'name'], name='course_department_term_idx'),
+        ),
+    ]
@@ -44,6 +44,10 @@ class Course(models.Model):
         db_table = 'courses'
         ordering = ['year', 'semester', 'name']
         unique_together = ['department', 'code', 'year', 'semester']
+        indexes = [
+            # Serves reference_data.department_courses in Meta.ordering order
+            models.Index(fields=['department', 'year', 'semester', 'name'], name='course_department_term_idx'),
+        ]
     
     def __str__(self):
         return f"{self.code} - {self.name} (Sem {self.semester}, {self.year})"
\ No newline at end of file
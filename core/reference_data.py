@@ -0,0 +1,173 @@
+import hashlib
+import time
+from django.core.cache import cache
+from django.db.models import Count, Max
+from .models import School, Department, Course
+
+VERSION_KEY = 'core:reference:version'
+REFERENCE_TIMEOUT = 24 * 60 * 60
+MAX_ID = 2 ** 63 - 1
+
+
+def parse_id(value):
+    """A primary key from a request value as an int, or None when it is not a valid id"""
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return value if 0 < value <= MAX_ID else None
+
+
+def reference_version():
+    """Current version of the School/Department/Course data, part of every cache key"""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Start from the clock so an evicted version never reuses an old number
+        cache.add(VERSION_KEY, int(time.time()), None)
+        version = cache.get(VERSION_KEY, int(time.time()))
+    return version
+
+
+def bump_reference_version():
+    """
+    Invalidate every cached reference list by moving to a new version. Call
+    it through transaction.on_commit so the new version never caches rows
+    that are not committed yet.
+    """
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, int(time.time()), None)
+
+
+def _cached(name, build):
+    key = f'core:reference:v{reference_version()}:{name}'
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, REFERENCE_TIMEOUT)
+    return data
+
+
+async def areference_version():
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        await cache.aadd(VERSION_KEY, int(time.time()), None)
+        version = await cache.aget(VERSION_KEY, int(time.time()))
+    return version
+
+
+async def _acached(name, build):
+    """_cached for async callers; build is a coroutine function using the async ORM"""
+    key = f'core:reference:v{await areference_version()}:{name}'
+    data = await cache.aget(key)
+    if data is None:
+        data = await build()
+        await cache.aset(key, data, REFERENCE_TIMEOUT)
+    return data
+
+
+def get_schools():
+    """All schools as a list of {'id', 'name', 'code'} dicts"""
+    return _cached('schools', lambda: list(School.objects.values('id', 'name', 'code')))
+
+
+def get_departments(school_id):
+    """Departments of a school as a list of {'id', 'name', 'code'} dicts"""
+    school_id = parse_id(school_id)
+    if school_id is None:
+        return []
+    return _cached(
+        f'departments:{school_id}',
+        lambda: list(Department.objects.filter(school_id=school_id).values('id', 'name', 'code'))
+    )
+
+
+def department_courses(department_id):
+    """The courses lookup, in Course.Meta.ordering (term, then name) order"""
+    return Course.objects.filter(department_id=department_id).values('id', 'name', 'code')
+
+
+def get_courses(department_id):
+    """Courses of a department as a list of {'id', 'name', 'code'} dicts"""
+    department_id = parse_id(department_id)
+    if department_id is None:
+        return []
+    return _cached(
+        f'courses:{department_id}',
+        lambda: list(department_courses(department_id))
+    )
+
+
+async def aget_departments(school_id):
+    school_id = parse_id(school_id)
+    if school_id is None:
+        return []
+
+    async def build():
+        return [row async for row in Department.objects.filter(school_id=school_id).values('id', 'name', 'code')]
+    return await _acached(f'departments:{school_id}', build)
+
+
+async def aget_courses(department_id):
+    department_id = parse_id(department_id)
+    if department_id is None:
+        return []
+
+    async def build():
+        return [row async for row in department_courses(department_id)]
+    return await _acached(f'courses:{department_id}', build)
+
+
+def _fingerprint(queryset):
+    """Strong ETag value from the newest updated_at and row count of a queryset"""
+    return _fingerprint_of(queryset.aggregate(latest=Max('updated_at'), total=Count('id')))
+
+
+async def _afingerprint(queryset):
+    return _fingerprint_of(await queryset.aaggregate(latest=Max('updated_at'), total=Count('id')))
+
+
+def _fingerprint_of(stats):
+    latest = stats['latest'].isoformat() if stats['latest'] else ''
+    return hashlib.sha1(f"{latest}:{stats['total']}".encode()).hexdigest()
+
+
+def departments_etag(school_id):
+    school_id = parse_id(school_id)
+    if school_id is None:
+        return None
+    return _cached(
+        f'departments-etag:{school_id}',
+        lambda: _fingerprint(Department.objects.filter(school_id=school_id))
+    )
+
+
+def courses_etag(department_id):
+    department_id = parse_id(department_id)
+    if department_id is None:
+        return None
+    return _cached(
+        f'courses-etag:{department_id}',
+        lambda: _fingerprint(Course.objects.filter(department_id=department_id))
+    )
+
+
+async def adepartments_etag(school_id):
+    school_id = parse_id(school_id)
+    if school_id is None:
+        return None
+    return await _acached(
+        f'departments-etag:{school_id}',
+        lambda: _afingerprint(Department.objects.filter(school_id=school_id))
+    )
+
+
+async def acourses_etag(department_id):
+    department_id = parse_id(department_id)
+    if department_id is None:
+        return None
+    return await _acached(
+        f'courses-etag:{department_id}',
+        lambda: _afingerprint(Course.objects.filter(department_id=department_id))
+    )
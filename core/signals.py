@@ -0,0 +1,16 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import School, Department, Course
+from .reference_data import bump_reference_version
+
+
+@receiver(post_save, sender=School)
+@receiver(post_delete, sender=School)
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def reference_data_changed(sender, instance, **kwargs):
+    # Bumping before the commit would let a concurrent request cache the old rows under the new version
+    transaction.on_commit(bump_reference_version)
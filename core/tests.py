@@ -1,3 +1,82 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import AsyncClient, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from accounts.models import Student
+from .models import School, Department
+from .instrumentation import QueryBudgetExceeded, check_budget, metrics
+from .middleware import QueryCounter
 
-# Create your tests here.
+
+class AsyncBudgetMixin:
+    """Budget checks through AsyncClient, where the ORM runs on the thread-sensitive worker thread"""
+
+    async def aassertWithinBudget(self, url, repeat=2):
+        # QUERY_BUDGETS_STRICT raises on the first request over budget; the
+        # metrics show the worker thread's queries were counted at all
+        metrics.reset()
+        client = AsyncClient()
+        client.cookies = self.client.cookies
+        for _ in range(repeat):
+            response = await client.get(url)
+            self.assertEqual(response.status_code, 200)
+        (stats,) = metrics.snapshot().values()
+        self.assertGreater(stats['queries_max'], 0)
+        return response
+
+
+class CheckBudgetTests(SimpleTestCase):
+    @override_settings(QUERY_BUDGETS={'app:view': 2}, QUERY_BUDGETS_STRICT=False)
+    def test_over_budget_logs_when_not_strict(self):
+        with self.assertLogs('core.instrumentation', 'WARNING'):
+            self.assertTrue(check_budget('app:view', 3))
+        self.assertFalse(check_budget('app:view', 2))
+        self.assertFalse(check_budget('app:unbudgeted', 100))
+
+    @override_settings(QUERY_BUDGETS={'app:view': 2}, QUERY_BUDGETS_STRICT=True)
+    def test_over_budget_raises_when_strict(self):
+        self.assertFalse(check_budget('app:view', 2))
+        with self.assertRaises(QueryBudgetExceeded):
+            check_budget('app:view', 3)
+
+
+@override_settings(QUERY_BUDGETS_STRICT=True)
+class RequestMetricsMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.staff = Student.objects.create_superuser('admin', 'Admin', 'pw')
+        self.client.force_login(self.staff)
+
+    def test_records_view_queries(self):
+        self.assertEqual(self.client.get('/metrics/requests/').status_code, 200)
+        self.assertEqual(metrics.snapshot()['core:request_metrics']['requests'], 1)
+
+    def test_database_cache_queries_are_not_budgeted(self):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            cache.set('core:test', 1)
+            Student.objects.count()
+        self.assertGreater(counter.cache_queries, 0)
+        self.assertEqual(counter.view_queries, 1)
+
+    def test_strict_budget_fails_the_request(self):
+        with override_settings(QUERY_BUDGETS={'core:request_metrics': 0}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get('/metrics/requests/')
+
+    async def test_async_requests_count_queries(self):
+        # Under ASGI the ORM runs in a worker thread with its own connection
+        client = AsyncClient()
+        client.cookies = self.client.cookies
+        department = await Department.objects.acreate(
+            school=await School.objects.acreate(name='Engineering', code='ENG'), name='Computing', code='CS'
+        )
+        response = await client.get(reverse('accounts:api_courses') + f'?department={department.id}')
+        self.assertEqual(response.status_code, 200)
+        response = await client.get('/metrics/requests/')
+        self.assertEqual(response.status_code, 200)
+
+        snapshot = metrics.snapshot()
+        self.assertGreater(snapshot['accounts:api_courses']['queries_max'], 0)
+        self.assertGreater(snapshot['core:request_metrics']['queries_max'], 0)
@@ -1,3 +1,16 @@
-from django.shortcuts import render
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+from . import instrumentation
 
-# Create your views here.
+
+@staff_member_required
+def request_metrics(request):
+    """Per-view query counts and timings of every worker; ?reset=1 clears them afterwards"""
+    snapshot, processes = instrumentation.collect()
+    data = {
+        'processes': processes,
+        'views': instrumentation.report(snapshot),
+    }
+    if request.GET.get('reset') == '1':
+        instrumentation.clear_published()
+    return JsonResponse(data)
@@ -0,0 +1,20 @@
+"""
+Gunicorn settings for the ASGI deployment profile.
+
+    gunicorn -c feedback_system/gunicorn_asgi.py feedback_system.asgi:application
+
+Uvicorn workers run the async views (lookups, student dashboard, JSON
+results API) on an event loop, so one worker keeps serving while many slow
+clients are connected; sync views still work through Django's thread adapter.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+worker_class = 'uvicorn.workers.UvicornWorker'
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = 30
+keepalive = 5
+
+# Read by settings.py: persistent database connections are disabled under ASGI
+raw_env = ['SERVER_PROFILE=asgi']
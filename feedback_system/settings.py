@@ -43,15 +43,17 @@ INSTALLED_APPS = [
     'core',
     'forms_app',
     'analytics',
+    'benchmarks',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.middleware.AsyncWhiteNoiseMiddleware',
+    'core.middleware.RequestMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.middleware.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -75,20 +77,88 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'feedback_system.wsgi.application'
+ASGI_APPLICATION = 'feedback_system.asgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# SERVER_PROFILE=asgi is set by feedback_system/gunicorn_asgi.py. Persistent
+# connections are not reused across async requests, so they are turned off there.
+SERVER_PROFILE = os.environ.get("SERVER_PROFILE", "wsgi")
+
+# Without DATABASE_URL the local SQLite file is used (development and benchmarks)
+DATABASE_URL = os.environ.get("DATABASE_URL", f"sqlite:///{BASE_DIR / 'db.sqlite3'}")
+
 DATABASES = {
-    "default": dj_database_url.config(
-        default=os.environ.get("DATABASE_URL"),
-        conn_max_age=600,
-        ssl_require=True
+    "default": dj_database_url.parse(
+        DATABASE_URL,
+        conn_max_age=0 if SERVER_PROFILE == "asgi" else 600,
+        ssl_require=not DATABASE_URL.startswith("sqlite")
     )
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Reference data versions, dashboards and metrics are invalidated by whichever
+# process changes the data: web workers, the job worker and management commands
+# such as rollover_term. The cache must therefore be shared by all of them.
+# CACHE_BACKEND=database (the default) needs createcachetable, which build.sh
+# runs, and its queries are left out of QUERY_BUDGETS. redis (CACHE_LOCATION
+# is the redis:// URL) is shared without a query per lookup; file is shared by
+# the processes of one host. locmem keeps a cache per process and is only
+# accepted with DEBUG (accounts.checks).
+
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "database")
+
+if CACHE_BACKEND == "redis":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ.get("CACHE_LOCATION", "redis://127.0.0.1:6379/1"),
+        }
+    }
+elif CACHE_BACKEND == "file":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ.get("CACHE_LOCATION", str(BASE_DIR / ".cache")),
+        }
+    }
+elif CACHE_BACKEND == "database":
+    CACHES = {
+        "default": {
+            "BACKEND": "core.cache.DatabaseCache",
+            "LOCATION": os.environ.get("CACHE_LOCATION", "cache_table"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "feedback-system",
+        }
+    }
+
+
+# Sessions and the authenticated user
+# cached_db serves sessions from the cache and writes them through to the
+# database, and the logged-in Student is cached by
+# accounts.middleware.CachedAuthenticationMiddleware. That saves the session
+# and user queries of every request only when a cache read is not itself a
+# query: with CACHE_BACKEND=redis (or file on a single host). With the database
+# cache each read is a cache_table SELECT instead, so both default to off there.
+# They must never use locmem: a logout or deactivation would leave the session
+# valid in every other worker's copy, and the accounts system checks refuse it.
+
+QUERYLESS_CACHE = CACHE_BACKEND in ("redis", "file")
+SESSION_BACKEND = os.environ.get("SESSION_BACKEND", "cached_db" if QUERYLESS_CACHE else "db")
+SESSION_ENGINE = f"django.contrib.sessions.backends.{SESSION_BACKEND}"
+USER_CACHE_ENABLED = os.environ.get("USER_CACHE_ENABLED", str(QUERYLESS_CACHE)) == "True"
+USER_CACHE_TIMEOUT = int(os.environ.get("USER_CACHE_TIMEOUT", "900"))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -130,6 +200,9 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Uploads that must never be served, such as student sheets with passwords
+# (accounts.models.private_storage); keep it outside MEDIA_ROOT
+PRIVATE_MEDIA_ROOT = os.environ.get("PRIVATE_MEDIA_ROOT", str(BASE_DIR / 'private'))
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
@@ -138,6 +211,37 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'accounts.Student'
 
+# Seconds without progress after which a running export or student import job
+# is considered abandoned by its worker and re-queued (analytics.jobs.requeue_stale_jobs)
+JOB_TIMEOUT = int(os.environ.get("JOB_TIMEOUT", "600"))
+
+# Request instrumentation (core.middleware.RequestMetricsMiddleware)
+REQUEST_METRICS_ENABLED = os.environ.get("REQUEST_METRICS_ENABLED", "True") == "True"
+# Seconds between copies of a worker's histogram to the cache for /metrics/requests/
+METRICS_PUBLISH_INTERVAL = int(os.environ.get("METRICS_PUBLISH_INTERVAL", "30"))
+
+# Maximum SQL queries per request, by resolved view name. Going over logs a
+# warning, or raises QueryBudgetExceeded when strict; the query budget tests
+# turn strict mode on with override_settings.
+QUERY_BUDGETS = {
+    'forms_app:dashboard': 3,
+    # One upsert per counter table, whether or not the form has had submissions
+    # before, plus the session and user lookups of SESSION_BACKEND=db
+    'forms_app:fill_form': 15,
+    'analytics:dashboard': 6,
+    'analytics:form_results': 8,
+    'analytics:form_results_api': 9,
+    'analytics:form_text_answers_api': 4,
+    'analytics:teacher_comparison': 5,
+    'analytics:submission_progress': 6,
+    'analytics:submission_progress_data': 4,
+    'analytics:export_results': 8,
+    'analytics:export_students': 7,
+    'accounts:api_departments': 2,
+    'accounts:api_courses': 2,
+}
+QUERY_BUDGETS_STRICT = os.environ.get("QUERY_BUDGETS_STRICT", "False") == "True"
+
 LOGIN_URL = 'accounts:login'
 LOGIN_REDIRECT_URL = 'forms_app:dashboard'
 LOGOUT_REDIRECT_URL = 'accounts:login'
\ No newline at end of file
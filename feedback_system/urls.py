@@ -24,6 +24,7 @@ urlpatterns = [
     path('accounts/', include('accounts.urls')),
     path('', include('forms_app.urls')),
     path('analytics/', include('analytics.urls')),
+    path('metrics/', include('core.urls')),
 ]
 
 if settings.DEBUG:
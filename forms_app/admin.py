@@ -4,8 +4,10 @@ from django.shortcuts import render, redirect
 from django.utils.html import format_html
 from django.contrib import messages
 from django import forms
-from .models import Teacher, FeedbackForm, Question, MCQOption, FormSubmission, Response
+from django.db.models.functions import Coalesce
+from .models import Teacher, FeedbackForm, Question, MCQOption, FormSubmission
 from core.models import Course
+from .allocation import allocate_master_form
 
 # Teacher Admin with Employee ID
 @admin.register(Teacher)
@@ -47,7 +49,7 @@ class FormAllocationForm(forms.Form):
 class QuestionInline(admin.TabularInline):
     model = Question
     extra = 1
-    fields = ('order', 'question_text', 'question_type', 'is_required')
+    fields = ('order', 'question_text', 'question_type', 'is_required', 'is_rating_scale')
 
 
 class MCQOptionInline(admin.TabularInline):
@@ -58,9 +60,9 @@ class MCQOptionInline(admin.TabularInline):
 
 @admin.register(FeedbackForm)
 class FeedbackFormAdmin(admin.ModelAdmin):
-    list_display = ('title', 'course', 'teacher_info', 'is_active', 'is_master', 'submission_count', 'report_button', 'created_at')
+    list_display = ('title', 'course', 'teacher_info', 'is_active', 'master_badge', 'submission_count', 'report_button', 'created_at')
     search_fields = ('title', 'teacher__name', 'teacher__employee_id', 'course__code')
-    list_filter = ('is_active', 'course__department', 'created_at')
+    list_filter = ('is_active', 'is_master', 'course__department', 'created_at')
     inlines = [QuestionInline]
     actions = ['mark_as_master_template', 'allocate_to_teachers']
     
@@ -71,6 +73,12 @@ class FeedbackFormAdmin(admin.ModelAdmin):
         ]
         return custom_urls + urls
     
+    def get_queryset(self, request):
+        # Join teacher and course and read the submission counter in the same query
+        return super().get_queryset(request).select_related('teacher', 'course').annotate(
+            num_submissions=Coalesce('submission_total__total', 0)
+        )
+    
     def get_form(self, request, obj=None, **kwargs):
         form = super().get_form(request, obj, **kwargs)
         form.base_fields['title'].label = 'Subject Name and Code'
@@ -86,25 +94,26 @@ class FeedbackFormAdmin(admin.ModelAdmin):
         return obj.teacher.name
     teacher_info.short_description = 'Teacher'
     
-    def is_master(self, obj):
-        # Mark forms with "MASTER" or "TEMPLATE" in title as master templates
-        if 'MASTER' in obj.title.upper() or 'TEMPLATE' in obj.title.upper():
+    def master_badge(self, obj):
+        if obj.is_master:
             return format_html(
                 '<span style="background: #8b5cf6; color: white; padding: 3px 8px; border-radius: 5px; font-weight: bold;">✓ Master</span>'
             )
         return '-'
-    is_master.short_description = 'Template'
+    master_badge.short_description = 'Template'
+    master_badge.admin_order_field = 'is_master'
     
     def submission_count(self, obj):
-        count = obj.submissions.count()
+        count = obj.num_submissions
         return format_html(
             '<span style="background: #10b981; color: white; padding: 5px 10px; border-radius: 5px; font-weight: bold;">{}</span>',
             count
         )
     submission_count.short_description = 'Submissions'
+    submission_count.admin_order_field = 'num_submissions'
     
     def report_button(self, obj):
-        if obj.submissions.count() > 0:
+        if obj.num_submissions > 0:
             url = reverse('analytics:export_results', args=[obj.id])
             return format_html(
                 '<a class="button" href="{}" style="background: linear-gradient(135deg, #6366f1, #8b5cf6); color: white; padding: 8px 15px; border-radius: 8px; text-decoration: none; font-weight: 600; display: inline-block;">'
@@ -117,12 +126,13 @@ class FeedbackFormAdmin(admin.ModelAdmin):
     def mark_as_master_template(self, request, queryset):
         """Mark selected forms as master templates"""
         count = 0
-        for form in queryset:
-            if 'MASTER' not in form.title.upper():
+        for form in queryset.filter(is_master=False):
+            if not form.title.startswith('[MASTER]'):
                 form.title = f"[MASTER] {form.title}"
-                form.is_active = False  # Deactivate master templates
-                form.save()
-                count += 1
+            form.is_master = True
+            form.is_active = False  # Deactivate master templates
+            form.save()
+            count += 1
         self.message_user(
             request,
             f'{count} form(s) marked as master template and deactivated.',
@@ -156,56 +166,20 @@ class FeedbackFormAdmin(admin.ModelAdmin):
                 courses = form.cleaned_data['courses']
                 is_active = form.cleaned_data['is_active']
                 
-                created_count = 0
-                
-                # Create form for each teacher-course combination
-                for teacher in teachers:
-                    for course in courses:
-                        # Check if form already exists
-                        existing = FeedbackForm.objects.filter(
-                            teacher=teacher,
-                            course=course,
-                            title__icontains=master_form.title.replace('[MASTER]', '').strip()
-                        ).exists()
-                        
-                        if existing:
-                            continue
-                        
-                        # Create new form
-                        new_form = FeedbackForm.objects.create(
-                            course=course,
-                            teacher=teacher,
-                            title=f"{course.code} - {teacher.name} ({master_form.title.replace('[MASTER]', '').strip()})",
-                            description=master_form.description,
-                            is_active=is_active
-                        )
-                        
-                        # Copy all questions
-                        for question in master_form.questions.all():
-                            new_question = Question.objects.create(
-                                form=new_form,
-                                question_text=question.question_text,
-                                question_type=question.question_type,
-                                order=question.order,
-                                is_required=question.is_required
-                            )
-                            
-                            # Copy MCQ options
-                            if question.question_type == 'mcq':
-                                for option in question.options.all():
-                                    MCQOption.objects.create(
-                                        question=new_question,
-                                        option_text=option.option_text,
-                                        order=option.order
-                                    )
-                        
-                        created_count += 1
+                result = allocate_master_form(master_form, teachers, courses, is_active)
                 
                 self.message_user(
                     request,
-                    f'Successfully created {created_count} form(s) from template!',
+                    f'Successfully created {len(result.created)} form(s) from template!',
                     level=messages.SUCCESS
                 )
+                if result.skipped:
+                    skipped_pairs = ', '.join(f'{teacher.name} / {course.code}' for teacher, course in result.skipped)
+                    self.message_user(
+                        request,
+                        f'Skipped {len(result.skipped)} pair(s) that already have this form: {skipped_pairs}',
+                        level=messages.WARNING
+                    )
                 return redirect('admin:forms_app_feedbackform_changelist')
         else:
             initial_data = {}
@@ -224,9 +198,9 @@ class FeedbackFormAdmin(admin.ModelAdmin):
 
 @admin.register(Question)
 class QuestionAdmin(admin.ModelAdmin):
-    list_display = ('form', 'order', 'question_text', 'question_type')
+    list_display = ('form', 'order', 'question_text', 'question_type', 'is_rating_scale')
     search_fields = ('question_text',)
-    list_filter = ('question_type', 'form')
+    list_filter = ('question_type', 'is_rating_scale', 'form')
     inlines = [MCQOptionInline]
 
 
@@ -0,0 +1,181 @@
+from collections import namedtuple
+from django.db import transaction
+from .models import FeedbackForm, Question, MCQOption, FormAllocation
+from .dashboard_cache import invalidate_courses
+
+BATCH_SIZE = 1000
+
+AllocationResult = namedtuple('AllocationResult', ['created', 'skipped'])
+
+
+def compile_question_tree(questions, options_name):
+    """
+    Turn questions (with their options under options_name) into a reusable tree
+    of (question_fields, [option_fields, ...]) pairs.
+    """
+    return [_question_entry(question, options_name) for question in questions.prefetch_related(options_name)]
+
+
+def _question_entry(question, options_name):
+    options = []
+    if question.question_type == 'mcq':
+        options = [
+            {'option_text': option.option_text, 'order': option.order}
+            for option in getattr(question, options_name).all()
+        ]
+    return ({
+        'question_text': question.question_text,
+        'question_type': question.question_type,
+        'order': question.order,
+        'is_required': question.is_required,
+        'is_rating_scale': question.is_rating_scale,
+    }, options)
+
+
+def compile_form_questions(form):
+    """Load a form's questions and options once as a question tree"""
+    return compile_question_tree(form.questions.all(), 'options')
+
+
+def compile_forms_questions(forms):
+    """Question trees of many forms with two queries, as {form_id: tree}"""
+    trees = {form.id: [] for form in forms}
+    for question in Question.objects.filter(form__in=forms).prefetch_related('options'):
+        trees[question.form_id].append(_question_entry(question, 'options'))
+    return trees
+
+
+def compile_template_questions(template):
+    """Load a template's questions and options once as a question tree"""
+    return compile_question_tree(template.template_questions.all(), 'template_options')
+
+
+def create_forms_with_questions(forms, question_tree):
+    """
+    Insert unsaved FeedbackForms and a copy of question_tree for each of them
+    with one bulk_create per table. Must run inside a transaction.
+    """
+    return create_forms_with_question_trees(forms, [question_tree] * len(forms))
+
+
+def create_forms_with_question_trees(forms, question_trees):
+    """create_forms_with_questions with its own question tree for each form"""
+    FeedbackForm.objects.bulk_create(forms, batch_size=BATCH_SIZE)
+
+    questions = []
+    for form, question_tree in zip(forms, question_trees):
+        for question_fields, option_fields in question_tree:
+            questions.append((Question(form=form, **question_fields), option_fields))
+    Question.objects.bulk_create([question for question, _ in questions], batch_size=BATCH_SIZE)
+
+    MCQOption.objects.bulk_create([
+        MCQOption(question=question, **fields)
+        for question, option_fields in questions
+        for fields in option_fields
+    ], batch_size=BATCH_SIZE)
+    return forms
+
+
+def master_base_title(master_form):
+    return master_form.title.replace('[MASTER]', '').strip()
+
+
+def allocate_master_form(master_form, teachers, courses, is_active=True):
+    """
+    Copy a master form to every teacher x course pair that does not already have it.
+
+    Returns an AllocationResult with the created forms and the skipped
+    (teacher, course) pairs.
+    """
+    teachers = list(teachers)
+    courses = list(courses)
+    base_title = master_base_title(master_form)
+
+    # One query finds every pair that already has a copy of this master
+    existing = set(FeedbackForm.objects.filter(
+        teacher__in=teachers,
+        course__in=courses,
+        title__icontains=base_title
+    ).values_list('teacher_id', 'course_id'))
+
+    new_forms = []
+    skipped = []
+    for teacher in teachers:
+        for course in courses:
+            if (teacher.id, course.id) in existing:
+                skipped.append((teacher, course))
+                continue
+            new_forms.append(FeedbackForm(
+                course=course,
+                teacher=teacher,
+                title=f"{course.code} - {teacher.name} ({base_title})",
+                description=master_form.description,
+                is_active=is_active
+            ))
+
+    if new_forms:
+        question_tree = compile_form_questions(master_form)
+        with transaction.atomic():
+            create_forms_with_questions(new_forms, question_tree)
+            # bulk_create sends no signals, so refresh the affected dashboards here
+            invalidate_courses({form.course_id for form in new_forms})
+
+    return AllocationResult(created=new_forms, skipped=skipped)
+
+
+def allocation_title(template, teacher, course):
+    return f"{template.name} - {teacher.name} ({course.code})"
+
+
+def allocate_template(template, pairs, is_active=True):
+    """
+    Create FormAllocations of a template for many (teacher, course) pairs at once.
+
+    Pairs that already have an allocation of this template are skipped. The
+    template is compiled once and every form, question, option and allocation
+    is written with batched inserts in one transaction.
+    """
+    pairs = list(dict.fromkeys(pairs))
+    existing = set(FormAllocation.objects.filter(
+        template=template,
+        teacher__in={teacher for teacher, _ in pairs},
+        course__in={course for _, course in pairs}
+    ).values_list('teacher_id', 'course_id'))
+
+    new_pairs = []
+    skipped = []
+    for teacher, course in pairs:
+        if (teacher.id, course.id) in existing:
+            skipped.append((teacher, course))
+        else:
+            new_pairs.append((teacher, course))
+
+    allocations = []
+    if new_pairs:
+        question_tree = compile_template_questions(template)
+        forms = [
+            FeedbackForm(
+                course=course,
+                teacher=teacher,
+                title=allocation_title(template, teacher, course),
+                description=template.description,
+                is_active=is_active
+            )
+            for teacher, course in new_pairs
+        ]
+        with transaction.atomic():
+            create_forms_with_questions(forms, question_tree)
+            allocations = [
+                FormAllocation(
+                    template=template,
+                    teacher=teacher,
+                    course=course,
+                    is_active=is_active,
+                    feedback_form=form
+                )
+                for (teacher, course), form in zip(new_pairs, forms)
+            ]
+            FormAllocation.objects.bulk_create(allocations, batch_size=BATCH_SIZE)
+            invalidate_courses({form.course_id for form in forms})
+
+    return AllocationResult(created=allocations, skipped=skipped)
@@ -0,0 +1,89 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from accounts.models import StudentCourse
+from .models import FeedbackForm, FormSubmission
+
+DASHBOARD_CACHE_TIMEOUT = 60 * 60
+
+
+def dashboard_key(student_id):
+    return f'forms_app:dashboard:{student_id}'
+
+
+def _form_index_rows(student):
+    return FeedbackForm.objects.filter(
+        is_active=True,
+        course__enrolled_students__student=student
+    ).annotate(
+        submitted=Exists(FormSubmission.objects.filter(form=OuterRef('pk'), student=student))
+    ).values(
+        'id',
+        'title',
+        'course__code',
+        'course__name',
+        'course__department__name',
+        'teacher__name',
+        'submitted'
+    )
+
+
+def _index_from_rows(rows):
+    index = {'pending': [], 'completed': []}
+    for row in rows:
+        # Nested dicts keep the template's form.course.code style lookups working
+        form = {
+            'id': row['id'],
+            'title': row['title'],
+            'course': {
+                'code': row['course__code'],
+                'name': row['course__name'],
+                'department': {'name': row['course__department__name']},
+            },
+            'teacher': {'name': row['teacher__name']},
+        }
+        index['completed' if row['submitted'] else 'pending'].append(form)
+    return index
+
+
+def build_form_index(student):
+    """
+    Split the active forms of a student's enrolled courses into pending and
+    completed lists with a single query.
+    """
+    return _index_from_rows(_form_index_rows(student))
+
+
+def get_form_index(student):
+    """Return the student's cached pending/completed form index, building it on a miss"""
+    key = dashboard_key(student.pk)
+    index = cache.get(key)
+    if index is None:
+        index = build_form_index(student)
+        cache.set(key, index, DASHBOARD_CACHE_TIMEOUT)
+    return index
+
+
+async def aget_form_index(student):
+    """get_form_index for async views, reading through the async ORM on a miss"""
+    key = dashboard_key(student.pk)
+    index = await cache.aget(key)
+    if index is None:
+        index = _index_from_rows([row async for row in _form_index_rows(student)])
+        await cache.aset(key, index, DASHBOARD_CACHE_TIMEOUT)
+    return index
+
+
+def invalidate_students(student_ids):
+    """Drop the cached index of the given students once the current transaction commits"""
+    keys = [dashboard_key(student_id) for student_id in set(student_ids)]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_courses(course_ids):
+    """Drop the cached index of every student enrolled in one of the given courses"""
+    student_ids = StudentCourse.objects.filter(
+        course_id__in=course_ids
+    ).values_list('student_id', flat=True).distinct()
+    invalidate_students(student_ids)
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Course
+from forms_app.rollover import rollover, next_term, ENROLLMENT_MODES
+
+
+class Command(BaseCommand):
+    help = "Clone a term's courses to the next term with their teachers' forms and, optionally, their enrollments"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, required=True, help='Year of the term to roll over')
+        parser.add_argument('--semester', type=int, required=True, help='Semester of the term to roll over')
+        parser.add_argument('--to-year', type=int, help='Target year (default: the next term)')
+        parser.add_argument('--to-semester', type=int, help='Target semester (default: the next term)')
+        parser.add_argument('--school', type=int, help='Only roll over the courses of this school id')
+        parser.add_argument('--department', type=int, help='Only roll over the courses of this department id')
+        parser.add_argument(
+            '--enrollments', choices=ENROLLMENT_MODES, default='none',
+            help='Copy or move the students of each course to its new copy (default: none)'
+        )
+        parser.add_argument('--no-forms', action='store_true', help='Do not carry over the feedback forms')
+        parser.add_argument('--inactive', action='store_true', help='Create the carried over forms inactive')
+
+    def handle(self, *args, **options):
+        to_year, to_semester = next_term(options['year'], options['semester'])
+        if options['to_year'] is not None or options['to_semester'] is not None:
+            if options['to_year'] is None or options['to_semester'] is None:
+                raise CommandError('Give both --to-year and --to-semester, or neither.')
+            to_year, to_semester = options['to_year'], options['to_semester']
+        if (to_year, to_semester) == (options['year'], options['semester']):
+            raise CommandError('The target term is the term being rolled over.')
+
+        courses = Course.objects.filter(year=options['year'], semester=options['semester'])
+        if options['school']:
+            courses = courses.filter(department__school_id=options['school'])
+        if options['department']:
+            courses = courses.filter(department_id=options['department'])
+        courses = list(courses)
+        if not courses:
+            raise CommandError(f'No courses in {options["year"]} semester {options["semester"]}.')
+
+        result = rollover(
+            courses,
+            to_year,
+            to_semester,
+            forms=not options['no_forms'],
+            enrollments=options['enrollments'],
+            is_active=not options['inactive']
+        )
+        self.stdout.write(
+            f'Courses: {result.courses_created} created, {result.courses_existing} already in {to_year} semester {to_semester}.'
+        )
+        self.stdout.write(f'Forms: {result.forms_created} created, {result.forms_skipped} already present.')
+        if options['enrollments'] != 'none':
+            self.stdout.write(
+                f'Enrollments: {result.enrollments_added} added, {result.enrollments_removed} removed.'
+            )
+        self.stdout.write(self.style.SUCCESS(f'Rolled {len(courses)} course(s) over to {to_year} semester {to_semester}.'))
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.4 on 2026-10-17 02:25
+
+from django.db import migrations, models
+
+
+def flag_master_forms(apps, schema_editor):
+    # Master templates used to be recognised by their title only. Only the
+    # prefix written by the "Mark as Master Template" action is trusted:
+    # allocated forms are titled after their template and may well say "Template".
+    FeedbackForm = apps.get_model('forms_app', 'FeedbackForm')
+    FeedbackForm.objects.filter(title__startswith='[MASTER]', is_active=False).update(is_master=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms_app', '0003_formtemplate_templatequestion_templateoption_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feedbackform',
+            name='is_master',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.RunPython(flag_master_forms, migrations.RunPython.noop),
+    ]
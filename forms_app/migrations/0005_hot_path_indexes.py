@@ -0,0 +1,33 @@
+# Generated by Django 4.2.4 on 2026-10-17 02:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms_app', '0004_feedbackform_is_master'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='feedbackform',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['course', '-created_at'], name='form_active_course_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='formsubmission',
+            index=models.Index(fields=['student', 'form'], name='submission_student_form_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='formsubmission',
+            index=models.Index(fields=['form', 'submitted_at'], name='submission_form_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['form', 'order'], name='question_form_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='response',
+            index=models.Index(condition=models.Q(('mcq_answer__isnull', False)), fields=['question', 'mcq_answer'], name='response_question_option_idx'),
+        ),
+    ]
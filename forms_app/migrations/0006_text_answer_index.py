@@ -0,0 +1,17 @@
+# Generated by Django 4.2.4 on 2026-10-17 02:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms_app', '0005_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='response',
+            index=models.Index(condition=models.Q(('mcq_answer__isnull', True)), fields=['question', '-id'], name='response_question_text_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.4 on 2026-10-17 03:03
+
+from django.db import migrations, models
+
+
+def mark_existing_rating_scales(apps, schema_editor):
+    # Every MCQ question was scored as a rating scale until now; keep their
+    # statistics and let admins untick the ones that are not scales
+    for model_name in ('Question', 'TemplateQuestion'):
+        apps.get_model('forms_app', model_name).objects.filter(question_type='mcq').update(is_rating_scale=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms_app', '0006_text_answer_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='is_rating_scale',
+            field=models.BooleanField(default=False, help_text='MCQ options run from worst to best and score 1, 2, 3, ... in option order'),
+        ),
+        migrations.AddField(
+            model_name='templatequestion',
+            name='is_rating_scale',
+            field=models.BooleanField(default=False, help_text='MCQ options run from worst to best and score 1, 2, 3, ... in option order'),
+        ),
+        migrations.RunPython(mark_existing_rating_scales, migrations.RunPython.noop),
+    ]
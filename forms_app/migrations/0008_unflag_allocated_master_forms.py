@@ -0,0 +1,25 @@
+# Generated by Django 4.2.4 on 2026-10-17 04:10
+
+from django.db import migrations
+from django.db.models import Q
+
+
+def unflag_forms(apps, schema_editor):
+    # 0004 used to flag every form whose title mentioned "master" or "template",
+    # including forms allocated from a template named "... Template". Forms
+    # without the [MASTER] prefix that are allocated or active are real forms.
+    FeedbackForm = apps.get_model('forms_app', 'FeedbackForm')
+    FeedbackForm.objects.filter(is_master=True).exclude(title__startswith='[MASTER]').filter(
+        Q(allocation__isnull=False) | Q(is_active=True)
+    ).update(is_master=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms_app', '0007_question_rating_scale'),
+    ]
+
+    operations = [
+        migrations.RunPython(unflag_forms, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from core.models import Course
 
@@ -22,12 +22,21 @@ class FeedbackForm(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
     is_active = models.BooleanField(default=True)
+    is_master = models.BooleanField(default=False, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'feedback_forms'
         ordering = ['-created_at']
+        indexes = [
+            # Student dashboard: active forms of the enrolled courses, newest first
+            models.Index(
+                fields=['course', '-created_at'],
+                name='form_active_course_idx',
+                condition=models.Q(is_active=True)
+            ),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.teacher.name}"
@@ -43,10 +52,18 @@ class Question(models.Model):
     question_type = models.CharField(max_length=10, choices=QUESTION_TYPES)
     order = models.IntegerField(default=0)
     is_required = models.BooleanField(default=True)
+    # Opt-in: only rating scales get score statistics and count in teacher comparisons
+    is_rating_scale = models.BooleanField(
+        default=False,
+        help_text='MCQ options run from worst to best and score 1, 2, 3, ... in option order'
+    )
     
     class Meta:
         db_table = 'questions'
         ordering = ['order']
+        indexes = [
+            models.Index(fields=['form', 'order'], name='question_form_order_idx'),
+        ]
     
     def __str__(self):
         return f"Q{self.order}: {self.question_text[:50]}"
@@ -72,6 +89,12 @@ class FormSubmission(models.Model):
         db_table = 'form_submissions'
         unique_together = ['form', 'student']
         ordering = ['-submitted_at']
+        indexes = [
+            # Forms a student has submitted, answered from the index alone
+            models.Index(fields=['student', 'form'], name='submission_student_form_idx'),
+            # Submissions of a form in time order (text answers, progress rollups)
+            models.Index(fields=['form', 'submitted_at'], name='submission_form_time_idx'),
+        ]
     
     def __str__(self):
         return f"{self.student.name} - {self.form.title}"
@@ -85,6 +108,20 @@ class Response(models.Model):
     class Meta:
         db_table = 'responses'
         unique_together = ['submission', 'question']
+        indexes = [
+            # Option counts grouped per question; text answers are left out of the index
+            models.Index(
+                fields=['question', 'mcq_answer'],
+                name='response_question_option_idx',
+                condition=models.Q(mcq_answer__isnull=False)
+            ),
+            # Keyset pages of a question's text answers, newest first
+            models.Index(
+                fields=['question', '-id'],
+                name='response_question_text_idx',
+                condition=models.Q(mcq_answer__isnull=True)
+            ),
+        ]
     
     def __str__(self):
         return f"Response to {self.question.question_text[:30]}"
@@ -123,6 +160,10 @@ class TemplateQuestion(models.Model):
     question_type = models.CharField(max_length=10, choices=QUESTION_TYPES)
     order = models.IntegerField(default=0)
     is_required = models.BooleanField(default=True)
+    is_rating_scale = models.BooleanField(
+        default=False,
+        help_text='MCQ options run from worst to best and score 1, 2, 3, ... in option order'
+    )
     
     class Meta:
         db_table = 'template_questions'
@@ -147,6 +188,13 @@ class TemplateOption(models.Model):
         return self.option_text
 
 
+class FormAllocationManager(models.Manager):
+    def allocate_many(self, template, pairs, is_active=True):
+        """Bulk-allocate a template to (teacher, course) pairs; see allocation.allocate_template"""
+        from .allocation import allocate_template
+        return allocate_template(template, pairs, is_active=is_active)
+
+
 # NEW MODEL: Form Allocation
 class FormAllocation(models.Model):
     """Allocate a template form to teacher-course combinations"""
@@ -159,6 +207,8 @@ class FormAllocation(models.Model):
     # This creates the actual FeedbackForm when allocated
     feedback_form = models.OneToOneField('FeedbackForm', on_delete=models.SET_NULL, null=True, blank=True, related_name='allocation')
     
+    objects = FormAllocationManager()
+    
     class Meta:
         db_table = 'form_allocations'
         unique_together = ['template', 'teacher', 'course']
@@ -169,37 +219,22 @@ class FormAllocation(models.Model):
     
     def save(self, *args, **kwargs):
         """Auto-create FeedbackForm when allocation is saved"""
+        from .allocation import allocation_title, compile_template_questions, create_forms_with_questions
+        
         is_new = self.pk is None
         super().save(*args, **kwargs)
         
         if is_new and not self.feedback_form:
-            # Create FeedbackForm from template
-            form = FeedbackForm.objects.create(
+            # Create FeedbackForm with a copy of the template's questions
+            form = FeedbackForm(
                 course=self.course,
                 teacher=self.teacher,
-                title=f"{self.template.name} - {self.teacher.name} ({self.course.code})",
+                title=allocation_title(self.template, self.teacher, self.course),
                 description=self.template.description,
                 is_active=self.is_active
             )
-            
-            # Copy all questions from template
-            for template_q in self.template.template_questions.all():
-                question = Question.objects.create(
-                    form=form,
-                    question_text=template_q.question_text,
-                    question_type=template_q.question_type,
-                    order=template_q.order,
-                    is_required=template_q.is_required
-                )
-                
-                # Copy MCQ options if applicable
-                if template_q.question_type == 'mcq':
-                    for template_opt in template_q.template_options.all():
-                        MCQOption.objects.create(
-                            question=question,
-                            option_text=template_opt.option_text,
-                            order=template_opt.order
-                        )
+            with transaction.atomic():
+                create_forms_with_questions([form], compile_template_questions(self.template))
             
             # Link the created form back to allocation
             self.feedback_form = form
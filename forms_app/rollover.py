@@ -0,0 +1,156 @@
+from collections import namedtuple
+from django.db import transaction
+from accounts.enrollment import add_enrollments, remove_enrollments
+from accounts.models import StudentCourse
+from core.models import Course
+from core.reference_data import bump_reference_version
+from .allocation import BATCH_SIZE, allocate_template, compile_forms_questions, create_forms_with_question_trees
+from .dashboard_cache import invalidate_courses
+from .models import FeedbackForm, FormAllocation
+
+SEMESTERS_PER_YEAR = 2
+ENROLLMENT_MODES = ('none', 'copy', 'move')
+
+RolloverResult = namedtuple('RolloverResult', [
+    'courses_created', 'courses_existing', 'forms_created', 'forms_skipped', 'enrollments_added', 'enrollments_removed'
+])
+
+
+def next_term(year, semester):
+    """The (year, semester) after the given term"""
+    if semester < SEMESTERS_PER_YEAR:
+        return year, semester + 1
+    return year + 1, 1
+
+
+def clone_courses(courses, year, semester):
+    """
+    Make sure every course has a copy with the same department and code in the
+    target term, inserting the missing ones with one bulk_create.
+
+    Returns ({source_course_id: target_course}, created_courses). Courses that
+    are already in the target term are left out.
+    """
+    courses = [course for course in courses if (course.year, course.semester) != (year, semester)]
+    targets = {
+        (course.department_id, course.code): course
+        for course in Course.objects.filter(
+            year=year,
+            semester=semester,
+            department_id__in={course.department_id for course in courses},
+            code__in={course.code for course in courses}
+        )
+    }
+
+    created = []
+    for course in courses:
+        key = (course.department_id, course.code)
+        if key not in targets:
+            targets[key] = Course(
+                department_id=course.department_id,
+                name=course.name,
+                code=course.code,
+                year=year,
+                semester=semester,
+                description=course.description
+            )
+            created.append(targets[key])
+
+    if created:
+        with transaction.atomic():
+            Course.objects.bulk_create(created, batch_size=BATCH_SIZE)
+            # bulk_create sends no signals, so retire the cached course lists here
+            transaction.on_commit(bump_reference_version)
+    return {course.id: targets[(course.department_id, course.code)] for course in courses}, created
+
+
+def carry_forms(course_map, is_active=True):
+    """
+    Give every teacher the same forms on the target courses as on the source
+    courses. Template allocations are re-allocated per template; other forms
+    are copied with their questions. Forms already present on the target
+    course (same teacher and title) are skipped. Returns (created, skipped).
+    """
+    created = 0
+    skipped = 0
+
+    pairs_by_template = {}
+    allocations = FormAllocation.objects.filter(course_id__in=course_map).select_related('template', 'teacher')
+    for allocation in allocations:
+        pairs_by_template.setdefault(allocation.template, []).append(
+            (allocation.teacher, course_map[allocation.course_id])
+        )
+    for template, pairs in pairs_by_template.items():
+        result = allocate_template(template, pairs, is_active=is_active)
+        created += len(result.created)
+        skipped += len(result.skipped)
+
+    sources = list(FeedbackForm.objects.filter(
+        course_id__in=course_map,
+        is_master=False,
+        allocation__isnull=True
+    ))
+    existing = set(FeedbackForm.objects.filter(
+        course__in=[course_map[form.course_id] for form in sources]
+    ).values_list('teacher_id', 'course_id', 'title'))
+
+    copies = []
+    trees = compile_forms_questions(sources)
+    for form in sources:
+        target = course_map[form.course_id]
+        if (form.teacher_id, target.id, form.title) in existing:
+            skipped += 1
+            continue
+        existing.add((form.teacher_id, target.id, form.title))
+        copies.append((FeedbackForm(
+            course=target,
+            teacher_id=form.teacher_id,
+            title=form.title,
+            description=form.description,
+            is_active=is_active
+        ), trees[form.id]))
+
+    if copies:
+        with transaction.atomic():
+            forms = create_forms_with_question_trees([form for form, _ in copies], [tree for _, tree in copies])
+            invalidate_courses({form.course_id for form in forms})
+    return created + len(copies), skipped
+
+
+def carry_enrollments(course_map, move=False):
+    """
+    Enroll every student of a source course in its target course, and with
+    move=True unenroll them from the source course, in one transaction.
+    Returns (added, removed) pairs.
+    """
+    pairs = list(StudentCourse.objects.filter(course_id__in=course_map).values_list('student_id', 'course_id'))
+    with transaction.atomic():
+        added = add_enrollments((student_id, course_map[course_id].id) for student_id, course_id in pairs)
+        removed = remove_enrollments(pairs) if move else []
+    return added, removed
+
+
+def rollover(courses, year, semester, forms=True, enrollments='none', is_active=True):
+    """
+    Roll courses over to the (year, semester) term: clone the course catalog,
+    carry over the teachers' forms and optionally copy or move the
+    enrollments. Each stage is a batched transaction, and running the
+    rollover again only fills in what is still missing.
+    """
+    if enrollments not in ENROLLMENT_MODES:
+        raise ValueError(f'enrollments must be one of {", ".join(ENROLLMENT_MODES)}')
+
+    course_map, created_courses = clone_courses(courses, year, semester)
+    forms_created, forms_skipped = carry_forms(course_map, is_active) if forms else (0, 0)
+    added, removed = [], []
+    if enrollments != 'none':
+        added, removed = carry_enrollments(course_map, move=enrollments == 'move')
+
+    return RolloverResult(
+        courses_created=len(created_courses),
+        courses_existing=len({course.id for course in course_map.values()}) - len(created_courses),
+        forms_created=forms_created,
+        forms_skipped=forms_skipped,
+        enrollments_added=len(added),
+        enrollments_removed=len(removed),
+    )
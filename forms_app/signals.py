@@ -0,0 +1,44 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from accounts.enrollment import in_bulk_enrollment_change
+from accounts.models import StudentCourse
+from .models import FeedbackForm, FormSubmission
+from .dashboard_cache import invalidate_students, invalidate_courses
+
+
+@receiver(post_save, sender=FormSubmission)
+@receiver(post_delete, sender=FormSubmission)
+def submission_changed(sender, instance, **kwargs):
+    invalidate_students([instance.student_id])
+
+
+@receiver(post_save, sender=StudentCourse)
+@receiver(post_delete, sender=StudentCourse)
+def enrollment_changed(sender, instance, **kwargs):
+    if not in_bulk_enrollment_change():
+        invalidate_students([instance.student_id])
+
+
+@receiver(pre_save, sender=FeedbackForm)
+def remember_form_keys(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Note the teacher and course a form had before this save, for form_changed
+    and analytics.signals.refresh_form_statistics
+    """
+    instance._previous_keys = None
+    if instance.pk is None or raw:
+        return
+    if update_fields is not None and not {'teacher', 'teacher_id', 'course', 'course_id'} & set(update_fields):
+        return
+    instance._previous_keys = FeedbackForm.objects.filter(pk=instance.pk).values_list('teacher_id', 'course_id').first()
+
+
+@receiver(post_save, sender=FeedbackForm)
+@receiver(post_delete, sender=FeedbackForm)
+def form_changed(sender, instance, **kwargs):
+    # Covers activation and deactivation as well as new, moved and removed forms
+    course_ids = {instance.course_id}
+    previous = getattr(instance, '_previous_keys', None)
+    if previous:
+        course_ids.add(previous[1])
+    invalidate_courses(course_ids)
@@ -1,3 +1,245 @@
-from django.test import TestCase
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from accounts.models import Student, StudentCourse
+from core.models import School, Department, Course
+from core.tests import AsyncBudgetMixin
+from .dashboard_cache import get_form_index
+from .rollover import rollover
+from .models import (
+    Teacher, FeedbackForm, FormSubmission, Question, MCQOption,
+    FormTemplate, TemplateQuestion, TemplateOption, FormAllocation
+)
 
-# Create your tests here.
+
+def create_form(course, teacher, mcq_questions=4, text_questions=2):
+    """A form with rating-scale MCQ questions of four options each, then text questions"""
+    form = FeedbackForm.objects.create(course=course, teacher=teacher, title='Mid-semester feedback')
+    for order in range(mcq_questions + text_questions):
+        mcq = order < mcq_questions
+        question = Question.objects.create(
+            form=form,
+            question_text=f'Question {order}',
+            question_type='mcq' if mcq else 'text',
+            order=order,
+            is_rating_scale=mcq
+        )
+        if mcq:
+            for option in range(4):
+                MCQOption.objects.create(question=question, option_text=f'Option {option}', order=option)
+    return form
+
+
+def answers(form, option=0):
+    data = {}
+    for question in form.questions.prefetch_related('options'):
+        if question.question_type == 'mcq':
+            data[f'question_{question.id}'] = str(question.options.all()[option].id)
+        else:
+            data[f'question_{question.id}'] = 'Clear lectures'
+    return data
+
+
+@override_settings(QUERY_BUDGETS_STRICT=True)
+class StudentQueryBudgetTests(AsyncBudgetMixin, TestCase):
+    """The student pages stay within their QUERY_BUDGETS"""
+
+    @classmethod
+    def setUpTestData(cls):
+        school = School.objects.create(name='Engineering', code='ENG')
+        department = Department.objects.create(school=school, name='Computing', code='CS')
+        course = Course.objects.create(department=department, name='Databases', code='CS301', semester=1, year=2024)
+        teacher = Teacher.objects.create(name='Dr. Rao', email='rao@example.com', department=department)
+        cls.form = create_form(course, teacher)
+        cls.students = []
+        for number in range(3):
+            student = Student.objects.create_user(f'CS{number:03}', f'Student {number}', 'pw')
+            StudentCourse.objects.create(student=student, course=course)
+            cls.students.append(student)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_dashboard(self):
+        self.client.force_login(self.students[0])
+        for _ in range(2):
+            self.assertEqual(self.client.get(reverse('forms_app:dashboard')).status_code, 200)
+
+    async def test_dashboard_async(self):
+        await sync_to_async(self.client.force_login)(self.students[0])
+        await self.aassertWithinBudget(reverse('forms_app:dashboard'))
+
+    def test_fill_form(self):
+        url = reverse('forms_app:fill_form', args=[self.form.id])
+        # The first submission creates the counter rows, the later ones update them
+        for option, student in enumerate(self.students):
+            self.client.force_login(student)
+            self.assertEqual(self.client.get(url).status_code, 200)
+            response = self.client.post(url, answers(self.form, option))
+            self.assertRedirects(response, reverse('forms_app:dashboard'), fetch_redirect_response=False)
+        self.assertEqual(FormSubmission.objects.filter(form=self.form).count(), len(self.students))
+
+
+class DashboardCacheTests(TestCase):
+    """The cached form index of a student follows changes to the forms of their courses"""
+
+    @classmethod
+    def setUpTestData(cls):
+        school = School.objects.create(name='Engineering', code='ENG')
+        department = Department.objects.create(school=school, name='Computing', code='CS')
+        cls.course = Course.objects.create(department=department, name='Databases', code='CS301', semester=1, year=2024)
+        cls.networks = Course.objects.create(department=department, name='Networks', code='CS302', semester=1, year=2024)
+        teacher = Teacher.objects.create(name='Dr. Rao', email='rao@example.com', department=department)
+        cls.form = create_form(cls.course, teacher, mcq_questions=1, text_questions=0)
+        cls.student = Student.objects.create_user('CS001', 'Student 1', 'pw')
+        StudentCourse.objects.create(student=cls.student, course=cls.course)
+
+    def setUp(self):
+        cache.clear()
+
+    def pending(self):
+        return [form['id'] for form in get_form_index(self.student)['pending']]
+
+    def test_deactivated_form(self):
+        self.assertEqual(self.pending(), [self.form.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.form.is_active = False
+            self.form.save()
+        self.assertEqual(self.pending(), [])
+
+    def test_form_moved_to_another_course(self):
+        self.assertEqual(self.pending(), [self.form.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.form.course = self.networks
+            self.form.save()
+        self.assertEqual(self.pending(), [])
+
+
+class FormAllocationTests(TestCase):
+    """Bulk allocation builds the same forms as saving allocations one at a time"""
+
+    @classmethod
+    def setUpTestData(cls):
+        school = School.objects.create(name='Engineering', code='ENG')
+        department = Department.objects.create(school=school, name='Computing', code='CS')
+        cls.courses = [
+            Course.objects.create(department=department, name=name, code=code, semester=1, year=2024)
+            for name, code in [('Databases', 'CS301'), ('Networks', 'CS302')]
+        ]
+        cls.teachers = [
+            Teacher.objects.create(name=name, email=f'{name.split()[-1].lower()}@example.com', department=department)
+            for name in ['Dr. Rao', 'Dr. Iyer']
+        ]
+        cls.template = FormTemplate.objects.create(name='Mid-semester', description='Course feedback')
+        for order in range(3):
+            mcq = order < 2
+            question = TemplateQuestion.objects.create(
+                template=cls.template,
+                question_text=f'Question {order}',
+                question_type='mcq' if mcq else 'text',
+                order=order,
+                is_required=order != 1,
+                is_rating_scale=mcq
+            )
+            if mcq:
+                for option in range(4):
+                    TemplateOption.objects.create(question=question, option_text=f'Option {option}', order=option)
+
+    def snapshot(self, allocation):
+        form = allocation.feedback_form
+        return (
+            form.title, form.description, form.is_active, form.course_id, form.teacher_id,
+            [
+                (
+                    question.question_text, question.question_type, question.order,
+                    question.is_required, question.is_rating_scale,
+                    [(option.option_text, option.order) for option in question.options.all()]
+                )
+                for question in form.questions.prefetch_related('options')
+            ]
+        )
+
+    def test_allocate_many_matches_save(self):
+        pairs = [(self.teachers[0], self.courses[0]), (self.teachers[1], self.courses[1])]
+        expected = []
+        with transaction.atomic():
+            for teacher, course in pairs:
+                allocation = FormAllocation(template=self.template, teacher=teacher, course=course)
+                allocation.save()
+                expected.append(self.snapshot(allocation))
+            transaction.set_rollback(True)
+        self.assertFalse(FormAllocation.objects.exists())
+
+        result = FormAllocation.objects.allocate_many(self.template, pairs)
+        self.assertEqual(result.skipped, [])
+        self.assertEqual([self.snapshot(allocation) for allocation in result.created], expected)
+
+    def test_allocate_many_skips_existing_pairs(self):
+        FormAllocation.objects.create(template=self.template, teacher=self.teachers[0], course=self.courses[0])
+        pairs = [(self.teachers[0], self.courses[0]), (self.teachers[0], self.courses[1])]
+        result = FormAllocation.objects.allocate_many(self.template, pairs + pairs)
+        self.assertEqual([(a.teacher, a.course) for a in result.created], pairs[1:])
+        self.assertEqual(result.skipped, pairs[:1])
+        self.assertEqual(FormAllocation.objects.count(), 2)
+        self.assertEqual(FeedbackForm.objects.count(), 2)
+
+
+class RolloverTests(TestCase):
+    """Running a rollover again creates nothing new"""
+
+    @classmethod
+    def setUpTestData(cls):
+        school = School.objects.create(name='Engineering', code='ENG')
+        department = Department.objects.create(school=school, name='Computing', code='CS')
+        cls.courses = [
+            Course.objects.create(department=department, name=name, code=code, semester=2, year=2024)
+            for name, code in [('Databases', 'CS301'), ('Networks', 'CS302')]
+        ]
+        teacher = Teacher.objects.create(name='Dr. Rao', email='rao@example.com', department=department)
+        create_form(cls.courses[0], teacher, mcq_questions=2, text_questions=1)
+        template = FormTemplate.objects.create(name='End-semester')
+        TemplateQuestion.objects.create(template=template, question_text='Comments', question_type='text')
+        FormAllocation.objects.create(template=template, teacher=teacher, course=cls.courses[1])
+        for number in range(3):
+            student = Student.objects.create_user(f'CS{number:03}', f'Student {number}', 'pw')
+            StudentCourse.objects.create(student=student, course=cls.courses[number % 2])
+
+    def target_state(self):
+        courses = Course.objects.filter(year=2025, semester=1)
+        forms = FeedbackForm.objects.filter(course__in=courses)
+        return (
+            sorted(courses.values_list('code', flat=True)),
+            sorted(forms.values_list('course__code', 'title')),
+            Question.objects.filter(form__in=forms).count(),
+            sorted(StudentCourse.objects.filter(course__in=courses).values_list('student__roll_number', 'course__code')),
+        )
+
+    def test_rollover_is_idempotent(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = rollover(self.courses, 2025, 1, enrollments='copy')
+        self.assertEqual(first.courses_created, 2)
+        self.assertEqual(first.forms_created, 2)
+        self.assertEqual(first.enrollments_added, 3)
+        state = self.target_state()
+        self.assertEqual(state[0], ['CS301', 'CS302'])
+        self.assertEqual(state[2], 4)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second = rollover(self.courses, 2025, 1, enrollments='copy')
+        self.assertEqual(second.courses_created, 0)
+        self.assertEqual(second.courses_existing, 2)
+        self.assertEqual(second.forms_created, 0)
+        self.assertEqual(second.forms_skipped, 2)
+        self.assertEqual(second.enrollments_added, 0)
+        self.assertEqual(self.target_state(), state)
+
+    def test_moved_enrollments_are_not_moved_twice(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = rollover(self.courses, 2025, 1, forms=False, enrollments='move')
+        self.assertEqual((first.enrollments_added, first.enrollments_removed), (3, 3))
+        with self.captureOnCommitCallbacks(execute=True):
+            second = rollover(self.courses, 2025, 1, forms=False, enrollments='move')
+        self.assertEqual((second.enrollments_added, second.enrollments_removed), (0, 0))
+        self.assertFalse(StudentCourse.objects.filter(course__in=self.courses).exists())
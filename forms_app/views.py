@@ -3,28 +3,16 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db import transaction
 from .models import FeedbackForm, FormSubmission, Response, Question
+from analytics import counters, statistics
+from core.decorators import async_login_required
+from .dashboard_cache import aget_form_index
 
-@login_required
-def dashboard(request):
-    # Get courses the student is enrolled in
-    enrolled_course_ids = request.user.enrolled_courses.values_list('course_id', flat=True)
-    
-    # Get all active forms for student's enrolled courses only
-    available_forms = FeedbackForm.objects.filter(
-        is_active=True,
-        course_id__in=enrolled_course_ids
-    ).select_related(
-        'course', 'teacher', 'course__department', 'course__department__school'
-    )
-    
-    # Get forms already submitted by this student
-    submitted_form_ids = FormSubmission.objects.filter(
-        student=request.user
-    ).values_list('form_id', flat=True)
-    
-    # Separate forms into pending and completed
-    pending_forms = available_forms.exclude(id__in=submitted_form_ids)
-    completed_forms = available_forms.filter(id__in=submitted_form_ids)
+@async_login_required
+async def dashboard(request):
+    # Pending and completed forms come from a per-student cached index
+    index = await aget_form_index(request.user)
+    pending_forms = index['pending']
+    completed_forms = index['completed']
     
     context = {
         'pending_forms': pending_forms,
@@ -34,7 +22,11 @@ def dashboard(request):
 
 @login_required
 def fill_form(request, form_id):
-    form = get_object_or_404(FeedbackForm, id=form_id, is_active=True)
+    form = get_object_or_404(
+        FeedbackForm.objects.select_related('course__department__school', 'teacher'),
+        id=form_id,
+        is_active=True
+    )
     
     # Check if student has already submitted this form
     if FormSubmission.objects.filter(form=form, student=request.user).exists():
@@ -45,6 +37,35 @@ def fill_form(request, form_id):
     
     if request.method == 'POST':
         try:
+            # Validate every answer in memory before opening the transaction
+            responses = []
+            option_answers = []
+            for question in questions:
+                if question.question_type == 'mcq':
+                    option_id = request.POST.get(f'question_{question.id}')
+                    if option_id:
+                        # Options are prefetched, so this check does not hit the database
+                        options = {str(option.id): option for option in question.options.all()}
+                        if option_id not in options:
+                            raise ValueError(f'Question {question.order} has an invalid answer')
+                        responses.append(Response(
+                            question=question,
+                            mcq_answer=options[option_id]
+                        ))
+                        option_answers.append((question.id, options[option_id].id))
+                    elif question.is_required:
+                        raise ValueError(f'Question {question.order} is required')
+                
+                elif question.question_type == 'text':
+                    text_answer = request.POST.get(f'question_{question.id}', '').strip()
+                    if text_answer or not question.is_required:
+                        responses.append(Response(
+                            question=question,
+                            text_answer=text_answer
+                        ))
+                    elif question.is_required:
+                        raise ValueError(f'Question {question.order} is required')
+            
             with transaction.atomic():
                 # Create submission
                 submission = FormSubmission.objects.create(
@@ -52,32 +73,16 @@ def fill_form(request, form_id):
                     student=request.user
                 )
                 
-                # Process each question
-                for question in questions:
-                    if question.question_type == 'mcq':
-                        option_id = request.POST.get(f'question_{question.id}')
-                        if option_id:
-                            Response.objects.create(
-                                submission=submission,
-                                question=question,
-                                mcq_answer_id=option_id
-                            )
-                        elif question.is_required:
-                            raise ValueError(f'Question {question.order} is required')
-                    
-                    elif question.question_type == 'text':
-                        text_answer = request.POST.get(f'question_{question.id}', '').strip()
-                        if text_answer or not question.is_required:
-                            Response.objects.create(
-                                submission=submission,
-                                question=question,
-                                text_answer=text_answer
-                            )
-                        elif question.is_required:
-                            raise ValueError(f'Question {question.order} is required')
+                # Write all responses with a single INSERT
+                for response in responses:
+                    response.submission = submission
+                Response.objects.bulk_create(responses)
                 
-                messages.success(request, 'Thank you! Your feedback has been submitted successfully.')
-                return redirect('forms_app:dashboard')
+                # Update the analytics counters in the same transaction
+                counters.record_submission(submission, option_answers, statistics.option_scores(questions))
+            
+            messages.success(request, 'Thank you! Your feedback has been submitted successfully.')
+            return redirect('forms_app:dashboard')
         
         except ValueError as e:
             messages.error(request, str(e))